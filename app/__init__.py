@@ -16,6 +16,23 @@ def create_app(config_class=Config):
     db.init_app(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
+
+    from app.services.sqlite_profile import init_sqlite_profile
+    init_sqlite_profile(app)
+
+    from app.services.settings_cache import settings_cache
+    settings_cache.init_app(app)
+    from app.services.problem_cache import init_problem_cache
+    init_problem_cache(app)
+    from app.services.identity_cache import init_identity_cache
+    init_identity_cache(app)
+    from app.services import blob_store  # noqa: F401  注册写入源码 blob 的会话事件
+    from app.services import problem_stats  # noqa: F401  注册增量更新题目统计的会话事件
+    from app.services import latest_submissions  # noqa: F401  注册更新最新提交指针的会话事件
+    from app.services import code_similarity  # noqa: F401  注册为新提交计算 MinHash 签名的会话事件
+    from app.services import code_fingerprint  # noqa: F401  注册为新提交计算规范化指纹的会话事件
+    from app.services import problem_search  # noqa: F401  注册创建全文索引表和触发器的 DDL 事件
+    from app.services import deletion  # noqa: F401  注册对普通查询隐藏软删除行的会话事件
     # login_manager.login_view = 'auth.login' # Specifies the endpoint for the login page
 
     # Register blueprints here
@@ -43,11 +60,26 @@ def create_app(config_class=Config):
     from app.api.import_export import import_export_bp
     app.register_blueprint(import_export_bp)
 
+    from app.api.reviews import reviews_bp
+    app.register_blueprint(reviews_bp)
+
+    from app.api.jobs import jobs_bp
+    app.register_blueprint(jobs_bp)
+
+    from app.cli import register_cli
+    register_cli(app)
 
+    if app.config.get('LLM_REVIEW_RECOVERY_ENABLED'):
+        # 只在真正处理请求的进程中恢复中断的评审，避免 flask db 等命令触发
+        from app.services.llm_service import start_review_recovery
+        @app.before_request
+        def ensure_review_recovery():
+            start_review_recovery(app)
 
-    from app.models import Candidate # Import Candidate model for user_loader
+    from app.services.identity_cache import load_candidate
     @login_manager.user_loader
     def load_user(user_id):
-        return Candidate.query.get(int(user_id))
+        # 先用签名 session 中的快照和进程内缓存，避免每个请求都查询数据库
+        return load_candidate(user_id)
 
     return app
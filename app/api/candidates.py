@@ -1,22 +1,29 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from app import db
-from app.models import Candidate
+from app.models import Candidate, search_key
+from app.api.pagination import PaginationError, decode_cursor, encode_cursor, parse_datetime, parse_limit
+from app.services.deletion import soft_delete
+from app.services.candidate_import import DEFAULT_MAX_ROWS, CandidateImportError, import_candidates, parse_csv, parse_json
+from sqlalchemy import and_, or_
+import json
 from werkzeug.security import generate_password_hash
 
 candidates_bp = Blueprint('candidates_bp', __name__, url_prefix='/api')
 
+DEFAULT_CANDIDATE_PAGE_MAX_BYTES = 64 * 1024
+
 @candidates_bp.route('/candidates', methods=['POST'])
 def create_candidate():
     data = request.get_json()
     if not data or not all(k in data for k in ['name', 'email', 'password']):
         return jsonify({'message': 'Missing name or email'}), 400
 
-    # 检查重复名称
-    if Candidate.query.filter_by(name=data['name']).first():
+    # 检查重复名称（软删除但尚未清理完的候选人仍占用名称和邮箱）
+    if Candidate.query.filter_by(name=data['name']).execution_options(include_deleted=True).first():
         return jsonify({'message': 'Candidate name already exists'}), 409
 
     # 检查重复邮箱
-    if Candidate.query.filter_by(email=data['email']).first():
+    if Candidate.query.filter_by(email=data['email']).execution_options(include_deleted=True).first():
         return jsonify({'message': 'Candidate with this email already exists'}), 409
 
     # 创建新候选人
@@ -36,11 +43,85 @@ def create_candidate():
         }
     }), 201
 
+@candidates_bp.route('/candidates/bulk', methods=['POST'])
+def create_candidates_bulk():
+    """
+    批量创建候选人。请求体是 JSON（数组或 {"candidates": [...]}）、text/csv，
+    或以 multipart 上传的 CSV 文件 file；CSV 第一行为 name,email,password。
+    逐行返回创建结果，某一行失败不影响其他行。
+    """
+    try:
+        if request.is_json:
+            rows = parse_json(request.get_json(silent=True))
+        elif 'file' in request.files:
+            rows = parse_csv(request.files['file'].read().decode('utf-8-sig'))
+        elif request.mimetype in ('text/csv', 'text/plain'):
+            rows = parse_csv(request.get_data(as_text=True).lstrip('\ufeff'))
+        else:
+            return jsonify({'message': 'Send JSON, text/csv or a CSV file upload'}), 415
+    except (CandidateImportError, UnicodeDecodeError) as e:
+        message = str(e) if isinstance(e, CandidateImportError) else 'CSV file is not valid UTF-8'
+        return jsonify({'message': message}), 400
+
+    max_rows = current_app.config.get('BULK_CANDIDATE_MAX_ROWS', DEFAULT_MAX_ROWS)
+    if len(rows) > max_rows:
+        return jsonify({'message': f'At most {max_rows} candidates per request'}), 413
+    if not rows:
+        return jsonify({'message': 'No candidates to create'}), 400
+
+    return jsonify(import_candidates(rows, current_app.config.get('PASSWORD_HASH_WORKERS'))), 200
+
+def prefix_upper_bound(prefix):
+    """比所有以 prefix 开头的字符串都大的最小字符串，用于把前缀匹配改写成可走索引的范围查询"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
 @candidates_bp.route('/candidates', methods=['GET'])
 def get_candidates():
-    candidates = Candidate.query.all()
-    candidates_list = [{'id': candidate.id, 'name': candidate.name, 'email': candidate.email} for candidate in candidates]
-    return jsonify(candidates_list), 200
+    """
+    候选人列表：默认按创建时间倒序游标分页；q 非空时按姓名或邮箱前缀搜索（不区分大小写），按姓名排序。
+    每页最多 limit 条，并且序列化后不超过 CANDIDATE_PAGE_MAX_BYTES 字节。
+    """
+    args = request.args
+    q = search_key((args.get('q') or '').strip())
+    try:
+        limit = parse_limit(args.get('limit'))
+        cursor = decode_cursor(args['cursor']) if args.get('cursor') else None
+        if cursor is not None:
+            if len(cursor) != 2 or not isinstance(cursor[0], str) or not isinstance(cursor[1], int):
+                raise PaginationError('Invalid cursor')
+            cursor_key = cursor[0] if q else parse_datetime(cursor[0], 'cursor')
+            if cursor_key is None:
+                raise PaginationError('Invalid cursor')
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
+
+    name_key, email_key = Candidate.name_search, Candidate.email_search
+    query = db.select(Candidate.id, Candidate.name, Candidate.email, Candidate.created_at, name_key.label('sort_name'))
+    if q:
+        upper = prefix_upper_bound(q)
+        query = query.where(or_(and_(name_key >= q, name_key < upper), and_(email_key >= q, email_key < upper)))
+        if cursor is not None:
+            query = query.where(or_(name_key > cursor_key, and_(name_key == cursor_key, Candidate.id > cursor[1])))
+        query = query.order_by(name_key, Candidate.id)
+    else:
+        if cursor is not None:
+            query = query.where(or_(Candidate.created_at < cursor_key,
+                                    and_(Candidate.created_at == cursor_key, Candidate.id < cursor[1])))
+        query = query.order_by(Candidate.created_at.desc(), Candidate.id.desc())
+    rows = db.session.execute(query.limit(limit + 1)).all()
+
+    max_bytes = current_app.config.get('CANDIDATE_PAGE_MAX_BYTES', DEFAULT_CANDIDATE_PAGE_MAX_BYTES)
+    candidates_list, size, next_cursor = [], 0, None
+    for index, row in enumerate(rows):
+        item = {'id': row.id, 'name': row.name, 'email': row.email}
+        size += len(json.dumps(item, ensure_ascii=False).encode('utf-8'))
+        # 超出条数或字节预算时截断本页，至少返回一条
+        if index == limit or (candidates_list and size > max_bytes):
+            last = rows[index - 1]
+            next_cursor = encode_cursor(last.sort_name if q else last.created_at, last.id)
+            break
+        candidates_list.append(item)
+    return jsonify({'candidates': candidates_list, 'next_cursor': next_cursor}), 200
 
 @candidates_bp.route('/candidates/<int:candidate_id>', methods=['GET'])
 def get_candidate(candidate_id):
@@ -58,7 +139,7 @@ def update_candidate(candidate_id):
         candidate.name = data['name']
     if 'email' in data:
         # Check if the new email already exists for another candidate
-        existing_candidate = Candidate.query.filter(Candidate.id != candidate_id, Candidate.email == data['email']).first()
+        existing_candidate = Candidate.query.filter(Candidate.id != candidate_id, Candidate.email == data['email']).execution_options(include_deleted=True).first()
         if existing_candidate:
             return jsonify({'message': 'Email already in use by another candidate'}), 409
         candidate.email = data['email']
@@ -68,7 +149,7 @@ def update_candidate(candidate_id):
 
 @candidates_bp.route('/candidates/<int:candidate_id>', methods=['DELETE'])
 def delete_candidate(candidate_id):
+    """软删除后立即返回，提交和标签页由后台任务分批删除"""
     candidate = Candidate.query.get_or_404(candidate_id)
-    db.session.delete(candidate)
-    db.session.commit()
-    return jsonify({'message': 'Candidate deleted successfully'}), 200
+    job = soft_delete(candidate)
+    return jsonify({'message': 'Candidate deleted successfully', 'job': job.to_dict()}), 200
@@ -1,97 +1,95 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from app import db
 from app.models import Problem, TestCase
 import json
+import os
+import shutil
+import tempfile
+from app.services.jobs import jobs
+from app.services.problem_import import import_problems_job
 
 import_export_bp = Blueprint('import_export_bp', __name__, url_prefix='/api')
 
 @import_export_bp.route('/problems/import', methods=['POST'])
 def import_problems():
+    """把上传文件落盘后交给后台任务逐条解析导入，通过 /api/jobs/<id> 查询进度和结果"""
     if 'file' not in request.files:
         return jsonify({'message': 'No file part in the request'}), 400
-    
+
     file = request.files['file']
     if file.filename == '':
         return jsonify({'message': 'No selected file'}), 400
+    if not file.filename.endswith('.json'):
+        return jsonify({'message': 'Invalid file format or content, please upload a .json file'}), 400
 
-    if file and file.filename.endswith('.json'):
-        try:
-            problems_data = json.load(file)
-        except json.JSONDecodeError:
-            return jsonify({'message': 'Invalid JSON file'}), 400
+    atomic = request.form.get('atomic', 'false').lower() in ('1', 'true', 'yes')
+    fd, path = tempfile.mkstemp(prefix='problem-import-', suffix='.json')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            shutil.copyfileobj(file.stream, f)
+    except OSError:
+        os.remove(path)
+        raise
 
-        imported_count = 0
-        updated_count = 0
+    job = jobs.submit('problem_import', import_problems_job, path, atomic=atomic)
+    response = jsonify({'message': 'Import started', 'job': job.to_dict()})
+    response.headers['Location'] = f"/api/jobs/{job.id}"
+    return response, 202
 
-        for problem_data in problems_data:
-            name = problem_data.get('name')
-            description = problem_data.get('description', '')
-            llm_prompt = problem_data.get('llm_prompt', '')
-            test_cases_data = problem_data.get('test_cases', [])
+# 每批从数据库读取的题目数，导出时内存占用只与批大小有关
+EXPORT_BATCH_SIZE = 100
 
-            if not name:
-                # Skip if problem name is missing
-                continue
 
-            problem = Problem.query.filter_by(name=name).first()
-            if problem:
-                # Update existing problem
-                problem.description = description
-                problem.llm_prompt = llm_prompt
-                # Clear existing test cases for simplicity, or implement more complex update logic
-                TestCase.query.filter_by(problem_id=problem.id).delete()
-                updated_count += 1
-            else:
-                # Create new problem
-                problem = Problem(name=name, description=description, llm_prompt=llm_prompt)
-                db.session.add(problem)
-                imported_count += 1
-            
-            db.session.flush() # Ensure problem.id is available for new problems
+def _load_json_field(value):
+    """测试用例以 JSON 字符串存储，无法解析时原样导出"""
+    if value is None:
+        return None
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
 
-            for tc_data in test_cases_data:
-                input_data = tc_data.get('input')
-                expected_output = tc_data.get('expected_output')
-                is_public = tc_data.get('is_public', True)
-                if input_data is not None and expected_output is not None:
-                    test_case = TestCase(
-                        problem_id=problem.id,
-                        input=json.dumps(input_data), # Store as JSON string
-                        expected_output=json.dumps(expected_output), # Store as JSON string
-                        is_public=is_public
-                    )
-                    db.session.add(test_case)
-        
-        db.session.commit()
-        return jsonify({
-            'message': 'Problems imported successfully',
-            'imported_count': imported_count,
-            'updated_count': updated_count
-        }), 200
-    else:
-        return jsonify({'message': 'Invalid file type, please upload a .json file'}), 400
 
-@import_export_bp.route('/problems/export', methods=['GET'])
-def export_problems():
-    problems = Problem.query.all()
-    problems_data = []
-    for problem in problems:
-        test_cases = TestCase.query.filter_by(problem_id=problem.id).all()
-        test_cases_data = [
-            {
-                'input': json.loads(tc.input),
-                'expected_output': json.loads(tc.expected_output),
-                'is_public': tc.is_public
-            } for tc in test_cases
-        ]
-        problems_data.append({
-            'name': problem.name,
+def iter_problem_batches(batch_size):
+    """按 id 游标分批读取题目及其测试用例，每批只发两条查询，不经过 ORM 身份映射"""
+    last_id = 0
+    while True:
+        problems = db.session.execute(
+            db.select(Problem.id, Problem.title, Problem.description, Problem.llm_prompt)
+            .where(Problem.id > last_id).order_by(Problem.id).limit(batch_size)
+        ).all()
+        if not problems:
+            return
+        test_cases = {problem.id: [] for problem in problems}
+        rows = db.session.execute(
+            db.select(TestCase.problem_id, TestCase.input_params, TestCase.expected_output)
+            .where(TestCase.problem_id.in_(list(test_cases))).order_by(TestCase.problem_id, TestCase.id)
+        )
+        for row in rows:
+            test_cases[row.problem_id].append({
+                'input': _load_json_field(row.input_params),
+                'expected_output': _load_json_field(row.expected_output)
+            })
+        yield [{
+            'title': problem.title,
             'description': problem.description,
             'llm_prompt': problem.llm_prompt,
-            'test_cases': test_cases_data
-        })
-    
-    response = jsonify(problems_data)
+            'test_cases': test_cases[problem.id]
+        } for problem in problems]
+        last_id = problems[-1].id
+
+
+@import_export_bp.route('/problems/export', methods=['GET'])
+def export_problems():
+    def generate():
+        yield '['
+        first = True
+        for batch in iter_problem_batches(EXPORT_BATCH_SIZE):
+            for problem_data in batch:
+                yield ('' if first else ',') + json.dumps(problem_data, ensure_ascii=False)
+                first = False
+        yield ']'
+
+    response = Response(stream_with_context(generate()), mimetype='application/json')
     response.headers['Content-Disposition'] = 'attachment; filename=problems_export.json'
-    response.mimetype = 'application/json'
     return response, 200
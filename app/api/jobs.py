@@ -0,0 +1,11 @@
+from flask import Blueprint, jsonify
+from app.services.jobs import jobs
+
+jobs_bp = Blueprint('jobs_bp', __name__, url_prefix='/api')
+
+@jobs_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = jobs.get(job_id)
+    if not job:
+        return jsonify({'message': 'Job not found'}), 404
+    return jsonify(job.to_dict()), 200
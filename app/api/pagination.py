@@ -0,0 +1,54 @@
+import base64
+import json
+from datetime import UTC, datetime
+from typing import Any, List, Optional
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class PaginationError(ValueError):
+    """分页参数无效"""
+    pass
+
+
+def encode_cursor(*values: Any) -> str:
+    """把排序键编码为不透明的游标字符串"""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        raise PaginationError('Invalid cursor')
+    if not isinstance(values, list):
+        raise PaginationError('Invalid cursor')
+    return values
+
+
+def parse_limit(raw: Optional[str], default: int = DEFAULT_PAGE_SIZE, maximum: int = MAX_PAGE_SIZE) -> int:
+    if raw is None or raw == '':
+        return default
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise PaginationError('limit must be an integer')
+    if limit < 1:
+        raise PaginationError('limit must be positive')
+    return min(limit, maximum)
+
+
+def parse_datetime(raw: Optional[str], name: str) -> Optional[datetime]:
+    if not raw:
+        return None
+    try:
+        value = datetime.fromisoformat(raw.replace('Z', '+00:00'))
+    except ValueError:
+        raise PaginationError(f'{name} must be an ISO 8601 datetime')
+    # 数据库里存的是不带时区的 UTC 时间
+    if value.tzinfo is not None:
+        value = value.astimezone(UTC).replace(tzinfo=None)
+    return value
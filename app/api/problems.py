@@ -1,6 +1,12 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, abort
 from app import db
 from app.models import Problem, TestCase
+from app.api.pagination import PaginationError, decode_cursor, encode_cursor, parse_limit
+from app.services.problem_search import search_problems
+from app.services.problem_cache import LIST_KEY, cached_json_response, problem_list_stamp, problem_stamp
+from app.services.problem_stats import get_problem_stats
+from app.services.judge_results import pass_rates_by_test_case, slowest_test_runs
+from app.services.deletion import soft_delete
 
 problems_bp = Blueprint('problems_bp', __name__, url_prefix='/api/problems')
 
@@ -10,7 +16,8 @@ def create_problem():
     if not data or not data.get('title') or not data.get('description') or not data.get('llm_prompt'):
         return jsonify({'message': 'Missing required fields: title, description, or llm_prompt'}), 400
 
-    if Problem.query.filter_by(title=data['title']).first():
+    # 软删除但尚未清理完的题目仍占用标题
+    if Problem.query.filter_by(title=data['title']).execution_options(include_deleted=True).first():
         return jsonify({'message': 'Problem title already exists'}), 400
 
     new_problem = Problem(
@@ -25,22 +32,79 @@ def create_problem():
 
 @problems_bp.route('', methods=['GET'])
 def get_problems():
-    problems = Problem.query.all()
-    problems_list = [{'id': problem.id, 'title': problem.title, 'description': problem.description, 'llm_prompt': problem.llm_prompt} for problem in problems]
-    return jsonify({'problems': problems_list}), 200
+    count, version_sum, max_id, last_modified = problem_list_stamp()
+
+    def build():
+        problems = Problem.query.all()
+        problems_list = [{'id': problem.id, 'title': problem.title, 'description': problem.description, 'llm_prompt': problem.llm_prompt} for problem in problems]
+        return {'problems': problems_list}
+
+    return cached_json_response(LIST_KEY, f'problems-{count}-{version_sum}-{max_id}', last_modified, build)
+
+@problems_bp.route('/search', methods=['GET'])
+def search():
+    """按相关度分页搜索题目，只返回 id、标题和高亮摘要（HTML 已转义，命中处用 <mark> 标出）"""
+    try:
+        limit = parse_limit(request.args.get('limit'), default=20)
+        after = None
+        if request.args.get('cursor'):
+            after = decode_cursor(request.args['cursor'])
+            if (len(after) != 2 or not isinstance(after[0], (int, float)) or isinstance(after[0], bool)
+                    or not isinstance(after[1], int)):
+                raise PaginationError('Invalid cursor')
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
+
+    # 多取一条用来判断是否还有下一页
+    results = search_problems(request.args.get('q', ''), limit + 1, after=tuple(after) if after else None)
+    next_cursor = None
+    if len(results) > limit:
+        results = results[:limit]
+        next_cursor = encode_cursor(results[-1]['rank'], results[-1]['id'])
+    return jsonify({
+        'problems': [{'id': r['id'], 'title': r['title'], 'snippet': r['snippet']} for r in results],
+        'next_cursor': next_cursor
+    }), 200
 
 @problems_bp.route('/<int:problem_id>', methods=['GET'])
 def get_problem(problem_id):
-    problem = Problem.query.get_or_404(problem_id)
-    # Assuming TestCase model has 'input_params' and 'expected_output' and 'is_public' might not exist or be relevant here
-    # Adjust according to actual TestCase model structure and what needs to be exposed
-    test_cases = [{'id': tc.id, 'input_params': tc.input_params, 'expected_output': tc.expected_output} for tc in problem.test_cases]
+    stamp = problem_stamp(problem_id)
+    if stamp is None:
+        abort(404)
+    version, last_modified = stamp
+
+    def build():
+        problem = db.session.get(Problem, problem_id)
+        test_cases = [{'id': tc.id, 'input_params': tc.input_params, 'expected_output': tc.expected_output} for tc in problem.test_cases.order_by(TestCase.id)]
+        return {
+            'id': problem.id,
+            'title': problem.title,
+            'description': problem.description,
+            'llm_prompt': problem.llm_prompt,
+            'test_cases': test_cases
+        }
+
+    return cached_json_response(('problem', problem_id), f'problem-{problem_id}-v{version}', last_modified, build)
+
+@problems_bp.route('/<int:problem_id>/stats', methods=['GET'])
+def get_problem_statistics(problem_id):
+    # 只读取预先汇总的统计行，不扫描提交记录
+    if db.session.get(Problem, problem_id) is None:
+        return jsonify({'message': 'Problem not found'}), 404
+    return jsonify(get_problem_stats(problem_id)), 200
+
+@problems_bp.route('/<int:problem_id>/test-case-stats', methods=['GET'])
+def get_test_case_statistics(problem_id):
+    """每个测试用例的通过率以及耗时最长的 limit 次运行，在数据库中按测试结果行聚合"""
+    try:
+        limit = parse_limit(request.args.get('limit'), default=10)
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
+    if db.session.get(Problem, problem_id) is None:
+        return jsonify({'message': 'Problem not found'}), 404
     return jsonify({
-        'id': problem.id,
-        'title': problem.title,
-        'description': problem.description,
-        'llm_prompt': problem.llm_prompt,
-        'test_cases': test_cases
+        'pass_rates': pass_rates_by_test_case(problem_id),
+        'slowest_runs': slowest_test_runs(problem_id, limit=limit)
     }), 200
 
 @problems_bp.route('/<int:problem_id>', methods=['PUT'])
@@ -51,7 +115,7 @@ def update_problem(problem_id):
         return jsonify({'message': 'No input data provided'}), 400
 
     if 'title' in data and data['title'] != problem.title:
-        if Problem.query.filter(Problem.id != problem_id, Problem.title == data['title']).first():
+        if Problem.query.filter(Problem.id != problem_id, Problem.title == data['title']).execution_options(include_deleted=True).first():
             return jsonify({'message': 'Problem title already exists'}), 400
         problem.title = data['title']
 
@@ -65,9 +129,7 @@ def update_problem(problem_id):
 
 @problems_bp.route('/<int:problem_id>', methods=['DELETE'])
 def delete_problem(problem_id):
+    """软删除后立即返回，提交和测试用例由后台任务分批删除"""
     problem = Problem.query.get_or_404(problem_id)
-    # Add logic to delete associated test cases and submissions if necessary
-    # For now, just deleting the problem itself
-    db.session.delete(problem)
-    db.session.commit()
-    return jsonify({'message': 'Problem deleted successfully'}), 200
+    job = soft_delete(problem)
+    return jsonify({'message': 'Problem deleted successfully', 'job': job.to_dict()}), 200
@@ -0,0 +1,47 @@
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from app import db
+from app.models import Candidate, CandidateSessionReview
+from app.services.llm_service import LLMService, LLMConfigError
+from app.services.batch_review import CandidateBatchReviewer, latest_submissions_for_candidate
+import json
+
+reviews_bp = Blueprint('reviews_bp', __name__, url_prefix='/api')
+
+@reviews_bp.route('/candidates/<int:candidate_id>/reviews', methods=['POST'])
+def review_candidate_session(candidate_id):
+    candidate = db.session.get(Candidate, candidate_id)
+    if not candidate:
+        return jsonify({'message': 'Candidate not found'}), 404
+
+    data = request.get_json(silent=True) or {}
+
+    submissions = latest_submissions_for_candidate(candidate_id)
+    if not submissions:
+        return jsonify({'message': 'No submissions found for this candidate'}), 404
+
+    try:
+        llm_service = LLMService()
+    except LLMConfigError as e:
+        return jsonify({'message': str(e)}), 400
+
+    reviewer = CandidateBatchReviewer(candidate_id, llm_service, force=bool(data.get('force', False)))
+
+    # 以 NDJSON 逐行推送进度事件
+    def generate():
+        for event in reviewer.run(submissions, summary=bool(data.get('summary', True))):
+            yield json.dumps(event) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@reviews_bp.route('/candidates/<int:candidate_id>/reviews/summary', methods=['GET'])
+def get_candidate_session_summary(candidate_id):
+    """最近一次批量评审保存的会话总结"""
+    candidate = db.session.get(Candidate, candidate_id)
+    if not candidate:
+        return jsonify({'message': 'Candidate not found'}), 404
+
+    record = CandidateSessionReview.query.filter_by(candidate_id=candidate_id).order_by(
+        CandidateSessionReview.id.desc()).first()
+    if record is None:
+        return jsonify({'message': 'No session summary found for this candidate'}), 404
+    return jsonify({'summary': record.to_dict()}), 200
@@ -1,27 +1,28 @@
 from flask import Blueprint, jsonify, request
 from app import db
 from app.models import Setting
+from app.services.settings_cache import settings_cache
 
 settings_bp = Blueprint('settings_bp', __name__, url_prefix='/api')
 
 @settings_bp.route('/settings', methods=['GET'])
 def get_all_settings():
-    settings = Setting.query.all()
+    settings = settings_cache.all()
     return jsonify({
         'settings': [{
-            'key': setting.key,
-            'value': setting.value
-        } for setting in settings]
+            'key': key,
+            'value': value
+        } for key, value in settings.items()]
     })
 
 @settings_bp.route('/settings/<string:key>', methods=['GET'])
 def get_setting(key):
-    setting = Setting.query.get(key)
-    if not setting:
+    settings = settings_cache.all()
+    if key not in settings:
         return jsonify({'message': 'Setting not found'}), 404
     return jsonify({
-        'key': setting.key,
-        'value': setting.value
+        'key': key,
+        'value': settings[key]
     }), 200
 
 @settings_bp.route('/settings/<string:key>', methods=['PUT'])
@@ -33,7 +34,8 @@ def update_setting(key):
     if not data or 'value' not in data:
         return jsonify({'message': 'Missing value field'}), 400
 
-    setting = Setting.query.get(key)
+    # 提交后由 settings_cache 写穿到本进程缓存并通知其他进程
+    setting = db.session.get(Setting, key)
     if setting:
         setting.value = data['value']
         status_code = 200
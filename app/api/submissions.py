@@ -1,8 +1,18 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, abort
 from app.services.judge0_service import Judge0Service
 from app import db
 from app.models import Submission, Candidate, Problem, TestCase # Assuming these models exist
-from app.services.llm_service import generate_llm_review_async # For LLM review
+from app.services.llm_service import generate_llm_review_async, review_is_complete, REVIEW_STATUS_DONE, REVIEW_STATUS_PENDING # For LLM review
+from app.services.latest_submissions import compute_pointers, get_pointer
+from app.services.code_fingerprint import code_fingerprint, find_reusable_submission, reused_from
+from app.services.blob_store import blob_store
+from app.services.code_similarity import backfill_signatures_job, find_similar
+from app.services.jobs import jobs
+from app.services.submission_archive import archive_submissions_job, get_archived_submission
+from app.api.pagination import PaginationError, decode_cursor, encode_cursor, parse_datetime, parse_limit
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import load_only, selectinload
+from datetime import datetime, UTC
 import json # For parsing test case inputs/outputs
 import asyncio # For running async functions
 import types
@@ -60,13 +70,22 @@ def submit_solution():
     if not test_cases:
         return jsonify({'message': 'Problem has no test cases configured'}), 400
 
+    # 同一候选人提交的代码规范化后与之前某次提交相同、且测试用例没有变化时，直接复用那次的判题结果
+    fingerprint = code_fingerprint(data['code'], data['language'])
+    reused = None
+    if data.get('cpu_time_limit') is None and data.get('memory_limit') is None:
+        reused = find_reusable_submission(candidate.id, problem.id, fingerprint, problem.version)
+
     judge0_service = Judge0Service()
     test_results = []
     overall_status = 'Accepted'
     overall_status_description = None
     error_in_test_case_data = False
+    if reused is not None:
+        test_results = json.loads(reused.test_results or '[]')
+        overall_status = overall_status_description = reused.status
 
-    for test_case in test_cases:
+    for test_case in ([] if reused is not None else test_cases):
         try:
             # input_params/expected_output 需反序列化
             try:
@@ -171,6 +190,7 @@ def submit_solution():
                 'passed': passed,
                 'status': status_description,
                 'status_description': status_description,
+                'status_id': status_id,
                 'output': results.get('stdout'),
                 'error': results.get('stderr'),
                 'compile_output': results.get('compile_output'),
@@ -224,18 +244,32 @@ def submit_solution():
         overall_status = 'Error in test case data'
         overall_status_description = 'Error in test case data'
 
+    all_passed = all(result['passed'] for result in test_results)
     submission = Submission(
         candidate_id=candidate.id,
         problem_id=problem.id,
         code=data['code'],
         language=data['language'],
         status=overall_status,
-        test_results=json.dumps(safe_test_results)
+        test_results=safe_test_results,
+        llm_review_status=REVIEW_STATUS_PENDING if all_passed else None,
+        fingerprint=fingerprint,
+        problem_version=problem.version
     )
+    review_source = None
+    if reused is not None:
+        # 指向最初真正判题 / 评审的那次提交，而不是中间的复用记录
+        submission.verdict_reused_from_id = reused.verdict_reused_from_id or reused.id
+        if all_passed and review_is_complete(reused):
+            review_source = reused.review_reused_from_id or reused.id
+            submission.llm_review = reused.llm_review
+            submission.llm_review_status = REVIEW_STATUS_DONE
+            submission.llm_review_updated_at = datetime.now(UTC)
+            submission.review_reused_from_id = review_source
     db.session.add(submission)
     db.session.commit()
 
-    if all(result['passed'] for result in test_results):
+    if all_passed and review_source is None:
         generate_llm_review_async(submission.id)
 
     return jsonify({
@@ -245,33 +279,115 @@ def submit_solution():
             'problem_id': submission.problem_id,
             'status': submission.status,
             'status_description': overall_status_description,
-            'test_results': test_results
+            'test_results': test_results,
+            'reused_from': reused_from(submission)
         }
     }), 201
 
+# 列表接口可返回的字段及其需要加载的列；重字段只有在 fields= 显式请求时才会从数据库读取
+SUBMISSION_FIELDS = {
+    'id': (Submission.id,),
+    'candidate_id': (Submission.candidate_id,),
+    'problem_id': (Submission.problem_id,),
+    'language': (Submission.language,),
+    'submission_time': (Submission.submitted_at,),
+    'status': (Submission.status,),
+    'llm_review_status': (Submission.llm_review_status,),
+    'code': (Submission.code_hash, Submission.legacy_code),
+    'test_results': (Submission.legacy_test_results,),
+    'llm_review': (Submission.llm_review,),
+    'llm_review_error': (Submission.llm_review_error,),
+}
+HEAVY_SUBMISSION_FIELDS = ('code', 'test_results', 'llm_review', 'llm_review_error')
+DEFAULT_SUBMISSION_FIELDS = [name for name in SUBMISSION_FIELDS if name not in HEAVY_SUBMISSION_FIELDS]
+
+
+def parse_submission_fields(raw):
+    if not raw:
+        return DEFAULT_SUBMISSION_FIELDS
+    fields = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in SUBMISSION_FIELDS]
+    if unknown:
+        raise PaginationError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def serialize_submission(sub, fields, code_by_hash=None):
+    output = {}
+    for name in fields:
+        if name == 'submission_time':
+            output[name] = sub.submitted_at.isoformat() if sub.submitted_at else None
+        elif name == 'code' and code_by_hash is not None:
+            output[name] = code_by_hash.get(sub.code_hash) if sub.code_hash else sub.legacy_code
+        else:
+            output[name] = getattr(sub, name)
+    return output
+
+
 @submissions_bp.route('/submissions', methods=['GET'])
 def get_submissions():
-    # Add filtering capabilities later (e.g., by candidate_id, problem_id)
-    submissions = Submission.query.order_by(Submission.submitted_at.desc()).all()
-    output = []
-    for sub in submissions:
-        output.append({
-            'id': sub.id,
-            'candidate_id': sub.candidate_id,
-            'problem_id': sub.problem_id,
-            'language': sub.language,
-            'code': sub.code, # Consider if code should always be returned in list view
-            'submission_time': sub.submitted_at.isoformat(),
-            'status': sub.status,
-            'test_results': sub.test_results,
-            'llm_review': sub.llm_review
-        })
-    return jsonify({'submissions': output}), 200
+    """按提交时间倒序的游标分页列表，支持按候选人、题目、状态和时间范围过滤"""
+    args = request.args
+    try:
+        fields = parse_submission_fields(args.get('fields'))
+        limit = parse_limit(args.get('limit'))
+        since = parse_datetime(args.get('since'), 'since')
+        until = parse_datetime(args.get('until'), 'until')
+        cursor = decode_cursor(args['cursor']) if args.get('cursor') else None
+        if cursor is not None:
+            if len(cursor) != 2 or not isinstance(cursor[0], str) or not isinstance(cursor[1], int):
+                raise PaginationError('Invalid cursor')
+            cursor_time = parse_datetime(cursor[0], 'cursor')
+            if cursor_time is None:
+                raise PaginationError('Invalid cursor')
+        filters = {}
+        for name in ('candidate_id', 'problem_id'):
+            if args.get(name):
+                try:
+                    filters[name] = int(args[name])
+                except ValueError:
+                    raise PaginationError(f'{name} must be an integer')
+    except PaginationError as e:
+        return jsonify({'message': str(e)}), 400
 
-@submissions_bp.route('/submissions/<int:submission_id>', methods=['GET'])
-def get_submission(submission_id):
-    submission = Submission.query.get_or_404(submission_id)
+    # 只加载请求的列，id 和 submitted_at 用于排序和生成游标
+    columns = {column for name in fields for column in SUBMISSION_FIELDS[name]} | {Submission.id, Submission.submitted_at}
+    query = Submission.query.options(load_only(*columns, raiseload=True))
+    if 'test_results' in fields:
+        query = query.options(selectinload(Submission.results))
+
+    for name, value in filters.items():
+        query = query.filter(getattr(Submission, name) == value)
+    if args.get('status'):
+        query = query.filter(Submission.status == args['status'])
+    if since:
+        query = query.filter(Submission.submitted_at >= since)
+    if until:
+        query = query.filter(Submission.submitted_at < until)
+    if cursor is not None:
+        query = query.filter(or_(
+            Submission.submitted_at < cursor_time,
+            and_(Submission.submitted_at == cursor_time, Submission.id < cursor[1]),
+        ))
+
+    # 多取一行用来判断是否还有下一页
+    rows = query.order_by(Submission.submitted_at.desc(), Submission.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].submitted_at, rows[-1].id)
+
+    # 整页源码一次查询取出，避免逐条读取并解压 blob
+    code_by_hash = None
+    if 'code' in fields:
+        code_by_hash = blob_store.get_many_text(sub.code_hash for sub in rows if sub.code_hash)
     return jsonify({
+        'submissions': [serialize_submission(sub, fields, code_by_hash) for sub in rows],
+        'next_cursor': next_cursor
+    }), 200
+
+def submission_detail(submission):
+    return {
         'id': submission.id,
         'candidate_id': submission.candidate_id,
         'problem_id': submission.problem_id,
@@ -280,8 +396,68 @@ def get_submission(submission_id):
         'submission_time': submission.submitted_at.isoformat(),
         'status': submission.status,
         'test_results': submission.test_results,
-        'llm_review': submission.llm_review
-    }), 200
+        'llm_review': submission.llm_review,
+        'llm_review_status': submission.llm_review_status,
+        'llm_review_error': submission.llm_review_error,
+        'reused_from': reused_from(submission)
+    }
+
+@submissions_bp.route('/submissions/<int:submission_id>', methods=['GET'])
+def get_submission(submission_id):
+    submission = db.session.get(Submission, submission_id)
+    if submission is None:
+        # 已归档的提交从归档库读取，响应中带 archived: true
+        archived = get_archived_submission(submission_id)
+        if archived is None:
+            abort(404)
+        return jsonify(archived), 200
+    return jsonify(submission_detail(submission)), 200
+
+@submissions_bp.route('/submissions/archive', methods=['POST'])
+def archive_old_submissions():
+    """
+    后台把旧提交移到归档库，进度通过 /api/jobs/<id> 查询。
+    可选参数 older_than_days 和 candidate_ids（例如已结束批次的候选人），都不给时按 SUBMISSION_RETENTION_DAYS 归档。
+    """
+    data = request.get_json(silent=True) or {}
+    older_than_days = data.get('older_than_days')
+    candidate_ids = data.get('candidate_ids') or []
+    if older_than_days is not None and (not isinstance(older_than_days, int) or isinstance(older_than_days, bool)
+                                        or older_than_days < 0):
+        return jsonify({'message': 'older_than_days must be a non-negative integer'}), 400
+    if not isinstance(candidate_ids, list) or not all(isinstance(cid, int) for cid in candidate_ids):
+        return jsonify({'message': 'candidate_ids must be a list of integers'}), 400
+    job = jobs.submit('submission_archive', archive_submissions_job, older_than_days, candidate_ids)
+    response = jsonify({'message': 'Archiving started', 'job': job.to_dict()})
+    response.headers['Location'] = f"/api/jobs/{job.id}"
+    return response, 202
+
+@submissions_bp.route('/submissions/<int:submission_id>/similar', methods=['GET'])
+def get_similar_submissions(submission_id):
+    """通过 MinHash/LSH 索引查找其他候选人的相似提交"""
+    try:
+        min_similarity = float(request.args.get('min_similarity', 0.5))
+        limit = parse_limit(request.args.get('limit'), default=20)
+    except (ValueError, PaginationError) as e:
+        return jsonify({'message': str(e) if isinstance(e, PaginationError) else 'min_similarity must be a number'}), 400
+    include_same_candidate = request.args.get('include_same_candidate', 'false').lower() in ('1', 'true', 'yes')
+
+    matches = find_similar(submission_id, min_similarity=min_similarity, limit=limit,
+                           include_same_candidate=include_same_candidate)
+    if matches is None:
+        if db.session.get(Submission, submission_id) is None:
+            return jsonify({'message': 'Submission not found'}), 404
+        # 代码为空或提交早于索引上线且尚未回填
+        return jsonify({'submission_id': submission_id, 'indexed': False, 'similar': []}), 200
+    return jsonify({'submission_id': submission_id, 'indexed': True, 'similar': matches}), 200
+
+@submissions_bp.route('/submissions/similarity/backfill', methods=['POST'])
+def backfill_similarity_index():
+    """后台为历史提交建立相似度索引，进度通过 /api/jobs/<id> 查询"""
+    job = jobs.submit('similarity_backfill', backfill_signatures_job)
+    response = jsonify({'message': 'Backfill started', 'job': job.to_dict()})
+    response.headers['Location'] = f"/api/jobs/{job.id}"
+    return response, 202
 
 @submissions_bp.route('/submissions/candidate/<int:candidate_id>/problem/<int:problem_id>', methods=['GET'])
 def get_submissions_by_candidate_problem(candidate_id, problem_id):
@@ -305,6 +481,30 @@ def get_submissions_by_candidate_problem(candidate_id, problem_id):
             'submission_time': sub.submitted_at.isoformat(),
             'status': sub.status,
             'test_results': sub.test_results,
-            'llm_review': sub.llm_review
+            'llm_review': sub.llm_review,
+            'llm_review_status': sub.llm_review_status
         })
     return jsonify({'submissions': output}), 200
+
+@submissions_bp.route('/submissions/candidate/<int:candidate_id>/problem/<int:problem_id>/<any(latest, best):which>', methods=['GET'])
+def get_pointed_submission(candidate_id, problem_id, which):
+    """通过 latest_submissions 指针直接取最新或最佳的一次提交"""
+    pointer = get_pointer(candidate_id, problem_id)
+    submission = None
+    if pointer is not None:
+        attempts, best_status = pointer.attempts, pointer.best_status
+        submission = db.session.get(Submission, getattr(pointer, f'{which}_submission_id'))
+        if submission is None:
+            # 指向的提交已被删除：只在内存里按提交历史重新计算这一对的指针，GET 不写库；
+            # 持久化的指针由 flask submissions rebuild-latest 修复
+            row = compute_pointers(candidate_id=candidate_id, problem_id=problem_id)[0].get((candidate_id, problem_id))
+            if row is not None:
+                attempts, best_status = row['attempts'], row['best_status']
+                submission = db.session.get(Submission, row[f'{which}_submission_id'])
+    if submission is None:
+        return jsonify({'message': 'No submissions found for this candidate and problem'}), 404
+    return jsonify({
+        'submission': submission_detail(submission),
+        'attempts': attempts,
+        'best_status': best_status
+    }), 200
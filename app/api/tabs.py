@@ -1,6 +1,7 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from app import db
 from app.models import Candidate, Problem, CandidateProblemTab
+from app.services.workspace import load_workspace, workspace_etag
 
 tabs_bp = Blueprint('tabs_bp', __name__, url_prefix='/api')
 
@@ -61,6 +62,24 @@ def get_candidate_tabs(candidate_id):
         } for tab in tabs]
     })
 
+@tabs_bp.route('/candidates/<int:candidate_id>/workspace', methods=['GET'])
+def get_candidate_workspace(candidate_id):
+    """一次返回候选人的全部标签页、题目、测试用例和每道题的最新提交"""
+    candidate = db.session.get(Candidate, candidate_id)
+    if not candidate:
+        return jsonify({'message': 'Candidate not found'}), 404
+
+    # 先用一条查询生成 ETag，客户端带 If-None-Match 且未变化时直接返回 304，不加载工作区
+    etag = workspace_etag(candidate)
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(load_workspace(candidate))
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
 @tabs_bp.route('/candidates/<int:candidate_id>/tabs', methods=['PUT'])
 def update_tab_order(candidate_id):
     candidate = db.session.get(Candidate, candidate_id)
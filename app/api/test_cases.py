@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from app import db
 from app.models import Problem, TestCase
+from app.services.deletion import delete_test_case_dependents
+from app.services.problem_cache import bump_problem_versions, cached_json_response, problem_stamp
 
 test_cases_bp = Blueprint('test_cases_bp', __name__, url_prefix='/api')
 
@@ -33,18 +35,102 @@ def create_test_case(problem_id):
 
 @test_cases_bp.route('/problems/<int:problem_id>/testcases', methods=['GET'])
 def get_test_cases(problem_id):
-    problem = Problem.query.get(problem_id)
+    stamp = problem_stamp(problem_id)
+    if stamp is None:
+        return jsonify({'message': 'Problem not found'}), 404
+    version, last_modified = stamp
+
+    def build():
+        test_cases = TestCase.query.filter_by(problem_id=problem_id).order_by(TestCase.id).all()
+        return {
+            'test_cases': [{
+                'id': tc.id,
+                'problem_id': tc.problem_id,
+                'input_params': tc.input_params,
+                'expected_output': tc.expected_output
+            } for tc in test_cases]
+        }
+
+    return cached_json_response(('testcases', problem_id), f'testcases-{problem_id}-v{version}', last_modified, build)
+
+@test_cases_bp.route('/problems/<int:problem_id>/testcases', methods=['PUT'])
+def replace_test_cases(problem_id):
+    """
+    用请求中的完整列表替换题目的测试用例，在一个事务里按差异批量插入、更新和删除。
+    带有本题已有整数 id 的项更新，没有 id（或是前端的临时 id）的项插入，未出现的已有用例删除。
+    返回的 test_cases 与请求顺序一致。
+    """
+    problem = db.session.get(Problem, problem_id)
     if not problem:
         return jsonify({'message': 'Problem not found'}), 404
-    
-    test_cases = TestCase.query.filter_by(problem_id=problem_id).all()
+
+    data = request.get_json(silent=True)
+    items = data.get('test_cases') if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return jsonify({'message': 'Expected a list of test cases'}), 400
+
+    existing = {
+        row.id: row for row in db.session.execute(
+            db.select(TestCase.id, TestCase.input_params, TestCase.expected_output)
+            .where(TestCase.problem_id == problem_id)
+        )
+    }
+
+    updates, inserts, kept = [], [], set()
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or 'input_params' not in item or 'expected_output' not in item:
+            return jsonify({'message': f'Missing required fields in test case {index}'}), 400
+        # 两个字段都是 JSON 字符串，列表或对象会在批量写入时出错
+        if not isinstance(item['input_params'], str) or not isinstance(item['expected_output'], str):
+            return jsonify({'message': f'input_params and expected_output must be strings in test case {index}'}), 400
+        test_case_id = item.get('id')
+        if isinstance(test_case_id, int) and not isinstance(test_case_id, bool):
+            if test_case_id not in existing:
+                return jsonify({'message': f'Test case {test_case_id} does not belong to this problem'}), 400
+            if test_case_id in kept:
+                return jsonify({'message': f'Duplicate test case id {test_case_id}'}), 400
+            kept.add(test_case_id)
+            row = existing[test_case_id]
+            if (row.input_params, row.expected_output) != (item['input_params'], item['expected_output']):
+                updates.append({'id': test_case_id, 'input_params': item['input_params'],
+                                'expected_output': item['expected_output']})
+        else:
+            inserts.append({'problem_id': problem_id, 'input_params': item['input_params'],
+                            'expected_output': item['expected_output']})
+    deleted_ids = [test_case_id for test_case_id in existing if test_case_id not in kept]
+
+    if deleted_ids:
+        delete_test_case_dependents(deleted_ids)
+        db.session.execute(db.delete(TestCase).where(TestCase.id.in_(deleted_ids)))
+    if updates:
+        db.session.execute(db.update(TestCase), updates)
+    new_ids = []
+    if inserts:
+        new_ids = db.session.scalars(
+            db.insert(TestCase).returning(TestCase.id, sort_by_parameter_order=True), inserts
+        ).all()
+    if deleted_ids or updates or inserts:
+        # 上面的批量语句不经过 ORM 事件，需要手动更新题目版本号
+        bump_problem_versions(db.session, [problem_id])
+    db.session.commit()
+
+    new_ids = iter(new_ids)
+    output = []
+    for item in items:
+        test_case_id = item.get('id')
+        if not isinstance(test_case_id, int) or isinstance(test_case_id, bool):
+            test_case_id = next(new_ids)
+        output.append({
+            'id': test_case_id,
+            'problem_id': problem_id,
+            'input_params': item['input_params'],
+            'expected_output': item['expected_output']
+        })
     return jsonify({
-        'test_cases': [{
-            'id': tc.id,
-            'problem_id': tc.problem_id,
-            'input_params': tc.input_params,
-            'expected_output': tc.expected_output
-        } for tc in test_cases]
+        'test_cases': output,
+        'created': len(inserts),
+        'updated': len(updates),
+        'deleted': len(deleted_ids)
     })
 
 @test_cases_bp.route('/testcases/<int:test_case_id>', methods=['GET'])
@@ -92,6 +178,7 @@ def delete_test_case(test_case_id):
     if not test_case:
         return jsonify({'message': 'Test case not found'}), 404
     
+    delete_test_case_dependents([test_case.id])
     db.session.delete(test_case)
     db.session.commit()
     
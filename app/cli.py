@@ -0,0 +1,122 @@
+import click
+from flask.cli import AppGroup
+
+reviews_cli = AppGroup('reviews', help='LLM review maintenance commands.')
+
+
+@reviews_cli.command('recover')
+@click.option('--stale-after', type=float, default=None, help='Seconds without progress before a review counts as interrupted.')
+def recover_reviews(stale_after):
+    """Restart LLM reviews interrupted by a crashed worker."""
+    from app.services.llm_service import recover_interrupted_reviews
+    restarted = recover_interrupted_reviews(stale_after=stale_after)
+    click.echo(f"Restarted {len(restarted)} interrupted review(s).")
+
+
+submissions_cli = AppGroup('submissions', help='Submission storage maintenance commands.')
+
+
+@submissions_cli.command('migrate-code')
+@click.option('--batch-size', type=int, default=500, show_default=True)
+def migrate_code(batch_size):
+    """Move plain-text submission code into the compressed blob store."""
+    from app.services.blob_store import migrate_legacy_code
+    migrated = migrate_legacy_code(batch_size=batch_size)
+    click.echo(f"Migrated code of {migrated} submission(s).")
+
+
+@submissions_cli.command('migrate-test-results')
+@click.option('--batch-size', type=int, default=200, show_default=True)
+def migrate_test_results(batch_size):
+    """Split JSON test results into submission_test_results rows."""
+    from app.services.judge_results import migrate_legacy_test_results
+    migrated = migrate_legacy_test_results(batch_size=batch_size)
+    click.echo(f"Migrated test results of {migrated} submission(s).")
+
+
+@submissions_cli.command('rebuild-latest')
+@click.option('--batch-size', type=int, default=1000, show_default=True)
+def rebuild_latest(batch_size):
+    """Recompute the latest/best submission pointers from submission history."""
+    from app.services.latest_submissions import rebuild_latest_submissions
+    processed = rebuild_latest_submissions(batch_size=batch_size)
+    click.echo(f"Rebuilt latest submission pointers from {processed} submission(s).")
+
+
+@submissions_cli.command('index-similarity')
+@click.option('--batch-size', type=int, default=200, show_default=True)
+def index_similarity(batch_size):
+    """Compute MinHash signatures for submissions that are not indexed yet."""
+    from app.services.code_similarity import backfill_signatures
+    result = backfill_signatures(batch_size=batch_size)
+    click.echo(f"Indexed {result['indexed']} submission(s), skipped {result['skipped']} without code.")
+
+
+@submissions_cli.command('archive')
+@click.option('--older-than-days', type=int, default=None,
+              help='Archive submissions older than this (default: SUBMISSION_RETENTION_DAYS).')
+@click.option('--candidate-id', 'candidate_ids', type=int, multiple=True,
+              help='Archive all submissions of this candidate, e.g. from a closed hiring round.')
+@click.option('--batch-size', type=int, default=200, show_default=True)
+def archive(older_than_days, candidate_ids, batch_size):
+    """Move old submissions into the compressed archive database."""
+    from app.services.submission_archive import archive_submissions
+    result = archive_submissions(older_than_days=older_than_days, candidate_ids=candidate_ids,
+                                 batch_size=batch_size)
+    click.echo(f"Archived {result['archived']} submission(s).")
+
+
+stats_cli = AppGroup('stats', help='Problem statistics maintenance commands.')
+
+
+@stats_cli.command('rebuild')
+@click.option('--problem-id', type=int, default=None, help='Only rebuild statistics of this problem.')
+@click.option('--batch-size', type=int, default=500, show_default=True)
+def rebuild_stats(problem_id, batch_size):
+    """Recompute problem and test case statistics from submission history."""
+    from app.services.problem_stats import rebuild_problem_stats
+    processed = rebuild_problem_stats(problem_id=problem_id, batch_size=batch_size)
+    click.echo(f"Rebuilt statistics from {processed} submission(s).")
+
+
+search_cli = AppGroup('search', help='Problem search index commands.')
+
+
+@search_cli.command('rebuild')
+def rebuild_search():
+    """Create the full-text index if missing and rebuild it from the problems table."""
+    from app.services.problem_search import rebuild_search_index
+    rebuild_search_index()
+    click.echo('Rebuilt the problem search index.')
+
+
+@click.command('check-query-plans')
+def check_query_plans_command():
+    """Fail if a hot query falls back to a full table scan."""
+    from app.services.query_plans import check_query_plans
+    failed = False
+    for name, result in check_query_plans().items():
+        status = 'FAIL' if result['problems'] else 'ok'
+        click.echo(f"[{status}] {name}")
+        for detail in result['plan']:
+            click.echo(f"    {detail}")
+        failed = failed or bool(result['problems'])
+    if failed:
+        raise click.ClickException('Some hot queries are not served by an index.')
+
+
+@click.command('purge-deleted')
+def purge_deleted_command():
+    """Finish purging soft-deleted candidates and problems (e.g. after a crash mid-purge)."""
+    from app.services.deletion import purge_soft_deleted
+    result = purge_soft_deleted()
+    click.echo(f"Purged {result['candidates']} candidates and {result['problems']} problems.")
+
+
+def register_cli(app):
+    app.cli.add_command(reviews_cli)
+    app.cli.add_command(submissions_cli)
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(check_query_plans_command)
+    app.cli.add_command(purge_deleted_command)
@@ -12,9 +12,39 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JUDGE0_API_URL = os.environ.get('JUDGE0_API_URL') or 'http://localhost:2358'
     JUDGE0_API_KEY = os.environ.get('JUDGE0_API_KEY') # Optional, leave empty if not used
+    DEEPSEEK_API_URL = os.environ.get('DEEPSEEK_API_URL') or 'https://api.deepseek.com'
+    # Restart LLM reviews interrupted by a crashed worker (checked in a background thread)
+    LLM_REVIEW_RECOVERY_ENABLED = os.environ.get('LLM_REVIEW_RECOVERY_ENABLED', 'true').lower() == 'true'
+    # Settings are cached per process; this file carries the version stamp that tells other workers to reload
+    SETTINGS_VERSION_FILE = os.environ.get('SETTINGS_VERSION_FILE') or \
+        os.path.join(basedir, '..', 'instance', 'settings.version')
+    SETTINGS_CACHE_CHECK_INTERVAL = float(os.environ.get('SETTINGS_CACHE_CHECK_INTERVAL') or 1.0)
+    # WAL, tuned pragmas and in-process write serialization for file-based SQLite (see app/services/sqlite_profile.py)
+    SQLITE_PRODUCTION_PROFILE = os.environ.get('SQLITE_PRODUCTION_PROFILE', 'true').lower() == 'true'
+    SQLITE_SERIALIZE_WRITES = True
+    SQLITE_PRAGMAS = {}  # Overrides for DEFAULT_SQLITE_PRAGMAS, e.g. {'busy_timeout': 10000}
+    # Background jobs (e.g. problem imports) run in threads; inline mode runs them inside the request
+    JOBS_RUN_INLINE = False
+    # Processes used to hash passwords in POST /api/candidates/bulk (0 = one per CPU core, 1 = hash in the request thread)
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or 0)
+    BULK_CANDIDATE_MAX_ROWS = 5000
+    # Seconds a logged-in candidate is served from the signed session snapshot / per-process cache without a query
+    IDENTITY_CACHE_TTL = float(os.environ.get('IDENTITY_CACHE_TTL') or 60)
+    # Deleted candidates/problems are purged in batches of this many submissions, pausing between batches
+    DELETION_BATCH_SIZE = 200
+    DELETION_BATCH_PAUSE = 0.05
+    # Submissions older than this are moved to the archive database by `flask submissions archive`
+    SUBMISSION_RETENTION_DAYS = int(os.environ.get('SUBMISSION_RETENTION_DAYS') or 365)
+    SUBMISSION_ARCHIVE_PATH = os.environ.get('SUBMISSION_ARCHIVE_PATH')  # default: instance/submission_archive.db
 
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     # SQLALCHEMY_ECHO = True # Optional: for debugging SQL queries
     WTF_CSRF_ENABLED = False # Disable CSRF for testing forms if any
+    LLM_REVIEW_RECOVERY_ENABLED = False
+    SETTINGS_VERSION_FILE = None
+    JOBS_RUN_INLINE = True
+    PASSWORD_HASH_WORKERS = 1
+    DELETION_BATCH_PAUSE = 0
+    SQLITE_PRODUCTION_PROFILE = False
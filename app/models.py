@@ -2,6 +2,14 @@ from app import db
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 from datetime import datetime, UTC
+import json
+import unicodedata
+from sqlalchemy.orm import validates
+
+
+def search_key(value):
+    """不区分大小写的前缀搜索键：NFC 规范化后 casefold。SQLite 的 lower() 只处理 ASCII，所以在 Python 中计算"""
+    return unicodedata.normalize('NFC', value).casefold() if value is not None else None
 
 class Candidate(UserMixin, db.Model):
     __tablename__ = 'candidates'
@@ -10,10 +18,27 @@ class Candidate(UserMixin, db.Model):
     email = db.Column(db.Text, nullable=False, unique=True) # Assuming email is also required and unique
     password_hash = db.Column(db.String(128))
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC))
+    # 软删除时间，之后由后台任务分批清理，见 app/services/deletion.py
+    deleted_at = db.Column(db.DateTime)
+    # 姓名和邮箱的搜索键（search_key），随 name / email 赋值自动更新
+    name_search = db.Column(db.Text)
+    email_search = db.Column(db.Text)
+
+    # 候选人列表按时间倒序分页，侧边栏按姓名或邮箱前缀（不区分大小写）搜索
+    __table_args__ = (
+        db.Index('ix_candidates_created_at_id', 'created_at', 'id'),
+        db.Index('ix_candidates_name_search_id', 'name_search', 'id'),
+        db.Index('ix_candidates_email_search', 'email_search'),
+    )
 
     submissions = db.relationship('Submission', backref='candidate', lazy='dynamic')
     tabs = db.relationship('CandidateProblemTab', backref='candidate', lazy='dynamic', cascade='all, delete-orphan')
 
+    @validates('name', 'email')
+    def _update_search_key(self, key, value):
+        setattr(self, f'{key}_search', search_key(value))
+        return value
+
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
 
@@ -31,6 +56,10 @@ class Problem(db.Model):
     llm_prompt = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC))
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
+    # 题目或其测试用例每次修改都加一，用作 HTTP 缓存的版本号，见 app/services/problem_cache.py
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    # 软删除时间，之后由后台任务分批清理，见 app/services/deletion.py
+    deleted_at = db.Column(db.DateTime)
 
     test_cases = db.relationship('TestCase', backref='problem', lazy='dynamic', cascade='all, delete-orphan')
     submissions = db.relationship('Submission', backref='problem', lazy='dynamic')
@@ -44,17 +73,187 @@ class TestCase(db.Model):
     expected_output = db.Column(db.Text)  # JSON string
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC))
 
+    __table_args__ = (db.Index('ix_test_cases_problem_id', 'problem_id'),)
+
 class Submission(db.Model):
     __tablename__ = 'submissions'
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     candidate_id = db.Column(db.Integer, db.ForeignKey('candidates.id', ondelete='CASCADE'), nullable=False)
     problem_id = db.Column(db.Integer, db.ForeignKey('problems.id', ondelete='CASCADE'), nullable=False)
     language = db.Column(db.Text)
-    code = db.Column(db.Text)
-    test_results = db.Column(db.Text)  # JSON string
+    # 源码存放在 blobs 表中，这里只保存内容哈希；legacy_code 是迁移前写入的明文，
+    # 运行 flask submissions migrate-code 后会被清空
+    code_hash = db.Column(db.String(64), db.ForeignKey('blobs.hash'), index=True)
+    legacy_code = db.Column('code', db.Text)
+    # 每个测试用例的结果保存在 submission_test_results 表；legacy_test_results 是迁移前的 JSON 文本
+    legacy_test_results = db.Column('test_results', db.Text)
     llm_review = db.Column(db.Text)
+    llm_review_status = db.Column(db.String(20))  # pending / streaming / done / failed, None if no review was requested
+    llm_review_error = db.Column(db.Text)
+    llm_review_attempts = db.Column(db.Integer, default=0, nullable=False)
+    llm_review_updated_at = db.Column(db.DateTime)
     status = db.Column(db.String(50))  # To store overall status like 'Accepted', 'Wrong Answer', etc.
     submitted_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC))
+    # 规范化源码的指纹（见 app.services.code_fingerprint）以及判题时题目的版本号
+    fingerprint = db.Column(db.String(64))
+    problem_version = db.Column(db.Integer)
+    # 判题结果或评审是从哪次提交复用的，为空表示本次真正执行过
+    verdict_reused_from_id = db.Column(db.Integer, db.ForeignKey('submissions.id', ondelete='SET NULL'))
+    review_reused_from_id = db.Column(db.Integer, db.ForeignKey('submissions.id', ondelete='SET NULL'))
+
+    __table_args__ = (
+        db.Index('ix_submissions_candidate_problem_submitted', 'candidate_id', 'problem_id', 'submitted_at'),
+        db.Index('ix_submissions_candidate_problem_fingerprint', 'candidate_id', 'problem_id', 'fingerprint'),
+        db.Index('ix_submissions_submitted_at_id', 'submitted_at', 'id'),
+        # 归档或清理删除了 id 最大的提交后，SQLite 也不会把这些 id 分配给新提交
+        {'sqlite_autoincrement': True},
+    )
+
+    results = db.relationship('SubmissionTestResult', backref='submission', lazy='select',
+                              order_by='SubmissionTestResult.position', cascade='all, delete-orphan')
+
+    _pending_code = None
+
+    @property
+    def test_results(self):
+        """兼容旧接口的 JSON 字符串；被截断的完整输出一次查询取出"""
+        if self.results:
+            digests = [digest for result in self.results for digest in result.blob_hashes()]
+            texts = {}
+            if digests:
+                from app.services.blob_store import blob_store
+                texts = blob_store.get_many_text(digests)
+            return json.dumps([result.to_result(texts=texts) for result in self.results])
+        return self.legacy_test_results
+
+    @test_results.setter
+    def test_results(self, value):
+        if isinstance(value, str):
+            value = json.loads(value)
+        self.legacy_test_results = None
+        self.results = [SubmissionTestResult.from_result(position, result)
+                        for position, result in enumerate(value or [])]
+
+    @property
+    def code(self):
+        """按需从 blob 中解压源码"""
+        if self._pending_code is not None:
+            return self._pending_code
+        if self.code_hash:
+            from app.services.blob_store import blob_store
+            return blob_store.get_text(self.code_hash)
+        return self.legacy_code
+
+    @code.setter
+    def code(self, value):
+        from app.services.blob_store import content_hash
+        self.legacy_code = None
+        if value is None:
+            self.code_hash = None
+            self._pending_code = None
+        else:
+            self.code_hash = content_hash(value.encode('utf-8'))
+            self._pending_code = value
+
+class SubmissionTestResult(db.Model):
+    """单个测试用例的评测结果；过长的输出只保留前 OUTPUT_PREVIEW_CHARS 个字符，完整内容存入 blob"""
+    __tablename__ = 'submission_test_results'
+    OUTPUT_PREVIEW_CHARS = 1024
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    submission_id = db.Column(db.Integer, db.ForeignKey('submissions.id', ondelete='CASCADE'), nullable=False)
+    test_case_id = db.Column(db.Integer, db.ForeignKey('test_cases.id', ondelete='SET NULL'))
+    position = db.Column(db.Integer, nullable=False)  # order within the submission
+    passed = db.Column(db.Boolean, nullable=False, default=False)
+    status_id = db.Column(db.Integer)  # Judge0 status id, None when the case never ran
+    status = db.Column(db.String(100))
+    status_description = db.Column(db.String(255))  # only stored when it differs from status
+    time = db.Column(db.Float)  # seconds
+    memory = db.Column(db.Integer)  # KB
+    output = db.Column(db.Text)
+    output_hash = db.Column(db.String(64), db.ForeignKey('blobs.hash'))
+    error = db.Column(db.Text)
+    error_hash = db.Column(db.String(64), db.ForeignKey('blobs.hash'))
+    compile_output = db.Column(db.Text)
+    compile_output_hash = db.Column(db.String(64), db.ForeignKey('blobs.hash'))
+
+    __table_args__ = (
+        db.Index('ix_submission_test_results_submission', 'submission_id', 'position'),
+        db.Index('ix_submission_test_results_test_case', 'test_case_id'),
+        # 清理提交时检查 blob 是否仍被引用；绝大多数输出不超长，部分索引很小
+        *(db.Index(f'ix_submission_test_results_{field}_hash', f'{field}_hash',
+                   sqlite_where=db.text(f'{field}_hash IS NOT NULL'))
+          for field in ('output', 'error', 'compile_output')),
+    )
+
+    _pending_blobs = ()
+    TEXT_FIELDS = ('output', 'error', 'compile_output')
+
+    @staticmethod
+    def _number(value, cast):
+        try:
+            return cast(value) if value is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    @classmethod
+    def from_result(cls, position, result):
+        """由 submit_solution 生成的结果字典构造"""
+        status = result.get('status') or result.get('status_description')
+        description = result.get('status_description')
+        row = cls(
+            position=position,
+            test_case_id=result.get('test_case_id'),
+            passed=bool(result.get('passed')),
+            status_id=cls._number(result.get('status_id'), int),
+            status=status,
+            status_description=description if description != status else None,
+            time=cls._number(result.get('time'), float),
+            memory=cls._number(result.get('memory'), int)
+        )
+        pending = []
+        for field in cls.TEXT_FIELDS:
+            text = result.get(field)
+            if text is not None and not isinstance(text, str):
+                text = str(text)
+            if text is not None and len(text) > cls.OUTPUT_PREVIEW_CHARS:
+                from app.services.blob_store import content_hash
+                setattr(row, f'{field}_hash', content_hash(text.encode('utf-8')))
+                pending.append(text)
+                text = text[:cls.OUTPUT_PREVIEW_CHARS]
+            setattr(row, field, text)
+        row._pending_blobs = pending
+        return row
+
+    def blob_hashes(self):
+        """被截断字段的完整内容所在的 blob"""
+        return [digest for digest in (getattr(self, f'{field}_hash') for field in self.TEXT_FIELDS) if digest]
+
+    def full_text(self, field, texts=None):
+        """未截断的文本，必要时从 blob 读取；texts 是预先批量取出的 {哈希: 文本}"""
+        digest = getattr(self, f'{field}_hash')
+        if digest:
+            if texts is not None and digest in texts:
+                return texts[digest]
+            from app.services.blob_store import blob_store
+            return blob_store.get_text(digest)
+        return getattr(self, field)
+
+    def to_result(self, full=True, texts=None):
+        result = {
+            'test_case_id': self.test_case_id,
+            'passed': self.passed,
+            'status': self.status,
+            'status_description': self.status_description or self.status,
+            'status_id': self.status_id,
+            'time': self.time,
+            'memory': self.memory
+        }
+        for field in self.TEXT_FIELDS:
+            result[field] = self.full_text(field, texts) if full else getattr(self, field)
+            if not full:
+                result[f'{field}_truncated'] = getattr(self, f'{field}_hash') is not None
+        return result
 
 class CandidateProblemTab(db.Model):
     __tablename__ = 'candidate_problem_tabs'
@@ -63,7 +262,103 @@ class CandidateProblemTab(db.Model):
     problem_id = db.Column(db.Integer, db.ForeignKey('problems.id', ondelete='CASCADE'), nullable=False)
     tab_order = db.Column(db.Integer)
 
-    __table_args__ = (db.UniqueConstraint('candidate_id', 'problem_id', name='_candidate_problem_uc'),)
+    __table_args__ = (
+        db.UniqueConstraint('candidate_id', 'problem_id', name='_candidate_problem_uc'),
+        db.Index('ix_candidate_problem_tabs_candidate_order', 'candidate_id', 'tab_order'),
+    )
+
+class CandidateSessionReview(db.Model):
+    """批量评审生成的会话总结，每次生成保存一行，接口返回最新的一行"""
+    __tablename__ = 'candidate_session_reviews'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    candidate_id = db.Column(db.Integer, db.ForeignKey('candidates.id', ondelete='CASCADE'), nullable=False)
+    review = db.Column(db.Text, nullable=False)
+    submission_ids = db.Column(db.Text)  # JSON 数组：参与总结的提交
+    model = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC))
+
+    __table_args__ = (
+        db.Index('ix_candidate_session_reviews_candidate_id', 'candidate_id', 'id'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'candidate_id': self.candidate_id,
+            'review': self.review,
+            'submission_ids': json.loads(self.submission_ids) if self.submission_ids else [],
+            'model': self.model,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class Blob(db.Model):
+    """按内容哈希去重的压缩数据，见 app/services/blob_store.py"""
+    __tablename__ = 'blobs'
+    hash = db.Column(db.String(64), primary_key=True)  # sha256 hex of the uncompressed content
+    compression = db.Column(db.String(10), nullable=False)  # none / zlib / zstd
+    size = db.Column(db.Integer, nullable=False)  # uncompressed bytes
+    data = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC))
+
+class LatestSubmission(db.Model):
+    """每个候选人和题目的最新、最佳提交指针，随提交在同一事务中更新，见 app/services/latest_submissions.py"""
+    __tablename__ = 'latest_submissions'
+    candidate_id = db.Column(db.Integer, db.ForeignKey('candidates.id', ondelete='CASCADE'), primary_key=True)
+    problem_id = db.Column(db.Integer, db.ForeignKey('problems.id', ondelete='CASCADE'), primary_key=True)
+    latest_submission_id = db.Column(db.Integer, db.ForeignKey('submissions.id', ondelete='SET NULL'))
+    # 最佳提交：通过的优先，其次是通过的测试用例多的，相同时保留较早的一次
+    best_submission_id = db.Column(db.Integer, db.ForeignKey('submissions.id', ondelete='SET NULL'))
+    best_status = db.Column(db.String(50))
+    best_accepted = db.Column(db.Boolean, nullable=False, default=False)
+    best_passed = db.Column(db.Integer, nullable=False, default=0)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
+
+class SubmissionSignature(db.Model):
+    """提交源码的 MinHash 签名，用于查找相似代码，见 app/services/code_similarity.py"""
+    __tablename__ = 'submission_signatures'
+    submission_id = db.Column(db.Integer, db.ForeignKey('submissions.id', ondelete='CASCADE'), primary_key=True)
+    language = db.Column(db.Text)
+    signature = db.Column(db.LargeBinary, nullable=False)  # NUM_PERM 个小端 uint64
+    shingle_count = db.Column(db.Integer, nullable=False)
+
+    submission = db.relationship('Submission', backref=db.backref('signature', uselist=False, cascade='all, delete-orphan'))
+
+class SubmissionLshBucket(db.Model):
+    """LSH 分桶：签名的每个 band 哈希到一个桶，同桶的提交是相似候选"""
+    __tablename__ = 'submission_lsh_buckets'
+    band = db.Column(db.Integer, primary_key=True)
+    bucket = db.Column(db.String(16), primary_key=True)
+    submission_id = db.Column(db.Integer, db.ForeignKey('submissions.id', ondelete='CASCADE'), primary_key=True)
+
+    __table_args__ = (db.Index('ix_submission_lsh_buckets_submission', 'submission_id'),)
+
+    submission = db.relationship('Submission', backref=db.backref('lsh_buckets', cascade='all, delete-orphan'))
+
+class ProblemStats(db.Model):
+    """按题目汇总的提交统计，随每次提交在同一事务中增量更新，见 app/services/problem_stats.py"""
+    __tablename__ = 'problem_stats'
+    problem_id = db.Column(db.Integer, db.ForeignKey('problems.id', ondelete='CASCADE'), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    accepted = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
+
+class ProblemStatBucket(db.Model):
+    """通过的提交的运行时间/内存直方图，用于估算中位数"""
+    __tablename__ = 'problem_stat_buckets'
+    problem_id = db.Column(db.Integer, db.ForeignKey('problems.id', ondelete='CASCADE'), primary_key=True)
+    metric = db.Column(db.String(10), primary_key=True)  # runtime / memory
+    bucket = db.Column(db.Integer, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class TestCaseStats(db.Model):
+    __tablename__ = 'test_case_stats'
+    test_case_id = db.Column(db.Integer, db.ForeignKey('test_cases.id', ondelete='CASCADE'), primary_key=True)
+    problem_id = db.Column(db.Integer, db.ForeignKey('problems.id', ondelete='CASCADE'), nullable=False)
+    runs = db.Column(db.Integer, nullable=False, default=0)
+    failures = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (db.Index('ix_test_case_stats_problem_failures', 'problem_id', 'failures'),)
 
 class Setting(db.Model):
     __tablename__ = 'settings'
@@ -0,0 +1,212 @@
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, List, Iterator, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import func
+
+from app import db
+from app.models import CandidateSessionReview, Submission, Problem
+from app.services.llm_service import LLMService, DEFAULT_LLM_MODEL, REVIEW_STATUS_DONE, review_is_complete
+from app.services.prompt_budget import PromptBudgeter
+
+DEFAULT_REVIEW_CONCURRENCY = 4
+SUMMARY_REVIEW_CHARS = 4000  # 每道题的评审在会话总结 prompt 中最多占用的字符数
+
+SESSION_SUMMARY_PROMPT = (
+    "You are given code reviews of every problem a candidate solved during one interview session. "
+    "Write an overall assessment of the candidate: strengths, weaknesses, recurring issues across problems, "
+    "and an overall score out of 100."
+)
+
+
+def code_digest(language: Optional[str], code: Optional[str]) -> str:
+    """语言 + 代码内容的摘要，用于识别完全相同的提交"""
+    return hashlib.sha256(f"{(language or '').lower()}\0{code or ''}".encode('utf-8')).hexdigest()
+
+
+def latest_submissions_for_candidate(candidate_id: int) -> List[Submission]:
+    """候选人在每道题上的最新一次提交"""
+    latest = db.session.query(
+        Submission.problem_id,
+        func.max(Submission.id).label('latest_id')
+    ).filter(Submission.candidate_id == candidate_id).group_by(Submission.problem_id).subquery()
+
+    return Submission.query.join(latest, Submission.id == latest.c.latest_id).order_by(Submission.problem_id).all()
+
+
+class ReviewJob:
+    """一次去重后的评审任务，可能对应多条内容相同的提交"""
+
+    def __init__(self, key: Tuple[int, str], problem: Problem, language: str, code: str):
+        self.key = key
+        self.problem = problem
+        self.language = language
+        self.code = code
+        self.submissions: List[Submission] = []
+        self.prompt: Optional[str] = None
+        self.trim_notice = ''
+        self.review: Optional[str] = None
+        self.error: Optional[str] = None
+        self.source = 'llm'
+
+    @property
+    def submission_ids(self) -> List[int]:
+        return [sub.id for sub in self.submissions]
+
+
+class CandidateBatchReviewer:
+    """
+    为候选人整个面试会话批量生成评审。
+
+    - 每道题只取最新提交；内容相同的代码只请求一次，并复用同题已有的评审
+    - 所有请求共享同一个 system prompt，以有限并发发送
+    - 每完成一项即产出一个进度事件，最后基于各题评审生成会话总结
+    """
+
+    def __init__(self, candidate_id: int, llm_service: LLMService, max_workers: Optional[int] = None, force: bool = False):
+        self.candidate_id = candidate_id
+        self.llm_service = llm_service
+        self.max_workers = max_workers or current_app.config.get('LLM_REVIEW_CONCURRENCY', DEFAULT_REVIEW_CONCURRENCY)
+        self.force = force
+        self.model = current_app.config.get('LLM_MODEL', DEFAULT_LLM_MODEL)
+
+    def plan(self, submissions: List[Submission]) -> List[ReviewJob]:
+        """按 (题目, 代码摘要) 去重并为需要请求 LLM 的任务准备 prompt"""
+        jobs: Dict[Tuple[int, str], ReviewJob] = {}
+        problems = {p.id: p for p in Problem.query.filter(Problem.id.in_({s.problem_id for s in submissions})).all()}
+        for sub in submissions:
+            if sub.problem_id not in problems:
+                continue
+            key = (sub.problem_id, code_digest(sub.language, sub.code))
+            if key not in jobs:
+                jobs[key] = ReviewJob(key, problems.get(sub.problem_id), sub.language, sub.code)
+            jobs[key].submissions.append(sub)
+
+        reusable = {} if self.force else self._existing_reviews(set(jobs))
+        for job in jobs.values():
+            if job.key in reusable:
+                job.review, job.source = reusable[job.key], 'existing'
+                continue
+            template = self.llm_service.get_llm_prompt_for_problem(job.problem.id)
+            job.prompt = self.llm_service.build_review_prompt(template, job.code, job.language, self.model)
+            budget = self.llm_service.last_prompt_budget
+            job.trim_notice = budget.notice() if budget and budget.trimmed else ''
+        return list(jobs.values())
+
+    def _existing_reviews(self, keys) -> Dict[Tuple[int, str], str]:
+        """同一候选人、同一题目、相同代码的历史提交若已有评审则直接复用"""
+        problem_ids = {problem_id for problem_id, _ in keys}
+        reviewed = Submission.query.filter(
+            Submission.candidate_id == self.candidate_id,
+            Submission.problem_id.in_(problem_ids),
+            Submission.llm_review.isnot(None)
+        ).order_by(Submission.id.desc()).all()
+        found = {}
+        for sub in reviewed:
+            key = (sub.problem_id, code_digest(sub.language, sub.code))
+            if key in keys and key not in found and review_is_complete(sub):
+                found[key] = sub.llm_review
+        return found
+
+    def _review(self, app, job: ReviewJob) -> ReviewJob:
+        with app.app_context():
+            try:
+                review = self.llm_service.complete(job.prompt, self.model)
+                job.review = f"{review}\n\n---\n{job.trim_notice}" if job.trim_notice else review
+            except Exception as e:
+                job.error = str(e)
+        return job
+
+    def _event(self, job: ReviewJob, completed: int, total: int) -> Dict[str, Any]:
+        event = {
+            'event': 'review',
+            'problem_id': job.problem.id,
+            'problem_title': job.problem.title,
+            'submission_ids': job.submission_ids,
+            'source': job.source,
+            'completed': completed,
+            'total': total,
+        }
+        if job.error:
+            event.update({'status': 'failed', 'error': job.error})
+        else:
+            event.update({'status': 'done', 'review': job.review})
+        return event
+
+    def run(self, submissions: List[Submission], summary: bool = True) -> Iterator[Dict[str, Any]]:
+        """执行批量评审，逐个产出进度事件；评审结果在当前线程写回数据库"""
+        app = current_app._get_current_object()
+        jobs = self.plan(submissions)
+        total = len(jobs)
+        completed = 0
+        yield {'event': 'started', 'candidate_id': self.candidate_id, 'submissions': len(submissions), 'total': total}
+
+        for job in jobs:
+            if job.source == 'existing':
+                completed += 1
+                self._save(job)
+                yield self._event(job, completed, total)
+
+        pending = [job for job in jobs if job.source == 'llm']
+        if pending:
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(pending)))) as executor:
+                futures = [executor.submit(self._review, app, job) for job in pending]
+                for future in as_completed(futures):
+                    job = future.result()
+                    completed += 1
+                    self._save(job)
+                    yield self._event(job, completed, total)
+
+        if summary:
+            yield self._summarize(jobs)
+        yield {'event': 'finished', 'completed': completed, 'failed': sum(1 for job in jobs if job.error)}
+
+    def _save(self, job: ReviewJob) -> None:
+        if job.error or not job.review:
+            return
+        for sub in job.submissions:
+            sub.llm_review = job.review
+            sub.llm_review_status = REVIEW_STATUS_DONE
+            sub.llm_review_error = None
+        try:
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Failed to save batch review for submissions {job.submission_ids}: {str(e)}")
+
+    def _summarize(self, jobs: List[ReviewJob]) -> Dict[str, Any]:
+        """基于各题评审生成会话级总结"""
+        sections = []
+        for job in sorted(jobs, key=lambda j: j.problem.id):
+            if not job.review:
+                continue
+            status = job.submissions[0].status
+            sections.append(f"## {job.problem.title} (status: {status})\n{job.review[:SUMMARY_REVIEW_CHARS]}")
+        if not sections:
+            return {'event': 'summary', 'status': 'skipped', 'error': 'No per-problem reviews to summarize'}
+
+        budgeter = PromptBudgeter.for_model(self.model, current_app.config)
+        budget = budgeter.fit(SESSION_SUMMARY_PROMPT, "\n\n".join(sections), language='markdown')
+        prompt = f"{budget.prompt_template}\n\n{budget.code}"
+        try:
+            review = self.llm_service.complete(prompt, self.model)
+        except Exception as e:
+            current_app.logger.error(f"Session summary review failed for candidate {self.candidate_id}: {str(e)}")
+            return {'event': 'summary', 'status': 'failed', 'error': str(e)}
+        return {'event': 'summary', 'status': 'done', 'review': review, 'id': self._save_summary(jobs, review)}
+
+    def _save_summary(self, jobs: List[ReviewJob], review: str) -> Optional[int]:
+        """保存会话总结，之后可通过 GET /api/candidates/<id>/reviews/summary 读取"""
+        submission_ids = sorted(sub_id for job in jobs if job.review for sub_id in job.submission_ids)
+        record = CandidateSessionReview(candidate_id=self.candidate_id, review=review, model=self.model,
+                                        submission_ids=json.dumps(submission_ids))
+        db.session.add(record)
+        try:
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Failed to save session summary for candidate {self.candidate_id}: {str(e)}")
+            return None
+        return record.id
@@ -0,0 +1,195 @@
+"""
+按内容寻址的压缩存储。
+
+内容以 sha256 为键写入 blobs 表，相同内容只保存一份；写入时优先使用 zstd
+（安装了 zstandard 时），否则使用 zlib，压缩后不变小的内容原样保存。
+blob 内容不可变，所以解压后的结果可以在进程内缓存。删除提交后由
+delete_unreferenced 回收不再被任何提交或测试结果引用的 blob。
+"""
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Blob, Submission, SubmissionTestResult
+
+try:
+    import zstandard
+except ImportError:  # zstd 是可选依赖
+    zstandard = None
+
+COMPRESSION_NONE = 'none'
+COMPRESSION_ZLIB = 'zlib'
+COMPRESSION_ZSTD = 'zstd'
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 10
+MIN_COMPRESS_SIZE = 64  # 字节，更短的内容压缩收益可以忽略
+DEFAULT_CACHE_SIZE = 512
+LOOKUP_CHUNK_SIZE = 500
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def compress(data: bytes) -> Tuple[str, bytes]:
+    """返回 (压缩算法, 压缩后内容)"""
+    if len(data) < MIN_COMPRESS_SIZE:
+        return COMPRESSION_NONE, data
+    if zstandard is not None:
+        method, packed = COMPRESSION_ZSTD, zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    else:
+        method, packed = COMPRESSION_ZLIB, zlib.compress(data, ZLIB_LEVEL)
+    if len(packed) >= len(data):
+        return COMPRESSION_NONE, data
+    return method, packed
+
+
+def decompress(method: str, data: bytes) -> bytes:
+    if method == COMPRESSION_NONE:
+        return data
+    if method == COMPRESSION_ZLIB:
+        return zlib.decompress(data)
+    if method == COMPRESSION_ZSTD:
+        if zstandard is None:
+            raise RuntimeError('This blob is zstd-compressed; install the zstandard package to read it')
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"Unknown blob compression: {method}")
+
+
+class BlobStore:
+    """blobs 表的读写入口"""
+
+    def __init__(self, cache_size: int = DEFAULT_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, digest: str, data: bytes) -> None:
+        with self._lock:
+            self._cache[digest] = data
+            self._cache.move_to_end(digest)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def put(self, data: bytes, session=None) -> str:
+        """保存内容并返回哈希；内容已存在时不会重复写入"""
+        session = session or db.session
+        digest = content_hash(data)
+        method, packed = compress(data)
+        values = {'hash': digest, 'compression': method, 'size': len(data), 'data': packed}
+        dialect = session.get_bind().dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            session.execute(insert(Blob).values(**values).on_conflict_do_nothing(index_elements=['hash']))
+        elif session.get(Blob, digest) is None:
+            session.add(Blob(**values))
+        return digest
+
+    def put_text(self, text: str, session=None) -> str:
+        return self.put(text.encode('utf-8'), session=session)
+
+    def get(self, digest: str, session=None) -> Optional[bytes]:
+        with self._lock:
+            data = self._cache.get(digest)
+            if data is not None:
+                self._cache.move_to_end(digest)
+                return data
+        session = session or db.session
+        row = session.execute(
+            db.select(Blob.compression, Blob.data).where(Blob.hash == digest)
+        ).first()
+        if row is None:
+            return None
+        data = decompress(row.compression, row.data)
+        self._remember(digest, data)
+        return data
+
+    def get_text(self, digest: str, session=None) -> Optional[str]:
+        data = self.get(digest, session=session)
+        return None if data is None else data.decode('utf-8')
+
+    def get_many_text(self, digests: Iterable[str], session=None) -> Dict[str, str]:
+        """一次查询取出多个 blob 的文本，缓存中已有的不再查询"""
+        found: Dict[str, bytes] = {}
+        missing = []
+        with self._lock:
+            for digest in set(digests):
+                data = self._cache.get(digest)
+                if data is None:
+                    missing.append(digest)
+                else:
+                    self._cache.move_to_end(digest)
+                    found[digest] = data
+        if missing:
+            session = session or db.session
+            rows = session.execute(
+                db.select(Blob.hash, Blob.compression, Blob.data).where(Blob.hash.in_(missing))
+            ).all()
+            for row in rows:
+                found[row.hash] = decompress(row.compression, row.data)
+                self._remember(row.hash, found[row.hash])
+        return {digest: data.decode('utf-8') for digest, data in found.items()}
+
+    def delete_unreferenced(self, digests: Iterable[str], session=None) -> int:
+        """删除 digests 中已经没有提交或测试结果引用的 blob（不提交事务），返回删除的数量"""
+        session = session or db.session
+        digests = list({digest for digest in digests if digest})
+        columns = (Submission.code_hash, SubmissionTestResult.output_hash, SubmissionTestResult.error_hash,
+                   SubmissionTestResult.compile_output_hash)
+        deleted = 0
+        for start in range(0, len(digests), LOOKUP_CHUNK_SIZE):
+            chunk = digests[start:start + LOOKUP_CHUNK_SIZE]
+            referenced = set()
+            for column in columns:
+                referenced.update(session.scalars(db.select(column).where(column.in_(chunk)).distinct()))
+            orphaned = [digest for digest in chunk if digest not in referenced]
+            if orphaned:
+                deleted += session.execute(db.delete(Blob).where(Blob.hash.in_(orphaned))).rowcount
+                with self._lock:
+                    for digest in orphaned:
+                        self._cache.pop(digest, None)
+        return deleted
+
+
+blob_store = BlobStore()
+
+
+def migrate_legacy_code(batch_size: int = 500) -> int:
+    """把仍以明文保存在 submissions.code 中的源码分批移入 blobs，返回迁移的提交数"""
+    migrated = 0
+    while True:
+        rows = db.session.execute(
+            db.select(Submission.id, Submission.legacy_code)
+            .where(Submission.legacy_code.is_not(None), Submission.code_hash.is_(None))
+            .order_by(Submission.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return migrated
+        updates = [{'id': row.id, 'code_hash': blob_store.put_text(row.legacy_code), 'legacy_code': None}
+                   for row in rows]
+        db.session.execute(db.update(Submission), updates)
+        db.session.commit()
+        migrated += len(rows)
+
+
+@event.listens_for(Session, 'before_flush')
+def _store_pending_blobs(session, flush_context, instances):
+    """Submission.code 和过长的测试输出赋值时只计算哈希，真正写入 blob 推迟到 flush 前"""
+    for obj in session.new.union(session.dirty):
+        if isinstance(obj, Submission) and obj._pending_code is not None:
+            blob_store.put_text(obj._pending_code, session=session)
+            obj._pending_code = None
+        elif isinstance(obj, SubmissionTestResult) and obj._pending_blobs:
+            for text in obj._pending_blobs:
+                blob_store.put_text(text, session=session)
+            obj._pending_blobs = ()
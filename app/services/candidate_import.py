@@ -0,0 +1,147 @@
+"""
+批量导入候选人。
+
+姓名和邮箱的唯一性用 IN 查询一次性检查（每 LOOKUP_CHUNK_SIZE 个值一条），
+密码哈希（故意很慢的 scrypt/PBKDF2）放到进程池里在多个 CPU 核上并行计算，
+最后用批量 INSERT 写入，整个请求只有一个事务。每一行都返回单独的结果。
+"""
+import csv
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models import Candidate, search_key
+
+CSV_FIELDS = ('name', 'email', 'password')
+DEFAULT_MAX_ROWS = 5000
+INSERT_BATCH_SIZE = 500
+LOOKUP_CHUNK_SIZE = 500
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+class CandidateImportError(ValueError):
+    """上传内容无法解析成候选人列表"""
+    pass
+
+
+def parse_csv(text: str) -> List[Dict[str, Any]]:
+    reader = csv.DictReader(io.StringIO(text))
+    if reader.fieldnames is None:
+        return []
+    fields = [name.strip().lower() for name in reader.fieldnames]
+    missing = [name for name in CSV_FIELDS if name not in fields]
+    if missing:
+        raise CandidateImportError(f"CSV header is missing column(s): {', '.join(missing)}")
+    reader.fieldnames = fields
+    return [{name: row.get(name) for name in CSV_FIELDS} for row in reader]
+
+
+def parse_json(data: Any) -> List[Dict[str, Any]]:
+    """接受候选人数组，或 {"candidates": [...]}"""
+    if isinstance(data, dict):
+        data = data.get('candidates')
+    if not isinstance(data, list):
+        raise CandidateImportError('Expected a JSON array of candidates or {"candidates": [...]}')
+    return data
+
+
+def _hash_workers(configured: Optional[int]) -> int:
+    return configured if configured else (os.cpu_count() or 1)
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn 启动的子进程只需导入 werkzeug，不会继承 Web 进程里的线程和数据库连接
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _pool_workers = workers
+        return _pool
+
+
+def hash_passwords(passwords: Sequence[str], workers: Optional[int] = None) -> List[str]:
+    """并行计算密码哈希；workers 为 1 或只有一个密码时在当前进程计算"""
+    workers = min(_hash_workers(workers), len(passwords))
+    if workers <= 1:
+        return [generate_password_hash(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (workers * 4))
+    return list(_get_pool(workers).map(generate_password_hash, passwords, chunksize=chunksize))
+
+
+def _existing(column, values: Iterable[str]) -> set:
+    values = list(values)
+    found = set()
+    for start in range(0, len(values), LOOKUP_CHUNK_SIZE):
+        chunk = values[start:start + LOOKUP_CHUNK_SIZE]
+        # 软删除但尚未清理完的候选人仍占用名称和邮箱
+        found.update(db.session.scalars(
+            db.select(column).where(column.in_(chunk)).execution_options(include_deleted=True)
+        ))
+    return found
+
+
+def _field(row: Any, name: str) -> Optional[str]:
+    value = row.get(name) if isinstance(row, dict) else None
+    if value is None:
+        return None
+    value = str(value) if name == 'password' else str(value).strip()
+    return value or None
+
+
+def import_candidates(rows: Sequence[Any], hash_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    创建候选人并返回 {'created', 'failed', 'results'}，results 与输入按顺序一一对应：
+    成功为 {'row', 'status': 'created', 'candidate'}，失败为 {'row', 'status': 'error', 'message'}。
+    row 从 1 开始计数。
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(rows)
+    valid = []
+    for index, row in enumerate(rows):
+        name, email, password = (_field(row, field) for field in CSV_FIELDS)
+        if not (name and email and password):
+            results[index] = {'row': index + 1, 'status': 'error', 'message': 'Missing name, email or password'}
+        else:
+            valid.append((index, name, email, password))
+
+    taken_names = _existing(Candidate.name, {name for _, name, _, _ in valid})
+    taken_emails = _existing(Candidate.email, {email for _, _, email, _ in valid})
+    accepted = []
+    for index, name, email, password in valid:
+        if name in taken_names:
+            message = 'Candidate name already exists'
+        elif email in taken_emails:
+            message = 'Candidate with this email already exists'
+        else:
+            # 同一批次里后出现的重复行同样视为冲突
+            taken_names.add(name)
+            taken_emails.add(email)
+            accepted.append((index, name, email, password))
+            continue
+        results[index] = {'row': index + 1, 'status': 'error', 'message': message}
+
+    hashes = hash_passwords([password for _, _, _, password in accepted], hash_workers)
+    for start in range(0, len(accepted), INSERT_BATCH_SIZE):
+        batch = accepted[start:start + INSERT_BATCH_SIZE]
+        params = [{'name': name, 'email': email, 'password_hash': password_hash,
+                   'name_search': search_key(name), 'email_search': search_key(email)}
+                  for (_, name, email, _), password_hash in zip(batch, hashes[start:start + INSERT_BATCH_SIZE])]
+        ids = db.session.scalars(
+            db.insert(Candidate).returning(Candidate.id, sort_by_parameter_order=True), params
+        ).all()
+        for (index, name, email, _), candidate_id in zip(batch, ids):
+            results[index] = {'row': index + 1, 'status': 'created',
+                              'candidate': {'id': candidate_id, 'name': name, 'email': email}}
+    db.session.commit()
+
+    return {'created': len(accepted), 'failed': len(rows) - len(accepted), 'results': results}
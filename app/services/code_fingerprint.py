@@ -0,0 +1,333 @@
+"""
+规范化源码指纹：只在空白、注释、文档字符串或函数内局部变量名上不同的提交得到相同的指纹。
+
+Python 解析成 AST 后去掉文档字符串，把只在函数内部使用的局部变量（以及嵌套函数和 lambda 的参数）
+按首次出现顺序重命名，再 unparse。模块级和类体中的名字、函数名、类名、顶层函数和方法的参数
+都可能被外部按名字访问，不重命名；同一个名字在别处被用作属性名、关键字参数或出现在字符串
+（字典键、getattr 的参数等）里时也不重命名；代码用到 globals()、locals()、getattr 等按名字
+反射的函数时完全不重命名。
+
+其他语言（以及无法解析的 Python）按 token 规范化：去掉注释和空白，只重命名紧跟在类型关键字
+之后声明、且从未出现在成员访问、对象键、简写属性或字符串中的变量。多字符运算符按最长匹配
+切分；JavaScript 等会自动插入分号的语言保留换行。
+
+改名后的占位名含 NUL 字符，不会与代码中真实的标识符（例如 _v0）相同。
+
+两种方式都保留字面量、属性名、调用的库函数等其他标识符；规范化无法证明等价的改动只会得到
+不同的指纹，不会误复用。
+"""
+import ast
+import hashlib
+import re
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models import Submission
+
+# 规范化规则改变时加一，旧指纹自然失效
+CANONICAL_VERSION = 3
+# 判题服务本身出错时的状态，结果不代表代码的行为
+UNREUSABLE_STATUSES = ('Execution Error', 'Error in test case data')
+
+_COMMENTS = re.compile(r'//[^\n]*|/\*[\s\S]*?\*/')
+# 多字符运算符按最长匹配切分，x+++y 与 x+ ++y 得到不同的 token
+_OPERATORS = sorted([
+    '>>>=', '<<=', '>>=', '>>>', '===', '!==', '...', '**=', '&&=', '||=', '??=', '<=>',
+    '++', '--', '&&', '||', '==', '!=', '<=', '>=', '+=', '-=', '*=', '/=', '%=', '&=', '|=', '^=',
+    '<<', '>>', '=>', '::', '->', '**', '??', '?.', ':=',
+], key=len, reverse=True)
+_TOKENS = re.compile(
+    r'"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'|[A-Za-z_][A-Za-z0-9_]*|\d[\w.]*|'
+    + '|'.join(re.escape(operator) for operator in _OPERATORS) + r'|[^\sA-Za-z0-9_]'
+)
+# 换行有语义（自动插入分号、按行分隔语句）的语言，规范化时保留换行
+_NEWLINE_SENSITIVE_LANGUAGES = ('python', 'javascript', 'node', 'typescript', 'go', 'swift', 'kotlin', 'scala', 'ruby')
+_IDENTIFIER = re.compile(r'[A-Za-z_][A-Za-z0-9_]*$')
+_IDENTIFIERS = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+_DECLARATION_TYPES = {
+    'int', 'long', 'short', 'char', 'bool', 'boolean', 'float', 'double', 'auto', 'var', 'let', 'const',
+    'unsigned', 'signed', 'size_t', 'String', 'string',
+}
+# 按名字访问变量或属性的函数，用到时名字本身就是语义的一部分
+_REFLECTIVE_NAMES = {
+    'globals', 'locals', 'vars', 'dir', 'getattr', 'setattr', 'delattr', 'hasattr', 'eval', 'exec', 'compile',
+    '__import__', '__dict__', 'f_locals', 'f_globals',
+}
+_REFLECTIVE_TOKENS = {'eval', 'with', 'Function', 'arguments'}
+_FUNCTION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)
+_SCOPE_NODES = _FUNCTION_NODES + (ast.ClassDef,)
+
+
+def _placeholder(index: int) -> str:
+    """改名后的占位名；含 NUL 字符，不会与代码里真实的标识符相同"""
+    return f'\x00v{index}'
+
+
+class _LocalNameRenamer(ast.NodeTransformer):
+    """把可以安全改名的局部变量统一重命名为占位名，并去掉函数和类的文档字符串"""
+
+    def __init__(self, renamable):
+        self.names = {}
+        self.renamable = renamable
+
+    def _rename(self, name):
+        if name not in self.renamable:
+            return name
+        if name not in self.names:
+            self.names[name] = _placeholder(len(self.names))
+        return self.names[name]
+
+    def visit_Name(self, node):
+        node.id = self._rename(node.id)
+        return node
+
+    def visit_arg(self, node):
+        node.arg = self._rename(node.arg)
+        self.generic_visit(node)
+        return node
+
+    def _visit_definition(self, node):
+        body = node.body
+        if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant) \
+                and isinstance(body[0].value.value, str):
+            node.body = body[1:] or [ast.Pass()]
+        self.generic_visit(node)
+        return node
+
+    visit_FunctionDef = visit_AsyncFunctionDef = visit_ClassDef = _visit_definition
+
+
+def _scope_children(node):
+    """作用域自身的语句；lambda 只有一个表达式"""
+    if isinstance(node, ast.Lambda):
+        return [node.body]
+    return node.body
+
+
+def _parameters(args: ast.arguments) -> list:
+    params = args.posonlyargs + args.args + args.kwonlyargs
+    return params + [arg for arg in (args.vararg, args.kwarg) if arg is not None]
+
+
+def _outer_parts(node):
+    """定义语句中在外层作用域求值的部分"""
+    if isinstance(node, ast.ClassDef):
+        return node.decorator_list + node.bases + node.keywords
+    parts = node.args.defaults + [default for default in node.args.kw_defaults if default is not None]
+    if not isinstance(node, ast.Lambda):
+        parts = node.decorator_list + parts
+    return parts
+
+
+def _local_bindings(function) -> set:
+    """函数作用域内绑定的名字：参数、赋值目标、except/match 绑定的名字"""
+    names = {arg.arg for arg in _parameters(function.args)}
+    stack = list(_scope_children(function))
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+            names.add(node.id)
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            names.add(node.name)
+        elif isinstance(node, (ast.MatchAs, ast.MatchStar)) and node.name:
+            names.add(node.name)
+        elif isinstance(node, ast.MatchMapping) and node.rest:
+            names.add(node.rest)
+        if isinstance(node, _SCOPE_NODES):
+            stack.extend(_outer_parts(node))
+        else:
+            stack.extend(ast.iter_child_nodes(node))
+    return names
+
+
+def _exposed_names(tree) -> set:
+    """在别处有含义、不能改名的名字"""
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute):
+            names.add(node.attr)
+        elif isinstance(node, ast.keyword) and node.arg:
+            names.add(node.arg)
+        elif isinstance(node, ast.Constant) and isinstance(node.value, str):
+            # 字典键、getattr 的参数、f'{x=}' 等都以字符串形式引用名字
+            names.update(_IDENTIFIERS.findall(node.value))
+        elif isinstance(node, ast.alias):
+            names.update(_IDENTIFIERS.findall(node.name))
+            if node.asname:
+                names.add(node.asname)
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            names.update(node.names)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.MatchClass):
+            names.update(node.kwd_attrs)
+    return names
+
+
+def _renamable_names(tree) -> set:
+    """
+    每一处出现都解析到某个函数局部变量的名字。参数只有嵌套函数和 lambda 的可以改名，
+    模块级函数和方法的参数可能被调用方按关键字传入。
+    """
+    if any(isinstance(node, ast.Name) and node.id in _REFLECTIVE_NAMES
+           or isinstance(node, ast.Attribute) and node.attr in _REFLECTIVE_NAMES for node in ast.walk(tree)):
+        return set()
+    local, fixed = set(), set()
+
+    def resolve(name, scopes):
+        # scopes 从外到内：('module'|'class'|'function', 绑定的名字)；类作用域对内层函数不可见
+        if scopes[-1][0] != 'function':
+            return False
+        for kind, bound in reversed(scopes):
+            if kind == 'module':
+                return False
+            if kind == 'function' and name in bound:
+                return True
+        return False
+
+    def visit(node, scopes):
+        if isinstance(node, ast.Name):
+            (local if resolve(node.id, scopes) else fixed).add(node.id)
+            return
+        if isinstance(node, _SCOPE_NODES):
+            for part in _outer_parts(node):
+                visit(part, scopes)
+            if isinstance(node, ast.ClassDef):
+                inner = scopes + [('class', set())]
+            else:
+                inner = scopes + [('function', _local_bindings(node))]
+                nested = scopes[-1][0] == 'function'
+                for arg in _parameters(node.args):
+                    (local if nested else fixed).add(arg.arg)
+                    if arg.annotation is not None:
+                        visit(arg.annotation, scopes)
+                if not isinstance(node, ast.Lambda) and node.returns is not None:
+                    visit(node.returns, scopes)
+            for child in _scope_children(node):
+                visit(child, inner)
+            return
+        # except 和 match 绑定的名字不是 Name 节点，不参与改名
+        if isinstance(node, ast.ExceptHandler) and node.name:
+            fixed.add(node.name)
+        elif isinstance(node, (ast.MatchAs, ast.MatchStar)) and node.name:
+            fixed.add(node.name)
+        elif isinstance(node, ast.MatchMapping) and node.rest:
+            fixed.add(node.rest)
+        for child in ast.iter_child_nodes(node):
+            visit(child, scopes)
+
+    visit(tree, [('module', set())])
+    renamable = local - fixed - _exposed_names(tree)
+    return {name for name in renamable if not (name.startswith('__') and name.endswith('__'))}
+
+
+def _canonical_python(code: str) -> Optional[str]:
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return None
+    if tree.body and isinstance(tree.body[0], ast.Expr) and isinstance(tree.body[0].value, ast.Constant) \
+            and isinstance(tree.body[0].value.value, str):
+        tree.body = tree.body[1:]
+    tree = _LocalNameRenamer(_renamable_names(tree)).visit(tree)
+    return ast.unparse(tree)
+
+
+def _exposed_tokens(tokens) -> set:
+    """成员访问、对象键、简写属性、函数名和字符串里出现的标识符"""
+    exposed = set()
+    brackets = []
+    for index, token in enumerate(tokens):
+        previous = tokens[index - 1] if index else ''
+        following = tokens[index + 1] if index + 1 < len(tokens) else ''
+        if token in ('(', '[', '{'):
+            brackets.append(token)
+        elif token in (')', ']', '}') and brackets:
+            brackets.pop()
+        elif token[0] in '"\'':
+            exposed.update(_IDENTIFIERS.findall(token))
+        elif _IDENTIFIER.match(token):
+            if previous in ('.', '?.', '->', '::') or following in (':', '('):
+                exposed.add(token)
+            elif brackets and brackets[-1] == '{' and previous in ('{', ',') and following in ('}', ','):
+                exposed.add(token)
+    return exposed
+
+
+def _lex(code: str, keep_newlines: bool):
+    """切分 token，同时返回每个 token 之前的分隔符：跨行且需要保留换行时为换行，否则为空格"""
+    # 跨行的块注释在自动插入分号时等同于换行
+    code = _COMMENTS.sub(lambda match: '\n' if '\n' in match.group() else ' ', code)
+    tokens, separators = [], []
+    end = 0
+    for match in _TOKENS.finditer(code):
+        separators.append('\n' if keep_newlines and '\n' in code[end:match.start()] else ' ')
+        tokens.append(match.group())
+        end = match.end()
+    return tokens, separators
+
+
+def _canonical_tokens(code: str, keep_newlines: bool = False) -> str:
+    tokens, separators = _lex(code, keep_newlines)
+    renamed = {}
+    if not _REFLECTIVE_TOKENS.intersection(tokens):
+        # 有序去重；函数名（包括 main）后面跟着括号，已被排除
+        exposed = _exposed_tokens(tokens)
+        declared = {}
+        for previous, token in zip([''] + tokens, tokens):
+            if previous in _DECLARATION_TYPES and _IDENTIFIER.match(token) and token not in _DECLARATION_TYPES \
+                    and token not in exposed:
+                declared.setdefault(token, None)
+        renamed = {name: _placeholder(index) for index, name in enumerate(declared)}
+    return ''.join(separator + renamed.get(token, token) for separator, token in zip(separators, tokens)).strip()
+
+
+def canonicalize(code: str, language: Optional[str]) -> str:
+    language = (language or '').lower()
+    if language.startswith('python'):
+        canonical = _canonical_python(code)
+        if canonical is not None:
+            return canonical
+    return _canonical_tokens(code, keep_newlines=language.startswith(_NEWLINE_SENSITIVE_LANGUAGES))
+
+
+def code_fingerprint(code: Optional[str], language: Optional[str]) -> Optional[str]:
+    """规范化源码的 SHA-256；代码为空时返回 None"""
+    if not code or not code.strip():
+        return None
+    canonical = canonicalize(code, language)
+    payload = f'{CANONICAL_VERSION}\x00{(language or "").lower()}\x00{canonical}'
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def find_reusable_submission(candidate_id: int, problem_id: int, fingerprint: Optional[str],
+                             problem_version: Optional[int]) -> Optional[Submission]:
+    """
+    同一候选人在同一题目、同一版本的测试用例下提交过指纹相同的代码时，返回最近一次提交，
+    可以直接复用它的判题结果。
+    """
+    if fingerprint is None or problem_version is None:
+        return None
+    return Submission.query.filter(
+        Submission.candidate_id == candidate_id,
+        Submission.problem_id == problem_id,
+        Submission.fingerprint == fingerprint,
+        Submission.problem_version == problem_version,
+        Submission.status.notin_(UNREUSABLE_STATUSES)
+    ).order_by(Submission.id.desc()).first()
+
+
+def reused_from(submission: Submission) -> Optional[dict]:
+    """复用标记：判题结果 / 评审分别来自哪次提交，都没有复用时为 None"""
+    if submission.verdict_reused_from_id is None and submission.review_reused_from_id is None:
+        return None
+    return {'verdict': submission.verdict_reused_from_id, 'review': submission.review_reused_from_id}
+
+
+@event.listens_for(Session, 'before_flush')
+def _fingerprint_new_submissions(session, flush_context, instances):
+    for obj in list(session.new):
+        if isinstance(obj, Submission) and obj.fingerprint is None:
+            obj.fingerprint = code_fingerprint(obj.code, obj.language)
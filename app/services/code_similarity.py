@@ -0,0 +1,236 @@
+"""
+提交代码的近似重复检测。
+
+源码先按语言去掉注释，把标识符、字符串和数字归一化（变量改名不影响结果），
+再取连续 SHINGLE_SIZE 个 token 作为 shingle 计算 MinHash 签名。签名分成 BANDS 个
+band，每个 band 哈希到一个 LSH 桶；查找相似提交时只比较至少有一个 band 同桶的提交，
+不需要和全部历史提交逐一比较。
+
+BANDS × ROWS_PER_BAND = NUM_PERM，相似度约 (1 / BANDS) ** (1 / ROWS_PER_BAND) ≈ 0.5
+以上的提交大概率会落入同一个桶。
+"""
+import hashlib
+import keyword
+import random
+import re
+import struct
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Submission, SubmissionLshBucket, SubmissionSignature
+from app.services.jobs import Job
+
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+DEFAULT_MIN_SIMILARITY = 0.5
+BACKFILL_BATCH_SIZE = 200
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_random = random.Random(20240601)  # 固定种子，签名在不同进程和重启之间保持一致
+_PERMUTATIONS = [(_random.randrange(1, _MERSENNE_PRIME), _random.randrange(0, _MERSENNE_PRIME))
+                 for _ in range(NUM_PERM)]
+
+_C_FAMILY_KEYWORDS = {
+    'auto', 'break', 'case', 'catch', 'char', 'class', 'const', 'continue', 'default', 'delete', 'do',
+    'double', 'else', 'enum', 'extends', 'false', 'final', 'float', 'for', 'function', 'if', 'implements',
+    'import', 'int', 'interface', 'let', 'long', 'namespace', 'new', 'null', 'nullptr', 'private',
+    'protected', 'public', 'return', 'short', 'signed', 'sizeof', 'static', 'struct', 'switch', 'template',
+    'this', 'throw', 'true', 'try', 'typedef', 'typename', 'unsigned', 'using', 'var', 'void', 'volatile',
+    'while', 'include', 'define', 'string', 'vector', 'std',
+}
+_KEYWORDS = {
+    'python': set(keyword.kwlist) | {'self', 'print', 'len', 'range', 'input', 'int', 'str', 'list', 'dict'},
+    'c_family': _C_FAMILY_KEYWORDS,
+}
+_COMMENT_PATTERNS = {
+    'python': re.compile(r'#[^\n]*|"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\''),
+    'c_family': re.compile(r'//[^\n]*|/\*[\s\S]*?\*/'),
+}
+_TOKEN_PATTERN = re.compile(
+    r'(?P<string>"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\')'
+    r'|(?P<number>\b\d+(?:\.\d+)?\b)'
+    r'|(?P<word>[A-Za-z_][A-Za-z0-9_]*)'
+    r'|(?P<symbol>[^\sA-Za-z0-9_])'
+)
+
+
+def _language_family(language: Optional[str]) -> str:
+    return 'python' if (language or '').lower().startswith('python') else 'c_family'
+
+
+def normalize_tokens(code: str, language: Optional[str]) -> List[str]:
+    """去掉注释并归一化后的 token 序列"""
+    family = _language_family(language)
+    code = _COMMENT_PATTERNS[family].sub(' ', code)
+    keywords = _KEYWORDS[family]
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer(code):
+        kind = match.lastgroup
+        value = match.group()
+        if kind == 'string':
+            tokens.append('S')
+        elif kind == 'number':
+            tokens.append('N')
+        elif kind == 'word':
+            tokens.append(value if value in keywords else 'I')
+        else:
+            tokens.append(value)
+    return tokens
+
+
+def _shingle_hashes(tokens: Sequence[str]) -> set:
+    size = min(SHINGLE_SIZE, len(tokens))
+    hashes = set()
+    for i in range(len(tokens) - size + 1):
+        digest = hashlib.blake2b('\x1f'.join(tokens[i:i + size]).encode('utf-8'), digest_size=8).digest()
+        hashes.add(int.from_bytes(digest, 'little'))
+    return hashes
+
+
+def minhash(code: str, language: Optional[str]) -> Optional[Tuple[List[int], int]]:
+    """返回 (MinHash 签名, shingle 数)；没有任何 token 时返回 None"""
+    shingles = _shingle_hashes(normalize_tokens(code, language))
+    if not shingles:
+        return None
+    return [min((a * x + b) % _MERSENNE_PRIME for x in shingles) for a, b in _PERMUTATIONS], len(shingles)
+
+
+def pack_signature(values: Sequence[int]) -> bytes:
+    return struct.pack(f'<{NUM_PERM}Q', *values)
+
+
+def unpack_signature(data: bytes) -> List[int]:
+    return list(struct.unpack(f'<{NUM_PERM}Q', data))
+
+
+def band_buckets(values: Sequence[int], language: Optional[str]) -> List[str]:
+    """每个 band 的桶键；不同语言族的提交不会落入同一个桶"""
+    family = _language_family(language).encode('utf-8')
+    buckets = []
+    for band in range(BANDS):
+        rows = values[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(family + struct.pack(f'<{ROWS_PER_BAND}Q', *rows), digest_size=8)
+        buckets.append(digest.hexdigest())
+    return buckets
+
+
+def estimated_similarity(a: Sequence[int], b: Sequence[int]) -> float:
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_PERM
+
+
+def _index_rows(submission_id: int, code: Optional[str], language: Optional[str]):
+    """返回 (签名行, 桶行列表)，代码为空时返回 None"""
+    result = minhash(code, language) if code else None
+    if result is None:
+        return None
+    values, shingle_count = result
+    signature = {'submission_id': submission_id, 'language': language,
+                 'signature': pack_signature(values), 'shingle_count': shingle_count}
+    buckets = [{'band': band, 'bucket': bucket, 'submission_id': submission_id}
+               for band, bucket in enumerate(band_buckets(values, language))]
+    return signature, buckets
+
+
+@event.listens_for(Session, 'before_flush')
+def _index_new_submissions(session, flush_context, instances):
+    for obj in list(session.new):
+        if not isinstance(obj, Submission) or obj.signature is not None:
+            continue
+        code = obj.code
+        result = minhash(code, obj.language) if code else None
+        if result is None:
+            continue
+        values, shingle_count = result
+        obj.signature = SubmissionSignature(language=obj.language, signature=pack_signature(values),
+                                            shingle_count=shingle_count)
+        obj.lsh_buckets = [SubmissionLshBucket(band=band, bucket=bucket)
+                           for band, bucket in enumerate(band_buckets(values, obj.language))]
+
+
+def find_similar(submission_id: int, min_similarity: float = DEFAULT_MIN_SIMILARITY,
+                 limit: int = 20, include_same_candidate: bool = False) -> Optional[List[Dict[str, Any]]]:
+    """
+    按估算的 Jaccard 相似度从高到低返回相似提交；提交还没有签名时返回 None。
+    只读取与它至少共享一个 LSH 桶的提交的签名。
+    """
+    row = db.session.execute(
+        db.select(SubmissionSignature.signature, Submission.candidate_id)
+        .join(Submission, Submission.id == SubmissionSignature.submission_id)
+        .where(SubmissionSignature.submission_id == submission_id)
+    ).first()
+    if row is None:
+        return None
+    values = unpack_signature(row.signature)
+
+    own = db.aliased(SubmissionLshBucket)
+    candidate_ids = db.select(SubmissionLshBucket.submission_id).join(
+        own, db.and_(own.band == SubmissionLshBucket.band, own.bucket == SubmissionLshBucket.bucket)
+    ).where(own.submission_id == submission_id, SubmissionLshBucket.submission_id != submission_id).distinct()
+
+    query = db.select(SubmissionSignature.signature, Submission.id, Submission.candidate_id,
+                      Submission.problem_id, Submission.language, Submission.status, Submission.submitted_at) \
+        .join(Submission, Submission.id == SubmissionSignature.submission_id) \
+        .where(SubmissionSignature.submission_id.in_(candidate_ids))
+    if not include_same_candidate:
+        query = query.where(Submission.candidate_id != row.candidate_id)
+
+    matches = []
+    for match in db.session.execute(query):
+        similarity = estimated_similarity(values, unpack_signature(match.signature))
+        if similarity >= min_similarity:
+            matches.append({
+                'submission_id': match.id,
+                'candidate_id': match.candidate_id,
+                'problem_id': match.problem_id,
+                'language': match.language,
+                'status': match.status,
+                'submission_time': match.submitted_at.isoformat() if match.submitted_at else None,
+                'similarity': round(similarity, 3)
+            })
+    matches.sort(key=lambda m: (-m['similarity'], m['submission_id']))
+    return matches[:limit]
+
+
+def backfill_signatures(job: Optional[Job] = None, batch_size: int = BACKFILL_BATCH_SIZE) -> Dict[str, Any]:
+    """为还没有签名的历史提交计算签名并写入 LSH 索引，每批单独提交"""
+    from app.services.blob_store import blob_store
+
+    indexed = skipped = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            db.select(Submission.id, Submission.language, Submission.code_hash, Submission.legacy_code)
+            .outerjoin(SubmissionSignature, SubmissionSignature.submission_id == Submission.id)
+            .where(SubmissionSignature.submission_id.is_(None), Submission.id > last_id)
+            .order_by(Submission.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        code_by_hash = blob_store.get_many_text(row.code_hash for row in rows if row.code_hash)
+        signatures, buckets = [], []
+        for row in rows:
+            code = code_by_hash.get(row.code_hash) if row.code_hash else row.legacy_code
+            result = _index_rows(row.id, code, row.language)
+            if result is None:
+                skipped += 1
+                continue
+            signatures.append(result[0])
+            buckets.extend(result[1])
+        if signatures:
+            db.session.execute(db.insert(SubmissionSignature), signatures)
+            db.session.execute(db.insert(SubmissionLshBucket), buckets)
+        db.session.commit()
+        indexed += len(signatures)
+        last_id = rows[-1].id
+        if job:
+            job.update_progress(indexed=indexed, skipped=skipped, last_submission_id=last_id)
+    return {'indexed': indexed, 'skipped': skipped}
+
+
+def backfill_signatures_job(job: Job, batch_size: int = BACKFILL_BATCH_SIZE) -> Dict[str, Any]:
+    return backfill_signatures(job=job, batch_size=batch_size)
@@ -0,0 +1,190 @@
+"""
+候选人和题目的软删除与分批清理。
+
+删除接口只把 deleted_at 设为当前时间并立即返回，之后由后台任务分批删除依赖的行：
+每批最多 batch_size 个提交及其测试结果、相似度索引和不再被引用的 blob，
+单独提交事务并短暂停顿，让判题等写请求可以在两批之间拿到 SQLite 的写锁。
+全部清理完后才删除候选人或题目本身，归档库中属于它们的提交也一并删除。
+
+软删除的行对普通 ORM 查询不可见（见 _hide_soft_deleted）；需要看到它们的查询
+（唯一性检查、清理任务）加上 execution_options(include_deleted=True)。
+"""
+import time
+from datetime import datetime, UTC
+from typing import Any, Dict, List, Optional
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session, with_loader_criteria
+
+from app import db
+from app.models import (Candidate, CandidateProblemTab, CandidateSessionReview, LatestSubmission, Problem,
+                        ProblemStatBucket, ProblemStats, Submission, SubmissionLshBucket, SubmissionSignature,
+                        SubmissionTestResult, TestCase, TestCaseStats)
+from app.services.blob_store import blob_store
+from app.services.jobs import Job, jobs
+
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_BATCH_PAUSE = 0.05  # 秒
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _hide_soft_deleted(execute_state):
+    # 刷新已加载对象的列和关系加载不过滤，否则已在会话中的对象会变成“已删除”
+    if (execute_state.is_select and not execute_state.is_column_load and not execute_state.is_relationship_load
+            and not execute_state.execution_options.get('include_deleted', False)):
+        execute_state.statement = execute_state.statement.options(
+            with_loader_criteria(Candidate, lambda cls: cls.deleted_at.is_(None), include_aliases=True),
+            with_loader_criteria(Problem, lambda cls: cls.deleted_at.is_(None), include_aliases=True),
+        )
+
+
+def _settings(batch_size: Optional[int], pause: Optional[float]):
+    config = current_app.config if has_app_context() else {}
+    if batch_size is None:
+        batch_size = config.get('DELETION_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    if pause is None:
+        pause = config.get('DELETION_BATCH_PAUSE', DEFAULT_BATCH_PAUSE)
+    return batch_size, pause
+
+
+def delete_submission_rows(ids: List[int], keep_reuse_links: bool = False) -> None:
+    """
+    删除一批提交及其测试结果和相似度索引，并回收只被它们引用的 blob（不提交事务）。
+    keep_reuse_links 为 True 时（归档）保留其他提交指向它们的复用 id，归档后仍可按 id 查到。
+    """
+    digests = set(db.session.scalars(
+        db.select(Submission.code_hash).where(Submission.id.in_(ids), Submission.code_hash.isnot(None))
+    ))
+    for row in db.session.execute(
+        db.select(SubmissionTestResult.output_hash, SubmissionTestResult.error_hash,
+                  SubmissionTestResult.compile_output_hash).where(SubmissionTestResult.submission_id.in_(ids))
+    ):
+        digests.update(row)
+    for model in (SubmissionTestResult, SubmissionSignature, SubmissionLshBucket):
+        db.session.execute(db.delete(model).where(model.submission_id.in_(ids)))
+    # 其他提交可能记录了从这些提交复用判题结果或评审
+    if not keep_reuse_links:
+        for column in (Submission.verdict_reused_from_id, Submission.review_reused_from_id):
+            db.session.execute(db.update(Submission).where(column.in_(ids)).values({column: None}))
+    db.session.execute(db.delete(Submission).where(Submission.id.in_(ids)))
+    blob_store.delete_unreferenced(digests)
+
+
+def delete_test_case_dependents(ids: List[int]) -> None:
+    """
+    删除测试用例之前清理引用它们的行（不提交事务）：统计删除，提交的测试结果保留但不再指向用例。
+    SQLite 默认不启用外键，模型上的 ondelete 不会生效，所以这里显式处理。
+    """
+    db.session.execute(db.delete(TestCaseStats).where(TestCaseStats.test_case_id.in_(ids)))
+    db.session.execute(db.update(SubmissionTestResult).where(SubmissionTestResult.test_case_id.in_(ids))
+                       .values(test_case_id=None))
+
+
+def _delete_submissions(condition, job: Optional[Job], batch_size: int, pause: float) -> int:
+    """分批删除满足 condition 的提交及其依赖行，返回删除的提交数"""
+    deleted = 0
+    while True:
+        ids: List[int] = db.session.scalars(
+            db.select(Submission.id).where(condition).order_by(Submission.id).limit(batch_size)
+        ).all()
+        if not ids:
+            return deleted
+        delete_submission_rows(ids)
+        db.session.commit()
+        deleted += len(ids)
+        if job:
+            job.update_progress(deleted_submissions=deleted)
+        if pause:
+            time.sleep(pause)
+
+
+def _delete_in_batches(model, condition, batch_size: int, pause: float) -> None:
+    while True:
+        ids = db.session.scalars(db.select(model.id).where(condition).limit(batch_size)).all()
+        if not ids:
+            return
+        db.session.execute(db.delete(model).where(model.id.in_(ids)))
+        db.session.commit()
+        if pause:
+            time.sleep(pause)
+
+
+def purge_candidate(candidate_id: int, job: Optional[Job] = None, batch_size: Optional[int] = None,
+                    pause: Optional[float] = None) -> Dict[str, Any]:
+    """彻底删除已软删除的候选人及其提交；候选人未被软删除时不做任何事"""
+    # 归档模块依赖本模块的 delete_submission_rows，这里延迟导入
+    from app.services.submission_archive import delete_archived
+    batch_size, pause = _settings(batch_size, pause)
+    candidate = db.session.execute(
+        db.select(Candidate).where(Candidate.id == candidate_id).execution_options(include_deleted=True)
+    ).scalar_one_or_none()
+    if candidate is None or candidate.deleted_at is None:
+        return {'candidate_id': candidate_id, 'deleted_submissions': 0, 'purged': False}
+
+    db.session.execute(db.delete(LatestSubmission).where(LatestSubmission.candidate_id == candidate_id))
+    db.session.commit()
+    deleted = _delete_submissions(Submission.candidate_id == candidate_id, job, batch_size, pause)
+    delete_archived(candidate_id=candidate_id)
+    db.session.execute(db.delete(CandidateProblemTab).where(CandidateProblemTab.candidate_id == candidate_id))
+    db.session.execute(db.delete(CandidateSessionReview).where(CandidateSessionReview.candidate_id == candidate_id))
+    # 依赖的行都已删除，这里的级联只会查到空集合
+    db.session.delete(candidate)
+    db.session.commit()
+    return {'candidate_id': candidate_id, 'deleted_submissions': deleted, 'purged': True}
+
+
+def purge_problem(problem_id: int, job: Optional[Job] = None, batch_size: Optional[int] = None,
+                  pause: Optional[float] = None) -> Dict[str, Any]:
+    """彻底删除已软删除的题目及其提交、测试用例和统计；题目未被软删除时不做任何事"""
+    from app.services.submission_archive import delete_archived
+    batch_size, pause = _settings(batch_size, pause)
+    problem = db.session.execute(
+        db.select(Problem).where(Problem.id == problem_id).execution_options(include_deleted=True)
+    ).scalar_one_or_none()
+    if problem is None or problem.deleted_at is None:
+        return {'problem_id': problem_id, 'deleted_submissions': 0, 'purged': False}
+
+    db.session.execute(db.delete(LatestSubmission).where(LatestSubmission.problem_id == problem_id))
+    db.session.commit()
+    deleted = _delete_submissions(Submission.problem_id == problem_id, job, batch_size, pause)
+    delete_archived(problem_id=problem_id)
+    for model in (TestCaseStats, ProblemStatBucket, ProblemStats, CandidateProblemTab):
+        db.session.execute(db.delete(model).where(model.problem_id == problem_id))
+    db.session.commit()
+    _delete_in_batches(TestCase, TestCase.problem_id == problem_id, batch_size, pause)
+    db.session.delete(problem)
+    db.session.commit()
+    return {'problem_id': problem_id, 'deleted_submissions': deleted, 'purged': True}
+
+
+def purge_candidate_job(job: Job, candidate_id: int) -> Dict[str, Any]:
+    return purge_candidate(candidate_id, job=job)
+
+
+def purge_problem_job(job: Job, problem_id: int) -> Dict[str, Any]:
+    return purge_problem(problem_id, job=job)
+
+
+def soft_delete(obj) -> Job:
+    """标记删除并提交，然后启动后台清理任务"""
+    obj.deleted_at = datetime.now(UTC)
+    db.session.commit()
+    if isinstance(obj, Candidate):
+        return jobs.submit('candidate_purge', purge_candidate_job, obj.id)
+    return jobs.submit('problem_purge', purge_problem_job, obj.id)
+
+
+def purge_soft_deleted() -> Dict[str, int]:
+    """清理所有已软删除但尚未清理完的行（例如进程在清理中途退出），返回清理的数量"""
+    candidate_ids = db.session.scalars(
+        db.select(Candidate.id).where(Candidate.deleted_at.isnot(None)).execution_options(include_deleted=True)
+    ).all()
+    problem_ids = db.session.scalars(
+        db.select(Problem.id).where(Problem.deleted_at.isnot(None)).execution_options(include_deleted=True)
+    ).all()
+    for candidate_id in candidate_ids:
+        purge_candidate(candidate_id)
+    for problem_id in problem_ids:
+        purge_problem(problem_id)
+    return {'candidates': len(candidate_ids), 'problems': len(problem_ids)}
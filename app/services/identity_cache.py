@@ -0,0 +1,162 @@
+"""
+Flask-Login 的 user_loader 缓存。
+
+登录时把候选人的 id、姓名和邮箱连同签发时间写进签名的 session；之后的请求在
+IDENTITY_CACHE_TTL 秒内直接用 session 中的快照构造候选人，不查询数据库。
+快照过期或不存在时，先查进程内按 id 缓存的列值（同样有 TTL），最后才查询数据库。
+
+通过 ORM 提交的修改和删除会清除本进程的缓存，并让在此之前签发的 session 快照失效；
+其他进程中的缓存和快照最多在 TTL 之后失效。构造出的对象以 load=False 合并进当前
+会话，访问未缓存的列（例如 password_hash）时才会加载。
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+from flask import current_app, has_app_context, has_request_context, session
+from flask_login import user_logged_in
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app import db
+from app.models import Candidate
+
+DEFAULT_TTL = 60.0
+DEFAULT_MAX_ENTRIES = 10000
+SESSION_KEY = '_identity'
+_CACHED_COLUMNS = ('id', 'name', 'email', 'password_hash', 'created_at')
+_SESSION_COLUMNS = ('id', 'name', 'email')
+
+
+class _IdentityCache:
+    """单个应用实例的缓存：候选人 id -> (过期时间, 列值)，以及最近失效的 id"""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries: 'OrderedDict[int, tuple]' = OrderedDict()
+        self.invalidated: Dict[int, float] = {}
+        self.lock = threading.Lock()
+
+    def get(self, candidate_id: int) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            entry = self.entries.get(candidate_id)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self.entries[candidate_id]
+                return None
+            self.entries.move_to_end(candidate_id)
+            return entry[1]
+
+    def put(self, candidate_id: int, values: Dict[str, Any]) -> None:
+        with self.lock:
+            self.entries[candidate_id] = (time.monotonic() + self.ttl, values)
+            self.entries.move_to_end(candidate_id)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, candidate_ids: Iterable[int]) -> None:
+        now = time.time()
+        with self.lock:
+            for candidate_id in candidate_ids:
+                self.entries.pop(candidate_id, None)
+                self.invalidated[candidate_id] = now
+            # 早于 TTL 的快照本来就会过期，不必再记录
+            for candidate_id in [cid for cid, at in self.invalidated.items() if at < now - self.ttl]:
+                del self.invalidated[candidate_id]
+
+    def invalidated_since(self, candidate_id: int, issued_at: float) -> bool:
+        with self.lock:
+            at = self.invalidated.get(candidate_id)
+        return at is not None and at >= issued_at
+
+
+def init_identity_cache(app) -> None:
+    app.extensions['identity_cache'] = _IdentityCache(
+        app.config.get('IDENTITY_CACHE_TTL', DEFAULT_TTL),
+        app.config.get('IDENTITY_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+    )
+
+
+def _cache() -> _IdentityCache:
+    return current_app.extensions['identity_cache']
+
+
+def _attach(values: Dict[str, Any]) -> Candidate:
+    """用列值构造候选人并以 load=False 并入当前会话，不产生查询"""
+    existing = db.session.identity_map.get(db.session.identity_key(Candidate, values['id']))
+    if existing is not None:
+        return existing
+    candidate = Candidate(**values)
+    make_transient_to_detached(candidate)
+    return db.session.merge(candidate, load=False)
+
+
+def remember_in_session(candidate: Candidate) -> None:
+    session[SESSION_KEY] = {**{name: getattr(candidate, name) for name in _SESSION_COLUMNS}, 'at': time.time()}
+
+
+def _from_session(candidate_id: int) -> Optional[Dict[str, Any]]:
+    snapshot = session.get(SESSION_KEY)
+    if not isinstance(snapshot, dict) or snapshot.get('id') != candidate_id:
+        return None
+    issued_at = snapshot.get('at') or 0
+    cache = _cache()
+    if time.time() - issued_at >= cache.ttl or cache.invalidated_since(candidate_id, issued_at):
+        return None
+    return {name: snapshot.get(name) for name in _SESSION_COLUMNS}
+
+
+def load_candidate(user_id: str) -> Optional[Candidate]:
+    """user_loader：依次尝试 session 快照、进程内缓存和数据库"""
+    try:
+        candidate_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+    in_request = has_request_context()
+
+    values = _from_session(candidate_id) if in_request else None
+    if values is not None:
+        return _attach(values)
+
+    cache = _cache()
+    values = cache.get(candidate_id)
+    if values is None:
+        candidate = db.session.get(Candidate, candidate_id)
+        if candidate is None:
+            return None
+        values = {name: getattr(candidate, name) for name in _CACHED_COLUMNS}
+        cache.put(candidate_id, values)
+    else:
+        candidate = _attach(values)
+    if in_request:
+        remember_in_session(candidate)
+    return candidate
+
+
+@user_logged_in.connect
+def _remember_login(sender, user, **extra):
+    if isinstance(user, Candidate) and has_request_context():
+        remember_in_session(user)
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_changed_candidates(session_, flush_context):
+    changed = {obj.id for obj in list(session_.dirty) + list(session_.deleted)
+               if isinstance(obj, Candidate) and obj.id is not None}
+    if changed:
+        session_.info.setdefault('identity_cache_changes', set()).update(changed)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_cached_identities(session_):
+    candidate_ids = session_.info.pop('identity_cache_changes', None)
+    if candidate_ids and has_app_context() and 'identity_cache' in current_app.extensions:
+        _cache().invalidate(candidate_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_identity_changes(session_):
+    session_.info.pop('identity_cache_changes', None)
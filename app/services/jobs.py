@@ -0,0 +1,128 @@
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, UTC
+from typing import Any, Callable, Dict, Optional
+
+from flask import current_app
+
+from app import db
+
+JOB_STATUS_QUEUED = 'queued'
+JOB_STATUS_RUNNING = 'running'
+JOB_STATUS_SUCCEEDED = 'succeeded'
+JOB_STATUS_FAILED = 'failed'
+
+DEFAULT_MAX_FINISHED_JOBS = 100
+
+
+class JobError(Exception):
+    """任务执行失败，message 会作为任务的 error 返回给调用方"""
+    pass
+
+
+class Job:
+    """一个后台任务的状态，progress 由任务函数在执行过程中更新"""
+
+    def __init__(self, kind: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = JOB_STATUS_QUEUED
+        self.progress: Dict[str, Any] = {}
+        self.result: Optional[Any] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.now(UTC)
+        self.finished_at: Optional[datetime] = None
+        self.lock = threading.Lock()
+
+    def update_progress(self, **values) -> None:
+        with self.lock:
+            self.progress.update(values)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JOB_STATUS_SUCCEEDED, JOB_STATUS_FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'id': self.id,
+                'kind': self.kind,
+                'status': self.status,
+                'progress': dict(self.progress),
+                'result': self.result,
+                'error': self.error,
+                'created_at': self.created_at.isoformat(),
+                'finished_at': self.finished_at.isoformat() if self.finished_at else None
+            }
+
+
+class JobRegistry:
+    """
+    进程内的后台任务注册表。
+
+    任务在独立线程和独立的应用上下文中执行，状态只保存在当前进程内存里，
+    已结束的任务最多保留 JOBS_MAX_FINISHED 个。JOBS_RUN_INLINE 为真时
+    （测试环境）任务在 submit 中同步执行。
+    """
+
+    def __init__(self):
+        self._jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _register(self, job: Job, max_finished: int) -> None:
+        with self._lock:
+            self._jobs[job.id] = job
+            finished = [key for key, value in self._jobs.items() if value.finished]
+            for key in finished[:max(0, len(finished) - max_finished)]:
+                del self._jobs[key]
+
+    @staticmethod
+    def _run(job: Job, func: Callable, args, kwargs) -> None:
+        job.status = JOB_STATUS_RUNNING
+        try:
+            result = func(job, *args, **kwargs)
+        except JobError as e:
+            db.session.rollback()
+            error = str(e)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Job {job.id} ({job.kind}) failed: {str(e)}")
+            error = f"Unexpected error: {str(e)}"
+        else:
+            with job.lock:
+                job.result = result
+                job.status = JOB_STATUS_SUCCEEDED
+                job.finished_at = datetime.now(UTC)
+            return
+        with job.lock:
+            job.error = error
+            job.status = JOB_STATUS_FAILED
+            job.finished_at = datetime.now(UTC)
+
+    def submit(self, kind: str, func: Callable, *args, **kwargs) -> Job:
+        """提交任务，func(job, *args, **kwargs) 的返回值作为任务结果"""
+        app = current_app._get_current_object()
+        job = Job(kind)
+        self._register(job, app.config.get('JOBS_MAX_FINISHED', DEFAULT_MAX_FINISHED_JOBS))
+
+        if app.config.get('JOBS_RUN_INLINE'):
+            self._run(job, func, args, kwargs)
+            return job
+
+        def target():
+            with app.app_context():
+                try:
+                    self._run(job, func, args, kwargs)
+                finally:
+                    db.session.remove()
+
+        threading.Thread(target=target, name=f"job-{kind}-{job.id[:8]}", daemon=True).start()
+        return job
+
+
+jobs = JobRegistry()
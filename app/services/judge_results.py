@@ -0,0 +1,63 @@
+"""
+基于 submission_test_results 的统计查询，以及把旧的 JSON 结果迁移成行。
+"""
+import json
+from typing import Any, Dict, List
+
+from sqlalchemy import case, func
+
+from app import db
+from app.models import Submission, SubmissionTestResult
+
+
+def pass_rates_by_test_case(problem_id: int) -> List[Dict[str, Any]]:
+    """题目下每个测试用例的运行次数、通过次数和通过率"""
+    passed = func.sum(case((SubmissionTestResult.passed, 1), else_=0))
+    rows = db.session.execute(
+        db.select(SubmissionTestResult.test_case_id, func.count().label('runs'), passed.label('passed'))
+        .join(Submission, Submission.id == SubmissionTestResult.submission_id)
+        .where(Submission.problem_id == problem_id, SubmissionTestResult.test_case_id.is_not(None))
+        .group_by(SubmissionTestResult.test_case_id)
+        .order_by(SubmissionTestResult.test_case_id)
+    ).all()
+    return [{
+        'test_case_id': row.test_case_id,
+        'runs': row.runs,
+        'passed': row.passed,
+        'pass_rate': row.passed / row.runs if row.runs else None
+    } for row in rows]
+
+
+def slowest_test_runs(problem_id: int, limit: int = 10) -> List[Dict[str, Any]]:
+    """题目下耗时最长的测试用例运行"""
+    rows = db.session.execute(
+        db.select(SubmissionTestResult.submission_id, SubmissionTestResult.test_case_id,
+                  SubmissionTestResult.time, SubmissionTestResult.memory, SubmissionTestResult.status)
+        .join(Submission, Submission.id == SubmissionTestResult.submission_id)
+        .where(Submission.problem_id == problem_id, SubmissionTestResult.time.is_not(None))
+        .order_by(SubmissionTestResult.time.desc())
+        .limit(limit)
+    ).all()
+    return [dict(row._mapping) for row in rows]
+
+
+def migrate_legacy_test_results(batch_size: int = 200) -> int:
+    """把 submissions.test_results 中的 JSON 分批拆成 submission_test_results 行，返回迁移的提交数"""
+    migrated = 0
+    last_id = 0
+    while True:
+        submissions = Submission.query.filter(
+            Submission.id > last_id, Submission.legacy_test_results.is_not(None)
+        ).order_by(Submission.id).limit(batch_size).all()
+        if not submissions:
+            return migrated
+        for submission in submissions:
+            try:
+                results = json.loads(submission.legacy_test_results)
+            except ValueError:
+                continue
+            if isinstance(results, list):
+                submission.test_results = [r for r in results if isinstance(r, dict)]
+                migrated += 1
+        last_id = submissions[-1].id
+        db.session.commit()
@@ -0,0 +1,179 @@
+"""
+latest_submissions 指针表：每个 (候选人, 题目) 一行，记录最新提交、最佳提交和提交次数。
+
+新提交 flush 后（此时已有 id）在同一事务里以 upsert 更新指针，
+读取最新或最佳结果只需要按主键取一行，不必扫描提交历史。
+"""
+import json
+from datetime import datetime, UTC
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import and_, case, event, or_
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import LatestSubmission, Submission, SubmissionTestResult
+
+REBUILD_BATCH_SIZE = 1000
+
+_BEST_COLUMNS = ('best_submission_id', 'best_status', 'best_accepted', 'best_passed')
+
+
+def _passed_in_legacy(test_results: Optional[str]) -> int:
+    try:
+        results = json.loads(test_results) if test_results else []
+    except ValueError:
+        return 0
+    if not isinstance(results, list):
+        return 0
+    return sum(1 for r in results if isinstance(r, dict) and r.get('passed'))
+
+
+def _pointer_row(submission_id: int, candidate_id: int, problem_id: int, status: Optional[str], passed: int) -> Dict[str, Any]:
+    return {
+        'candidate_id': candidate_id,
+        'problem_id': problem_id,
+        'latest_submission_id': submission_id,
+        'best_submission_id': submission_id,
+        'best_status': status,
+        'best_accepted': status == 'Accepted',
+        'best_passed': passed,
+        'attempts': 1
+    }
+
+
+def _is_better(candidate: Dict[str, Any], current: Dict[str, Any]) -> bool:
+    if current['best_submission_id'] is None:
+        return True
+    return (candidate['best_accepted'], candidate['best_passed']) > (current['best_accepted'], current['best_passed'])
+
+
+def merge_pointer(current: Dict[str, Any], newer: Dict[str, Any]) -> Dict[str, Any]:
+    """把较新的提交（或一组较新提交合并后的指针）并入已有指针"""
+    merged = dict(current)
+    merged['latest_submission_id'] = newer['latest_submission_id']
+    merged['attempts'] = current['attempts'] + newer['attempts']
+    if _is_better(newer, current):
+        for name in _BEST_COLUMNS:
+            merged[name] = newer[name]
+    return merged
+
+
+def _fold(rows: Iterable[Dict[str, Any]]) -> Dict[Tuple[int, int], Dict[str, Any]]:
+    """按提交 id 顺序把指针行合并成每个 (候选人, 题目) 一行"""
+    pointers: Dict[Tuple[int, int], Dict[str, Any]] = {}
+    for row in sorted(rows, key=lambda r: r['latest_submission_id']):
+        key = (row['candidate_id'], row['problem_id'])
+        pointers[key] = merge_pointer(pointers[key], row) if key in pointers else row
+    return pointers
+
+
+def _upsert_pointers(connection, rows) -> None:
+    if not rows:
+        return
+    table = LatestSubmission.__table__
+    now = datetime.now(UTC)
+    rows = [{**row, 'updated_at': now} for row in rows]
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table)
+        excluded = stmt.excluded
+        better = or_(
+            table.c.best_submission_id.is_(None),
+            excluded.best_accepted > table.c.best_accepted,
+            and_(excluded.best_accepted == table.c.best_accepted, excluded.best_passed > table.c.best_passed)
+        )
+        set_ = {name: case((better, excluded[name]), else_=table.c[name]) for name in _BEST_COLUMNS}
+        set_.update(
+            latest_submission_id=excluded.latest_submission_id,
+            attempts=table.c.attempts + excluded.attempts,
+            updated_at=excluded.updated_at
+        )
+        connection.execute(stmt.on_conflict_do_update(index_elements=['candidate_id', 'problem_id'], set_=set_), rows)
+        return
+    for row in rows:
+        condition = and_(table.c.candidate_id == row['candidate_id'], table.c.problem_id == row['problem_id'])
+        current = connection.execute(db.select(table).where(condition)).mappings().first()
+        if current is None:
+            connection.execute(db.insert(table).values(row))
+        else:
+            connection.execute(db.update(table).where(condition).values(merge_pointer(dict(current), row)))
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_new_submissions(session, flush_context):
+    rows = []
+    for obj in session.new:
+        if isinstance(obj, Submission) and obj.candidate_id is not None and obj.problem_id is not None:
+            if obj.results:
+                passed = sum(1 for result in obj.results if result.passed)
+            else:
+                passed = _passed_in_legacy(obj.legacy_test_results)
+            rows.append(_pointer_row(obj.id, obj.candidate_id, obj.problem_id, obj.status, passed))
+    if rows:
+        _upsert_pointers(session.connection(), list(_fold(rows).values()))
+
+
+def compute_pointers(candidate_id: Optional[int] = None, problem_id: Optional[int] = None,
+                     batch_size: int = REBUILD_BATCH_SIZE) -> Tuple[Dict[Tuple[int, int], Dict[str, Any]], int]:
+    """只读地根据提交历史计算指针，返回 ({(候选人, 题目): 指针行}, 处理的提交数)"""
+    scope = []
+    if candidate_id is not None:
+        scope.append(Submission.candidate_id == candidate_id)
+    if problem_id is not None:
+        scope.append(Submission.problem_id == problem_id)
+
+    pointers: Dict[Tuple[int, int], Dict[str, Any]] = {}
+    processed = 0
+    last_id = 0
+    while True:
+        submissions = db.session.execute(
+            db.select(Submission.id, Submission.candidate_id, Submission.problem_id, Submission.status,
+                      Submission.legacy_test_results)
+            .where(Submission.id > last_id, *scope)
+            .order_by(Submission.id).limit(batch_size)
+        ).all()
+        if not submissions:
+            break
+        passed_counts = dict(db.session.execute(
+            db.select(SubmissionTestResult.submission_id,
+                      db.func.sum(case((SubmissionTestResult.passed, 1), else_=0)))
+            .where(SubmissionTestResult.submission_id.in_([sub.id for sub in submissions]))
+            .group_by(SubmissionTestResult.submission_id)
+        ).all())
+        for sub in submissions:
+            passed = passed_counts.get(sub.id)
+            if passed is None:
+                passed = _passed_in_legacy(sub.legacy_test_results)
+            row = _pointer_row(sub.id, sub.candidate_id, sub.problem_id, sub.status, int(passed))
+            key = (sub.candidate_id, sub.problem_id)
+            pointers[key] = merge_pointer(pointers[key], row) if key in pointers else row
+        processed += len(submissions)
+        last_id = submissions[-1].id
+    return pointers, processed
+
+
+def rebuild_latest_submissions(candidate_id: Optional[int] = None, problem_id: Optional[int] = None,
+                               batch_size: int = REBUILD_BATCH_SIZE) -> int:
+    """根据提交历史重新生成指针并提交事务，返回处理的提交数"""
+    delete = db.delete(LatestSubmission)
+    if candidate_id is not None:
+        delete = delete.where(LatestSubmission.candidate_id == candidate_id)
+    if problem_id is not None:
+        delete = delete.where(LatestSubmission.problem_id == problem_id)
+    db.session.execute(delete)
+
+    pointers, processed = compute_pointers(candidate_id, problem_id, batch_size)
+    if pointers:
+        now = datetime.now(UTC)
+        db.session.execute(db.insert(LatestSubmission), [{**row, 'updated_at': now} for row in pointers.values()])
+    db.session.commit()
+    return processed
+
+
+def get_pointer(candidate_id: int, problem_id: int) -> Optional[LatestSubmission]:
+    return db.session.get(LatestSubmission, (candidate_id, problem_id))
@@ -1,10 +1,15 @@
-from flask import current_app
+from flask import current_app, has_app_context
 import requests
 import json
 import time
-from app.models import Setting, Problem, Submission
+import threading
+from datetime import datetime, timedelta, UTC
+from sqlalchemy import update
+from app.models import Problem, Submission
 from app import db
-from typing import Optional, Dict, Any, Union
+from app.services.prompt_budget import PromptBudgeter, budget_stats
+from app.services.settings_cache import settings_cache
+from typing import Optional, Dict, Any, Union, Callable
 from requests.exceptions import RequestException, Timeout, ConnectionError
 import logging
 
@@ -13,6 +18,28 @@ DEEPSEEK_API_KEY_SETTING = 'deepseek_api_key'
 DEFAULT_LLM_MODEL = 'deepseek-coder'
 REQUEST_TIMEOUT = 120  # 秒
 STREAM_BUFFER_SIZE = 100  # 字符
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_RETRY_BACKOFF = 1.0  # 秒，按 2 的指数增长
+MAX_RETRY_DELAY = 30.0
+REVIEW_SYSTEM_PROMPT = 'You are a helpful AI assistant that reviews code.'
+
+# 评审状态
+REVIEW_STATUS_PENDING = 'pending'
+REVIEW_STATUS_STREAMING = 'streaming'
+REVIEW_STATUS_DONE = 'done'
+REVIEW_STATUS_FAILED = 'failed'
+LEGACY_REVIEW_ERROR_PREFIXES = ('Error generating review:', 'Unexpected error:')
+# 可以认领并开始评审的状态；认领后变为 streaming，其他调用方不会再重复评审
+CLAIMABLE_REVIEW_STATUSES = (REVIEW_STATUS_PENDING, REVIEW_STATUS_FAILED)
+# 配置错误（缺少 API Key、URL 等）重试也不会成功，恢复任务不重试
+CONFIG_ERROR_PREFIX = 'Configuration error: '
+
+DEFAULT_CHECKPOINT_CHARS = 500        # 至少新增这么多字符才写一次检查点
+DEFAULT_CHECKPOINT_SECONDS = 2.0      # 或距上次写入超过该秒数
+DEFAULT_REVIEW_STALE_SECONDS = REQUEST_TIMEOUT + 30  # 超过该时间没有进度的评审视为已中断
+DEFAULT_MAX_REVIEW_ATTEMPTS = 3
+DEFAULT_RECOVERY_INTERVAL = 60        # 秒
 
 class LLMServiceError(Exception):
     """LLM 服务基础异常类"""
@@ -38,14 +65,17 @@ class LLMService:
     def __init__(self):
         self.api_key = self._get_api_key()
         self.base_url = current_app.config.get('DEEPSEEK_API_URL', 'https://api.deepseek.com')
+        if not self.base_url:
+            raise LLMConfigError("DEEPSEEK_API_URL is not configured")
         self.logger = logging.getLogger(__name__)
+        self.last_prompt_budget = None
 
     def _get_api_key(self) -> Optional[str]:
         """获取 API Key，如果未配置则抛出异常"""
-        api_key_setting = Setting.query.get(DEEPSEEK_API_KEY_SETTING)
-        if not api_key_setting or not api_key_setting.value:
+        api_key = settings_cache.get(DEEPSEEK_API_KEY_SETTING)
+        if not api_key:
             raise LLMConfigError(f"{DEEPSEEK_API_KEY_SETTING} not found in settings")
-        return api_key_setting.value
+        return api_key
 
     def get_llm_prompt_for_problem(self, problem_id: int) -> str:
         """获取题目的 LLM Prompt，如果未找到则使用默认值"""
@@ -59,18 +89,37 @@ class LLMService:
         
         return problem.llm_prompt
 
+    def _retry_delay(self, response: requests.Response, attempt: int) -> float:
+        """优先使用服务端的 Retry-After，否则指数退避"""
+        retry_after = response.headers.get('Retry-After')
+        try:
+            if retry_after is not None:
+                return min(float(retry_after), MAX_RETRY_DELAY)
+        except ValueError:
+            pass
+        backoff = current_app.config.get('LLM_RETRY_BACKOFF', DEFAULT_RETRY_BACKOFF)
+        return min(backoff * (2 ** attempt), MAX_RETRY_DELAY)
+
     def _make_api_request(self, headers: Dict[str, str], payload: Dict[str, Any], stream: bool = False) -> requests.Response:
-        """发送 API 请求"""
+        """发送 API 请求，遇到限流 (429) 或 5xx 时按配置重试"""
+        max_retries = current_app.config.get('LLM_MAX_RETRIES', DEFAULT_MAX_RETRIES)
         try:
-            response = requests.post(
-                f'{self.base_url}/v1/chat/completions',
-                headers=headers,
-                json=payload,
-                stream=stream,
-                timeout=REQUEST_TIMEOUT
-            )
-            response.raise_for_status()
-            return response
+            for attempt in range(max_retries + 1):
+                response = requests.post(
+                    f'{self.base_url}/v1/chat/completions',
+                    headers=headers,
+                    json=payload,
+                    stream=stream,
+                    timeout=REQUEST_TIMEOUT
+                )
+                if response.status_code in RETRYABLE_STATUS_CODES and attempt < max_retries:
+                    delay = self._retry_delay(response, attempt)
+                    self.logger.warning(f"LLM API returned {response.status_code}, retrying in {delay:.2f}s")
+                    response.close()
+                    time.sleep(delay)
+                    continue
+                response.raise_for_status()
+                return response
         except Timeout:
             self.logger.error("LLM API request timed out")
             raise LLMTimeoutError("Request to LLM API timed out")
@@ -107,36 +156,63 @@ class LLMService:
         self.logger.error(f"Error processing stream chunk: {chunk}, error: {str(error)}")
         raise LLMResponseError(f"Error processing stream response: {str(error)}")
 
-    def generate_review(self, code: str, problem_id: int, language: str, stream: bool = False) -> str:
+    def build_review_prompt(self, llm_prompt_template: str, code: str, language: str, model: str) -> str:
+        """按模型的 token 预算裁剪后拼接评审 prompt，裁剪信息记录在 last_prompt_budget"""
+        budgeter = PromptBudgeter.for_model(model, current_app.config)
+        budget = budgeter.fit(
+            llm_prompt_template,
+            code,
+            language=language,
+            overhead=f"{REVIEW_SYSTEM_PROMPT}\n\nLanguage: {language}\n\nCode to review:\n```\n\n```"
+        )
+        self.last_prompt_budget = budget
+
+        final_prompt = f"{budget.prompt_template}\n\nLanguage: {language}\n\nCode to review:\n```\n{budget.code}\n```"
+        if budget.trimmed:
+            self.logger.info(
+                f"Prompt trimmed from ~{budget.original_tokens} to ~{budget.final_tokens} tokens "
+                f"(budget {budget.budget}): {', '.join(trim['kind'] for trim in budget.trims)}"
+            )
+            final_prompt += "\n\nThe code above was trimmed to fit the review budget; markers such as " \
+                            "'[trimmed ...]' or '[... folded ...]' stand for omitted content and are not part of the submission."
+        return final_prompt
+
+    def complete(self, user_prompt: str, model: Optional[str] = None, stream: bool = False,
+                 on_progress: Optional[Callable[[str], None]] = None) -> str:
+        """以统一的 system prompt 发送一次对话补全请求并返回内容"""
+        headers = {
+            'Authorization': f'Bearer {self.api_key}',
+            'Content-Type': 'application/json'
+        }
+
+        payload = {
+            'model': model or current_app.config.get('LLM_MODEL', DEFAULT_LLM_MODEL),
+            'messages': [
+                {'role': 'system', 'content': REVIEW_SYSTEM_PROMPT},
+                {'role': 'user', 'content': user_prompt}
+            ],
+            'stream': stream
+        }
+
+        try:
+            response = self._make_api_request(headers, payload, stream)
+        except (LLMAPIError, LLMTimeoutError) as e:
+            self.logger.error(f"LLM API request failed after retries: {str(e)}")
+            raise
+
+        if stream:
+            return self._handle_stream_response(response, on_progress)
+        else:
+            return self._validate_response(response.json())
+
+    def generate_review(self, code: str, problem_id: int, language: str, stream: bool = False,
+                        on_progress: Optional[Callable[[str], None]] = None) -> str:
         """生成代码评审"""
         try:
             llm_prompt_template = self.get_llm_prompt_for_problem(problem_id)
-            final_prompt = f"{llm_prompt_template}\n\nLanguage: {language}\n\nCode to review:\n```\n{code}\n```"
-
-            headers = {
-                'Authorization': f'Bearer {self.api_key}',
-                'Content-Type': 'application/json'
-            }
-            
-            payload = {
-                'model': current_app.config.get('LLM_MODEL', DEFAULT_LLM_MODEL),
-                'messages': [
-                    {'role': 'system', 'content': 'You are a helpful AI assistant that reviews code.'},
-                    {'role': 'user', 'content': final_prompt}
-                ],
-                'stream': stream
-            }
-
-            try:
-                response = self._make_api_request(headers, payload, stream)
-            except (LLMAPIError, LLMTimeoutError) as e:
-                self.logger.error(f"LLM API request failed after retries: {str(e)}")
-                raise
-
-            if stream:
-                return self._handle_stream_response(response)
-            else:
-                return self._validate_response(response.json())
+            model = current_app.config.get('LLM_MODEL', DEFAULT_LLM_MODEL)
+            final_prompt = self.build_review_prompt(llm_prompt_template, code, language, model)
+            return self.complete(final_prompt, model, stream, on_progress)
 
         except LLMConfigError as e:
             self.logger.error(f"LLM configuration error: {str(e)}")
@@ -151,8 +227,8 @@ class LLMService:
             self.logger.error(f"Unexpected error in LLM review generation: {str(e)}")
             raise LLMServiceError(f"Unexpected error: {str(e)}")
 
-    def _handle_stream_response(self, response: requests.Response) -> str:
-        """处理流式响应"""
+    def _handle_stream_response(self, response: requests.Response, on_progress: Optional[Callable[[str], None]] = None) -> str:
+        """处理流式响应，每累积 STREAM_BUFFER_SIZE 个字符回调一次 on_progress(已收到的全部内容)"""
         full_response_content = ""
         buffer = ""
         start_time = time.time()
@@ -170,8 +246,6 @@ class LLMService:
                     json_data_str = decoded_chunk[len('data: '):]
                     
                     if json_data_str.strip() == "[DONE]":
-                        if buffer:
-                            full_response_content += buffer
                         break
                         
                     try:
@@ -183,11 +257,16 @@ class LLMService:
                             if len(buffer) >= STREAM_BUFFER_SIZE:
                                 full_response_content += buffer
                                 buffer = ""
+                                if on_progress:
+                                    on_progress(full_response_content)
                     except json.JSONDecodeError as e:
                         self._handle_stream_error(json_data_str, e)
                     except KeyError as e:
                         self._handle_stream_error(json_data_str, e)
-                        
+
+            if buffer:
+                full_response_content += buffer
+
             if not full_response_content.strip():
                 raise LLMResponseError("Empty response from LLM")
                 
@@ -197,82 +276,229 @@ class LLMService:
             self.logger.error(f"Error processing stream response: {str(e)}")
             raise LLMResponseError(f"Stream processing error: {str(e)}")
 
+
+class ReviewCheckpointer:
+    """流式评审过程中按字符数/时间间隔把已收到的内容写回数据库"""
+
+    def __init__(self, submission_id: int, min_chars: int = DEFAULT_CHECKPOINT_CHARS, min_interval: float = DEFAULT_CHECKPOINT_SECONDS):
+        self.submission_id = submission_id
+        self.min_chars = min_chars
+        self.min_interval = min_interval
+        self.saved_length = 0
+        self.saved_at = time.monotonic()
+        self.checkpoints = 0
+
+    def __call__(self, content: str) -> None:
+        if len(content) - self.saved_length < self.min_chars and time.monotonic() - self.saved_at < self.min_interval:
+            return
+        try:
+            db.session.execute(
+                update(Submission)
+                .where(Submission.id == self.submission_id)
+                .values(llm_review=content, llm_review_status=REVIEW_STATUS_STREAMING, llm_review_updated_at=datetime.now(UTC))
+            )
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.warning(f"Failed to checkpoint LLM review for submission {self.submission_id}: {str(e)}")
+            return
+        self.saved_length = len(content)
+        self.saved_at = time.monotonic()
+        self.checkpoints += 1
+
+
+def review_is_complete(submission: Submission) -> bool:
+    """评审已完成（兼容没有状态字段的旧数据：非错误文本的评审视为完成）"""
+    if submission.llm_review_status:
+        return submission.llm_review_status == REVIEW_STATUS_DONE
+    return bool(submission.llm_review) and not submission.llm_review.startswith(LEGACY_REVIEW_ERROR_PREFIXES)
+
+
+def _legacy_failed_review():
+    """没有状态字段的旧数据中，评审内容是错误信息的行，视同 failed"""
+    return db.and_(
+        Submission.llm_review_status.is_(None),
+        db.or_(*[Submission.llm_review.startswith(prefix, autoescape=True) for prefix in LEGACY_REVIEW_ERROR_PREFIXES])
+    )
+
+
+def _run_review(submission_id: int) -> None:
+    submission = db.session.get(Submission, submission_id)
+    if not submission:
+        current_app.logger.error(f"Submission {submission_id} not found for async LLM review")
+        return
+
+    if review_is_complete(submission):
+        current_app.logger.info(f"LLM review for submission {submission_id} already exists")
+        return
+
+    # 以比较并交换的方式认领：重复调用或与恢复任务重叠时只有一方会真正执行评审
+    claimed = db.session.execute(
+        update(Submission)
+        .where(Submission.id == submission_id,
+               db.or_(Submission.llm_review_status.in_(CLAIMABLE_REVIEW_STATUSES), _legacy_failed_review()))
+        .values(llm_review=None, llm_review_error=None, llm_review_status=REVIEW_STATUS_STREAMING,
+                llm_review_attempts=db.func.coalesce(Submission.llm_review_attempts, 0) + 1,
+                llm_review_updated_at=datetime.now(UTC))
+    ).rowcount
+    db.session.commit()
+    if not claimed:
+        current_app.logger.info(f"LLM review for submission {submission_id} is already in progress")
+        return
+    submission = db.session.get(Submission, submission_id)
+
+    try:
+        llm_service = LLMService()
+        checkpointer = ReviewCheckpointer(
+            submission_id,
+            min_chars=current_app.config.get('LLM_REVIEW_CHECKPOINT_CHARS', DEFAULT_CHECKPOINT_CHARS),
+            min_interval=current_app.config.get('LLM_REVIEW_CHECKPOINT_SECONDS', DEFAULT_CHECKPOINT_SECONDS)
+        )
+        review_content = llm_service.generate_review(
+            code=submission.code,
+            problem_id=submission.problem_id,
+            language=submission.language,
+            stream=True,
+            on_progress=checkpointer
+        )
+
+        # 提示评审人员代码在送审前被裁剪过
+        if llm_service.last_prompt_budget and llm_service.last_prompt_budget.trimmed:
+            review_content = f"{review_content}\n\n---\n{llm_service.last_prompt_budget.notice()}"
+
+        submission = db.session.get(Submission, submission_id)
+        submission.llm_review = review_content
+        submission.llm_review_status = REVIEW_STATUS_DONE
+        submission.llm_review_updated_at = datetime.now(UTC)
+        try:
+            db.session.commit()
+            current_app.logger.info(f"LLM review for submission {submission_id} completed and saved")
+            # 本次 prompt 的预算使用情况和进程内累计的裁剪节省，随评审一起记录
+            budget = llm_service.last_prompt_budget
+            if budget is not None:
+                current_app.logger.info(
+                    f"Prompt budget for submission {submission_id}: ~{budget.final_tokens}/{budget.budget} tokens "
+                    f"(~{budget.tokens_saved} saved); totals: {budget_stats.snapshot()}"
+                )
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Failed to save LLM review for submission {submission_id}: {str(e)}")
+            raise
+
+    except Exception as e:
+        db.session.rollback()
+        if isinstance(e, LLMServiceError):
+            current_app.logger.error(f"LLM service error for submission {submission_id}: {str(e)}")
+        else:
+            current_app.logger.error(f"Unexpected error in async LLM review for submission {submission_id}: {str(e)}")
+        # 错误信息单独保存，llm_review 中保留已收到的部分内容
+        error = f"{CONFIG_ERROR_PREFIX}{e}" if isinstance(e, LLMConfigError) else str(e)
+        try:
+            db.session.execute(
+                update(Submission)
+                .where(Submission.id == submission_id)
+                .values(llm_review_status=REVIEW_STATUS_FAILED, llm_review_error=error, llm_review_updated_at=datetime.now(UTC))
+            )
+            db.session.commit()
+        except Exception as db_error:
+            db.session.rollback()
+            current_app.logger.error(f"Failed to save error message for submission {submission_id}: {str(db_error)}")
+
+
 def generate_llm_review_async(submission_id: int) -> None:
-    """异步生成 LLM 评审"""
+    """异步生成 LLM 评审，流式内容分块写回数据库，状态记录在 llm_review_status"""
+    if has_app_context():
+        _run_review(submission_id)
+        return
+
     from app import create_app
-    
+
     app = create_app()
     with app.app_context():
-        try:
-            submission = Submission.query.get(submission_id)
-            if not submission:
-                current_app.logger.error(f"Submission {submission_id} not found for async LLM review")
-                return
-
-            if submission.llm_review:
-                current_app.logger.info(f"LLM review for submission {submission_id} already exists")
-                return
-
-            llm_service = LLMService()
-            review_content = llm_service.generate_review(
-                code=submission.code,
-                problem_id=submission.problem_id,
-                language=submission.language,
-                stream=False
+        _run_review(submission_id)
+
+
+def find_interrupted_reviews(stale_after: float, max_attempts: int = DEFAULT_MAX_REVIEW_ATTEMPTS):
+    """
+    查找被中断的评审：pending/streaming 状态且超过 stale_after 秒没有写入进度，
+    或者失败次数尚未达到 max_attempts、且不是因为配置错误失败的评审（包括旧数据中以错误信息
+    作为评审内容的行）。
+    """
+    cutoff = datetime.now(UTC) - timedelta(seconds=stale_after)
+    return Submission.query.with_entities(
+        Submission.id, Submission.llm_review_status, Submission.llm_review_updated_at
+    ).filter(
+        db.or_(
+            db.and_(
+                Submission.llm_review_status.in_([REVIEW_STATUS_PENDING, REVIEW_STATUS_STREAMING]),
+                db.or_(Submission.llm_review_updated_at.is_(None), Submission.llm_review_updated_at < cutoff)
+            ),
+            db.and_(
+                Submission.llm_review_status == REVIEW_STATUS_FAILED,
+                Submission.llm_review_attempts < max_attempts,
+                Submission.llm_review_updated_at < cutoff,
+                db.or_(Submission.llm_review_error.is_(None),
+                       db.not_(Submission.llm_review_error.startswith(CONFIG_ERROR_PREFIX, autoescape=True)))
+            ),
+            db.and_(
+                _legacy_failed_review(),
+                db.func.coalesce(Submission.llm_review_attempts, 0) < max_attempts,
+                db.or_(Submission.llm_review_updated_at.is_(None), Submission.llm_review_updated_at < cutoff)
             )
+        )
+    ).order_by(Submission.id).all()
 
-            submission.llm_review = review_content
-            try:
-                db.session.commit()
-                current_app.logger.info(f"LLM review for submission {submission_id} completed and saved")
-            except Exception as e:
-                db.session.rollback()
-                current_app.logger.error(f"Failed to save LLM review for submission {submission_id}: {str(e)}")
-                raise
-                
-        except LLMServiceError as e:
-            current_app.logger.error(f"LLM service error for submission {submission_id}: {str(e)}")
-            # 将错误信息保存到 submission 中
-            if submission:
-                submission.llm_review = f"Error generating review: {str(e)}"
-                try:
-                    db.session.commit()
-                except Exception as db_error:
-                    db.session.rollback()
-                    current_app.logger.error(f"Failed to save error message for submission {submission_id}: {str(db_error)}")
-        except Exception as e:
-            current_app.logger.error(f"Unexpected error in async LLM review for submission {submission_id}: {str(e)}")
-            if submission:
-                submission.llm_review = f"Unexpected error: {str(e)}"
+
+def recover_interrupted_reviews(stale_after: Optional[float] = None, max_attempts: Optional[int] = None) -> list:
+    """重新执行被中断的评审，返回重新开始的提交 ID 列表"""
+    config = current_app.config
+    stale_after = stale_after if stale_after is not None else config.get('LLM_REVIEW_STALE_SECONDS', DEFAULT_REVIEW_STALE_SECONDS)
+    max_attempts = max_attempts if max_attempts is not None else config.get('LLM_REVIEW_MAX_ATTEMPTS', DEFAULT_MAX_REVIEW_ATTEMPTS)
+
+    restarted = []
+    for submission_id, status, updated_at in find_interrupted_reviews(stale_after, max_attempts):
+        # 以比较并交换的方式认领，避免多个进程同时重跑同一条评审
+        claimed = db.session.execute(
+            update(Submission)
+            .where(
+                Submission.id == submission_id,
+                Submission.llm_review_status == status,
+                Submission.llm_review_updated_at.is_(None) if updated_at is None else Submission.llm_review_updated_at == updated_at
+            )
+            .values(llm_review_status=REVIEW_STATUS_PENDING, llm_review_updated_at=datetime.now(UTC))
+        ).rowcount
+        db.session.commit()
+        if not claimed:
+            continue
+        current_app.logger.info(f"Restarting interrupted LLM review for submission {submission_id} (was {status})")
+        _run_review(submission_id)
+        restarted.append(submission_id)
+    return restarted
+
+
+_recovery_lock = threading.Lock()
+_recovery_started = False
+
+
+def start_review_recovery(app) -> None:
+    """在后台线程中周期性恢复被中断的评审（每个进程只启动一次）"""
+    global _recovery_started
+    with _recovery_lock:
+        if _recovery_started:
+            return
+        _recovery_started = True
+
+    interval = app.config.get('LLM_REVIEW_RECOVERY_INTERVAL', DEFAULT_RECOVERY_INTERVAL)
+
+    def loop():
+        while True:
+            with app.app_context():
                 try:
-                    db.session.commit()
-                except Exception as db_error:
-                    db.session.rollback()
-                    current_app.logger.error(f"Failed to save error message for submission {submission_id}: {str(db_error)}")
-
-if __name__ == '__main__':
-    # This part is for conceptual testing and would require a Flask app context.
-    # To run this standalone, you'd mock current_app, db, models, etc.
-    class MockApp:
-        def __init__(self):
-            self.config = {
-                'DEEPSEEK_API_URL': 'https://api.deepseek.com',
-                'LLM_MODEL': 'deepseek-coder',
-                'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:' # For mock DB
-            }
-            self.logger = MockLogger()
-
-    class MockLogger:
-        def info(self, msg): print(f"INFO: {msg}")
-        def warning(self, msg): print(f"WARNING: {msg}")
-        def error(self, msg): print(f"ERROR: {msg}")
-
-    # current_app = MockApp() # This would be needed for standalone execution
-    # db.create_all() # If using a real DB for testing
-
-    # Example usage (conceptual):
-    # llm_service = LLMService()
-    # test_code = "def hello():\n  print('Hello, world!')"
-    # review = llm_service.generate_review(test_code, problem_id=1, language='python')
-    # print(f"LLM Review: {review}")
-    pass
+                    recover_interrupted_reviews()
+                except Exception as e:
+                    app.logger.error(f"LLM review recovery failed: {str(e)}")
+                finally:
+                    db.session.remove()
+            time.sleep(interval)
+
+    threading.Thread(target=loop, name='llm-review-recovery', daemon=True).start()
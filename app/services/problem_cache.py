@@ -0,0 +1,147 @@
+"""
+题目和测试用例读接口的 HTTP 缓存。
+
+每道题有一个版本号 Problem.version，题目本身或它的测试用例被修改时加一。
+读接口先用一条按主键（题目列表用一条聚合）的查询取出版本戳，据此生成强 ETag
+和 Last-Modified：客户端缓存仍然有效时直接返回 304；否则在版本戳未变时复用
+进程内缓存的响应体，只有版本变化后才重新查询并序列化。
+
+版本戳每次都从数据库读取，所以多进程部署下也不会返回过期内容；写接口提交后
+清除本进程中对应的缓存项，只是为了尽早释放内存。
+"""
+import threading
+from collections import OrderedDict
+from datetime import datetime, UTC
+from typing import Any, Callable, Hashable, Iterable, Optional, Tuple
+
+from flask import Response, current_app, has_app_context, json, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Problem, TestCase
+
+DEFAULT_MAX_ENTRIES = 1024
+LIST_KEY = 'problems'
+
+
+class _ResponseCache:
+    """单个应用实例的响应缓存：key -> (版本戳, 响应体)"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: 'OrderedDict[Hashable, Tuple[Any, bytes]]' = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: Hashable, stamp: Any) -> Optional[bytes]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != stamp:
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Hashable, stamp: Any, body: bytes) -> None:
+        with self.lock:
+            self.entries[key] = (stamp, body)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def discard_problems(self, problem_ids: Iterable[int]) -> None:
+        problem_ids = set(problem_ids)
+        with self.lock:
+            for key in [key for key in self.entries if key == LIST_KEY or
+                        (isinstance(key, tuple) and key[1] in problem_ids)]:
+                del self.entries[key]
+
+
+def init_problem_cache(app) -> None:
+    app.extensions['problem_cache'] = _ResponseCache(
+        app.config.get('PROBLEM_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+    )
+
+
+def _cache() -> _ResponseCache:
+    return current_app.extensions['problem_cache']
+
+
+def problem_stamp(problem_id: int) -> Optional[Tuple[int, Optional[datetime]]]:
+    """(version, updated_at)，题目不存在时返回 None"""
+    row = db.session.execute(
+        db.select(Problem.version, Problem.updated_at).where(Problem.id == problem_id)
+    ).first()
+    return None if row is None else (row.version, row.updated_at)
+
+
+def problem_list_stamp() -> Tuple[int, int, int, Optional[datetime]]:
+    """题目数、版本号之和、最大 id 和最近修改时间；增删改任一题目都会改变前三项之一"""
+    row = db.session.execute(
+        db.select(db.func.count(Problem.id), db.func.coalesce(db.func.sum(Problem.version), 0),
+                  db.func.coalesce(db.func.max(Problem.id), 0), db.func.max(Problem.updated_at))
+    ).one()
+    return tuple(row)
+
+
+def cached_json_response(key: Hashable, etag: str, last_modified: Optional[datetime],
+                         build: Callable[[], Any]) -> Response:
+    """按 etag 复用缓存的响应体并处理条件请求，build() 只在缓存失效时调用"""
+    cache = _cache()
+    body = cache.get(key, etag)
+    if body is None:
+        body = json.dumps(build()).encode('utf-8')
+        cache.put(key, etag, body)
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified.replace(tzinfo=UTC)
+    # 允许缓存但每次都要重新验证，修改能立即被看到
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def bump_problem_versions(session, problem_ids: Iterable[int]) -> None:
+    """把题目版本号加一；用于绕过 ORM 的批量写入测试用例之后"""
+    problem_ids = {problem_id for problem_id in problem_ids if problem_id is not None}
+    if not problem_ids:
+        return
+    changed = session.info.setdefault('problem_cache_changes', set())
+    changed.update(problem_ids)
+    remaining = set()
+    for problem_id in problem_ids:
+        problem = session.identity_map.get(session.identity_key(Problem, problem_id))
+        if problem is None:
+            remaining.add(problem_id)
+        elif problem not in session.deleted:
+            # 身份映射中已有的对象随这次 flush 一起更新，flush 后版本号会被重新加载
+            problem.version = Problem.version + 1
+    if remaining:
+        session.execute(
+            db.update(Problem).where(Problem.id.in_(remaining))
+            .values(version=Problem.version + 1, updated_at=datetime.now(UTC))
+            .execution_options(synchronize_session=False)
+        )
+
+
+@event.listens_for(Session, 'before_flush')
+def _bump_changed_problems(session, flush_context, instances):
+    problem_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, TestCase):
+            problem_ids.add(obj.problem_id)
+        elif isinstance(obj, Problem) and obj not in session.new:
+            if obj in session.deleted or session.is_modified(obj, include_collections=False):
+                problem_ids.add(obj.id)
+    bump_problem_versions(session, problem_ids)
+
+
+@event.listens_for(Session, 'after_commit')
+def _discard_cached_responses(session):
+    problem_ids = session.info.pop('problem_cache_changes', None)
+    if problem_ids and has_app_context() and 'problem_cache' in current_app.extensions:
+        _cache().discard_problems(problem_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_problem_changes(session):
+    session.info.pop('problem_cache_changes', None)
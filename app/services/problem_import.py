@@ -0,0 +1,250 @@
+"""
+题库导入：逐个元素解析上传的 JSON 数组，批量写入题目和测试用例。
+
+整个文件不会一次性读入内存，已存在的题目标题用一条查询取出，
+题目和测试用例分别用批量 INSERT（executemany）写入。
+"""
+import json
+import os
+from typing import Any, Callable, Dict, IO, Iterator, List, Optional
+
+from app import db
+from app.models import Problem, TestCase
+from app.services.jobs import Job, JobError
+
+DEFAULT_READ_CHUNK_SIZE = 64 * 1024
+DEFAULT_IMPORT_BATCH_SIZE = 200   # 每批写入的题目数
+DEFAULT_TEST_CASE_BATCH_SIZE = 1000  # 每条 executemany 写入的测试用例数
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\r\n'
+
+
+class ImportFormatError(JobError):
+    """上传内容不是合法的题目 JSON 数组"""
+    pass
+
+
+def iter_json_array(stream: IO[bytes], chunk_size: int = DEFAULT_READ_CHUNK_SIZE,
+                    on_read: Optional[Callable[[int], None]] = None) -> Iterator[Any]:
+    """
+    逐个产出顶层 JSON 数组中的元素，内存中只保留当前元素的文本。
+    on_read(n) 在每次从 stream 读取 n 字节后调用，用于汇报进度。
+    """
+    buffer = ''
+    pos = 0
+    eof = False
+    pending = b''
+
+    def fill(min_size: int) -> bool:
+        """继续读取直到缓冲区至少有 min_size 个字符或读到文件末尾"""
+        nonlocal buffer, pos, eof, pending
+        if pos:
+            buffer = buffer[pos:]
+            pos = 0
+        while not eof and len(buffer) < min_size:
+            data = stream.read(chunk_size)
+            if on_read:
+                on_read(len(data))
+            if not data:
+                eof = True
+                if pending:
+                    raise ImportFormatError('Invalid file format or content: file is not valid UTF-8')
+                break
+            data = pending + data
+            # 多字节字符可能被切断在块边界上
+            try:
+                text = data.decode('utf-8')
+                pending = b''
+            except UnicodeDecodeError as e:
+                if e.start < len(data) - 3:
+                    raise ImportFormatError('Invalid file format or content: file is not valid UTF-8')
+                text, pending = data[:e.start].decode('utf-8'), data[e.start:]
+            buffer += text
+        return len(buffer) > 0
+
+    def skip_whitespace() -> None:
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buffer) or not fill(1):
+                return
+
+    def expect_more(what: str) -> str:
+        skip_whitespace()
+        if pos >= len(buffer):
+            raise ImportFormatError(f"Invalid file format or content: unexpected end of file, expected {what}")
+        return buffer[pos]
+
+    fill(1)
+    if buffer.startswith('\ufeff'):
+        pos = 1
+    if expect_more("'['") != '[':
+        raise ImportFormatError('Invalid file format or content: expected a JSON array of problems')
+    pos += 1
+    if expect_more("']' or a value") == ']':
+        return
+
+    while True:
+        skip_whitespace()
+        # 元素可能跨越多个块；解析失败时把缓冲区至少扩大一倍再试，避免反复解析同一段文本
+        while True:
+            try:
+                value, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise ImportFormatError(f"Invalid file format or content: {e.msg}")
+                fill(2 * (len(buffer) - pos) + chunk_size)
+                continue
+            if end == len(buffer) and not eof:
+                # 数字等值在缓冲区末尾可能还没读完
+                fill(len(buffer) - pos + chunk_size)
+                continue
+            break
+        pos = end
+        yield value
+
+        separator = expect_more("',' or ']'")
+        pos += 1
+        if separator == ']':
+            break
+        if separator != ',':
+            raise ImportFormatError(f"Invalid file format or content: unexpected character {separator!r}")
+
+    skip_whitespace()
+    if pos < len(buffer):
+        raise ImportFormatError('Invalid file format or content: extra data after the array')
+
+
+class ProblemImporter:
+    """
+    把 JSON 数组中的题目导入数据库。
+
+    与已有题目或文件中前面的题目重名时跳过；atomic 为真时只要有一道题被跳过
+    或文件格式有误，就回滚整个导入，否则每批题目单独提交。
+    """
+
+    def __init__(self, atomic: bool = False, batch_size: int = DEFAULT_IMPORT_BATCH_SIZE,
+                 test_case_batch_size: int = DEFAULT_TEST_CASE_BATCH_SIZE):
+        self.atomic = atomic
+        self.batch_size = batch_size
+        self.test_case_batch_size = test_case_batch_size
+        self.imported_count = 0
+        self.skipped_count = 0
+        self.test_case_count = 0
+        self.details: List[str] = []
+
+    def _result(self) -> Dict[str, Any]:
+        return {
+            'message': 'Problems imported successfully',
+            'imported_count': self.imported_count,
+            'skipped_count': self.skipped_count,
+            'test_case_count': self.test_case_count,
+            'details': self.details
+        }
+
+    def _skip(self, detail: str) -> None:
+        if self.atomic:
+            raise JobError(f"Import aborted, nothing was saved: {detail}")
+        self.skipped_count += 1
+        self.details.append(detail)
+
+    def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        """写入一批题目，再把它们的测试用例按 test_case_batch_size 分段批量写入"""
+        if not batch:
+            return
+        rows = db.session.execute(
+            db.insert(Problem).returning(Problem.id, Problem.title),
+            [{'title': p['title'], 'description': p['description'], 'llm_prompt': p['llm_prompt']} for p in batch]
+        ).all()
+        ids = {row.title: row.id for row in rows}
+
+        test_cases = []
+        for problem in batch:
+            for tc in problem['test_cases']:
+                test_cases.append({'problem_id': ids[problem['title']], **tc})
+                if len(test_cases) >= self.test_case_batch_size:
+                    db.session.execute(db.insert(TestCase), test_cases)
+                    self.test_case_count += len(test_cases)
+                    test_cases = []
+        if test_cases:
+            db.session.execute(db.insert(TestCase), test_cases)
+            self.test_case_count += len(test_cases)
+        self.imported_count += len(batch)
+
+        if not self.atomic:
+            db.session.commit()
+
+    @staticmethod
+    def _test_cases(problem_data: Dict[str, Any]) -> List[Dict[str, str]]:
+        test_cases = []
+        for tc_data in problem_data.get('test_cases') or []:
+            if not isinstance(tc_data, dict):
+                continue
+            input_data = tc_data.get('input')
+            expected_output = tc_data.get('expected_output')
+            if input_data is not None and expected_output is not None:
+                test_cases.append({
+                    'input_params': json.dumps(input_data),
+                    'expected_output': json.dumps(expected_output)
+                })
+        return test_cases
+
+    def run(self, stream: IO[bytes], job: Optional[Job] = None, total_bytes: Optional[int] = None) -> Dict[str, Any]:
+        bytes_read = 0
+
+        def on_read(n: int) -> None:
+            nonlocal bytes_read
+            bytes_read += n
+            if job:
+                job.update_progress(bytes_read=bytes_read, total_bytes=total_bytes)
+
+        # 一次取出全部已有标题，之后的去重都在内存中完成
+        titles = set(db.session.scalars(db.select(Problem.title).execution_options(include_deleted=True)))
+        batch: List[Dict[str, Any]] = []
+        seen_any = False
+
+        for problem_data in iter_json_array(stream, on_read=on_read):
+            seen_any = True
+            if not isinstance(problem_data, dict):
+                self._skip('Skipped an entry that is not a JSON object.')
+                continue
+            title = problem_data.get('title')
+            if not title or not isinstance(title, str):
+                self._skip('Missing required fields (title) for a problem in the file.')
+                continue
+            if title in titles:
+                self._skip(f"Problem with title '{title}' already exists and was skipped.")
+                continue
+            titles.add(title)
+            batch.append({
+                'title': title,
+                'description': problem_data.get('description', ''),
+                'llm_prompt': problem_data.get('llm_prompt', ''),
+                'test_cases': self._test_cases(problem_data)
+            })
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+                if job:
+                    job.update_progress(imported_count=self.imported_count, skipped_count=self.skipped_count)
+
+        if not seen_any:
+            raise JobError('No problems found in the file')
+
+        self._flush(batch)
+        db.session.commit()
+        if job:
+            job.update_progress(imported_count=self.imported_count, skipped_count=self.skipped_count)
+        return self._result()
+
+
+def import_problems_job(job: Job, path: str, atomic: bool = False) -> Dict[str, Any]:
+    """后台任务入口：从临时文件导入并在结束后删除文件"""
+    try:
+        total_bytes = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            return ProblemImporter(atomic=atomic).run(f, job=job, total_bytes=total_bytes)
+    finally:
+        os.remove(path)
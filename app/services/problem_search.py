@@ -0,0 +1,136 @@
+"""
+题目全文搜索。
+
+SQLite 上用 FTS5 外部内容表 problems_fts 索引题目的标题和描述，由 problems 表上的
+触发器保持同步，按 bm25 排序（标题权重更高）。使用 trigram 分词，中文和英文都可以
+按子串匹配；不足三个字符的词 trigram 无法匹配，这时以及在其他数据库上退回到 LIKE 查询。
+"""
+import html
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import DDL, and_, case, event, or_, text
+
+from app import db
+from app.models import Problem
+
+FTS_TABLE = 'problems_fts'
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+SNIPPET_TOKENS = 24
+MIN_TRIGRAM_LENGTH = 3
+
+# snippet() 用这两个控制字符标出命中位置，转义 HTML 后再替换成 <mark>
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+
+_CREATE_STATEMENTS = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description, content='problems', content_rowid='id', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS problems_fts_insert AFTER INSERT ON problems BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS problems_fts_delete AFTER DELETE ON problems BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS problems_fts_update AFTER UPDATE OF title, description ON problems BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+)
+
+for _statement in _CREATE_STATEMENTS:
+    event.listen(Problem.__table__, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+event.listen(Problem.__table__, 'before_drop', DDL(f'DROP TABLE IF EXISTS {FTS_TABLE}').execute_if(dialect='sqlite'))
+
+
+def fts_available(session=None) -> bool:
+    session = session or db.session
+    if session.get_bind().dialect.name != 'sqlite':
+        return False
+    return session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': FTS_TABLE}
+    ).first() is not None
+
+
+def rebuild_search_index() -> None:
+    """创建缺少的索引表和触发器（已有数据库升级时），并根据 problems 表重建索引"""
+    if db.session.get_bind().dialect.name != 'sqlite':
+        return
+    for statement in _CREATE_STATEMENTS:
+        db.session.execute(text(statement))
+    db.session.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    db.session.commit()
+
+
+def parse_terms(query: str) -> List[str]:
+    return [term for term in query.split() if term]
+
+
+def _fts_query(terms: List[str]) -> str:
+    # 每个词都作为短语加引号，避免用户输入被当作 FTS5 查询语法
+    return ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def _highlight(snippet: Optional[str]) -> str:
+    escaped = html.escape(snippet or '')
+    return escaped.replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+
+
+def _like_snippet(description: Optional[str], terms: List[str]) -> str:
+    """LIKE 查询时在描述中截取第一个命中词附近的文字"""
+    description = description or ''
+    lowered = description.lower()
+    positions = [(lowered.find(term.lower()), term) for term in terms]
+    positions = [(pos, term) for pos, term in positions if pos >= 0]
+    if not positions:
+        return html.escape(description[:SNIPPET_TOKENS * 4])
+    pos, term = min(positions)
+    start = max(0, pos - SNIPPET_TOKENS * 2)
+    end = min(len(description), pos + len(term) + SNIPPET_TOKENS * 2)
+    return (('…' if start else '') + html.escape(description[start:pos]) + '<mark>'
+            + html.escape(description[pos:pos + len(term)]) + '</mark>'
+            + html.escape(description[pos + len(term):end]) + ('…' if end < len(description) else ''))
+
+
+def _search_fts(terms: List[str], limit: int, after: Optional[Tuple[float, int]]) -> List[Dict[str, Any]]:
+    params = {'query': _fts_query(terms), 'limit': limit}
+    page_filter = ''
+    if after is not None:
+        page_filter = 'WHERE rank > :after_rank OR (rank = :after_rank AND id > :after_id)'
+        params.update(after_rank=after[0], after_id=after[1])
+    rows = db.session.execute(text(f"""
+        SELECT id, title, snippet, rank FROM (
+            SELECT {FTS_TABLE}.rowid AS id, problems.title AS title,
+                   snippet({FTS_TABLE}, 1, '{_MARK_START}', '{_MARK_END}', '…', {SNIPPET_TOKENS}) AS snippet,
+                   bm25({FTS_TABLE}, {TITLE_WEIGHT}, {DESCRIPTION_WEIGHT}) AS rank
+            FROM {FTS_TABLE} JOIN problems ON problems.id = {FTS_TABLE}.rowid
+            WHERE {FTS_TABLE} MATCH :query AND problems.deleted_at IS NULL
+        ) {page_filter}
+        ORDER BY rank, id LIMIT :limit
+    """), params).all()
+    return [{'id': row.id, 'title': row.title, 'snippet': _highlight(row.snippet), 'rank': row.rank} for row in rows]
+
+
+def _search_like(terms: List[str], limit: int, after: Optional[Tuple[float, int]]) -> List[Dict[str, Any]]:
+    # 标题包含全部词的排在前面；没有搜索词时按 id 列出全部题目
+    conditions = [or_(Problem.title.icontains(term, autoescape=True), Problem.description.icontains(term, autoescape=True))
+                  for term in terms]
+    title_match = and_(*(Problem.title.icontains(term, autoescape=True) for term in terms)) if terms else None
+    rank = case((title_match, 0.0), else_=1.0) if terms else db.literal(0.0)
+    stmt = db.select(Problem.id, Problem.title, Problem.description, rank.label('rank')).where(*conditions)
+    if after is not None:
+        stmt = stmt.where(or_(rank > after[0], and_(rank == after[0], Problem.id > after[1])))
+    rows = db.session.execute(stmt.order_by(rank, Problem.id).limit(limit)).all()
+    return [{'id': row.id, 'title': row.title, 'snippet': _like_snippet(row.description, terms), 'rank': row.rank}
+            for row in rows]
+
+
+def search_problems(query: str, limit: int, after: Optional[Tuple[float, int]] = None) -> List[Dict[str, Any]]:
+    """按相关度返回至多 limit 道题目的 id、标题、高亮摘要和 rank（越小越相关）"""
+    terms = parse_terms(query)
+    if terms and all(len(term) >= MIN_TRIGRAM_LENGTH for term in terms) and fts_available():
+        return _search_fts(terms, limit, after)
+    return _search_like(terms, limit, after)
@@ -0,0 +1,214 @@
+"""
+题目统计：提交次数、通过率、通过提交的运行时间和内存中位数，以及失败最多的测试用例。
+
+新提交在 flush 前把增量写入 problem_stats / problem_stat_buckets / test_case_stats，
+和提交本身处于同一事务。中位数由对数分桶的直方图估算（每个 2 倍区间分 4 个桶，
+误差约 ±9%），读取时只需要按主键和索引取少量行，与提交总数无关。
+"""
+import json
+import math
+from datetime import datetime, UTC
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, selectinload
+
+from app import db
+from app.models import ProblemStatBucket, ProblemStats, Submission, TestCase, TestCaseStats
+
+METRIC_RUNTIME = 'runtime'  # 秒，取各测试用例中的最大值
+METRIC_MEMORY = 'memory'    # KB，取各测试用例中的最大值
+BUCKETS_PER_OCTAVE = 4
+REBUILD_BATCH_SIZE = 500
+
+
+def bucket_for(value: float) -> int:
+    return math.floor(math.log2(max(value, 1e-6)) * BUCKETS_PER_OCTAVE)
+
+
+def bucket_midpoint(bucket: int) -> float:
+    return 2 ** ((bucket + 0.5) / BUCKETS_PER_OCTAVE)
+
+
+def histogram_median(buckets: Dict[int, int]) -> Optional[float]:
+    total = sum(buckets.values())
+    if not total:
+        return None
+    seen = 0
+    for bucket in sorted(buckets):
+        seen += buckets[bucket]
+        if seen * 2 >= total:
+            return bucket_midpoint(bucket)
+    return None
+
+
+class StatsDelta:
+    """一批提交对统计表的增量"""
+
+    def __init__(self):
+        self.problems: Dict[int, Dict[str, int]] = defaultdict(lambda: {'attempts': 0, 'accepted': 0})
+        self.buckets: Dict[tuple, int] = defaultdict(int)
+        self.test_cases: Dict[int, Dict[str, int]] = {}
+
+    def add(self, submission: Submission) -> None:
+        if submission.problem_id is None:
+            return
+        results = _result_dicts(submission)
+        problem = self.problems[submission.problem_id]
+        problem['attempts'] += 1
+        if submission.status == 'Accepted':
+            problem['accepted'] += 1
+            for metric, key in ((METRIC_RUNTIME, 'time'), (METRIC_MEMORY, 'memory')):
+                values = [float(r[key]) for r in results if _is_number(r.get(key))]
+                if values:
+                    self.buckets[(submission.problem_id, metric, bucket_for(max(values)))] += 1
+
+        for result in results:
+            test_case_id = result.get('test_case_id')
+            if not isinstance(test_case_id, int):
+                continue
+            counters = self.test_cases.setdefault(test_case_id, {'problem_id': submission.problem_id, 'runs': 0, 'failures': 0})
+            counters['runs'] += 1
+            if not result.get('passed'):
+                counters['failures'] += 1
+
+    def __bool__(self) -> bool:
+        return bool(self.problems)
+
+    def apply(self, session) -> None:
+        """以 upsert 累加到统计表"""
+        _upsert_increment(session, ProblemStats, ['problem_id'],
+                          [{'problem_id': pid, **counts} for pid, counts in self.problems.items()])
+        _upsert_increment(session, ProblemStatBucket, ['problem_id', 'metric', 'bucket'],
+                          [{'problem_id': pid, 'metric': metric, 'bucket': bucket, 'count': count}
+                           for (pid, metric, bucket), count in self.buckets.items()])
+        if self.test_cases:
+            # 测试用例可能已被删除
+            existing = set(session.scalars(db.select(TestCase.id).where(TestCase.id.in_(list(self.test_cases)))))
+            _upsert_increment(session, TestCaseStats, ['test_case_id'],
+                              [{'test_case_id': tid, **counts} for tid, counts in self.test_cases.items() if tid in existing],
+                              fixed=('problem_id',))
+
+
+def _is_number(value: Any) -> bool:
+    try:
+        return value is not None and not isinstance(value, bool) and math.isfinite(float(value))
+    except (TypeError, ValueError):
+        return False
+
+
+def _result_dicts(submission: Submission) -> List[Dict[str, Any]]:
+    if submission.results:
+        return [result.to_result(full=False) for result in submission.results]
+    if submission.legacy_test_results:
+        try:
+            results = json.loads(submission.legacy_test_results)
+        except ValueError:
+            return []
+        return [r for r in results if isinstance(r, dict)] if isinstance(results, list) else []
+    return []
+
+
+def _touch(table) -> Dict[str, Any]:
+    return {'updated_at': datetime.now(UTC)} if 'updated_at' in table.c else {}
+
+
+def _upsert_increment(session, model, keys: List[str], rows: List[Dict[str, Any]], fixed: Iterable[str] = ()) -> None:
+    """插入计数行，主键冲突时把计数累加到已有行上"""
+    if not rows:
+        return
+    table = model.__table__
+    counters = [name for name in rows[0] if name not in keys and name not in fixed]
+    dialect = session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=keys,
+            set_={**{name: table.c[name] + stmt.excluded[name] for name in counters}, **_touch(table)}
+        )
+        session.execute(stmt, rows)
+        return
+    for row in rows:
+        condition = db.and_(*(table.c[key] == row[key] for key in keys))
+        updated = session.execute(
+            db.update(table).where(condition).values({**{name: table.c[name] + row[name] for name in counters},
+                                                      **_touch(table)})
+        ).rowcount
+        if not updated:
+            session.execute(db.insert(table).values(row))
+
+
+@event.listens_for(Session, 'before_flush')
+def _record_new_submissions(session, flush_context, instances):
+    delta = StatsDelta()
+    for obj in session.new:
+        if isinstance(obj, Submission):
+            delta.add(obj)
+    if delta:
+        delta.apply(session)
+
+
+def rebuild_problem_stats(problem_id: Optional[int] = None, batch_size: int = REBUILD_BATCH_SIZE) -> int:
+    """清空并根据全部历史提交重新计算统计，返回处理的提交数"""
+    for model in (ProblemStats, ProblemStatBucket, TestCaseStats):
+        stmt = db.delete(model)
+        if problem_id is not None:
+            stmt = stmt.where(model.problem_id == problem_id)
+        db.session.execute(stmt)
+
+    delta = StatsDelta()
+    processed = 0
+    last_id = 0
+    while True:
+        query = Submission.query.options(selectinload(Submission.results)).filter(Submission.id > last_id)
+        if problem_id is not None:
+            query = query.filter(Submission.problem_id == problem_id)
+        submissions = query.order_by(Submission.id).limit(batch_size).all()
+        if not submissions:
+            break
+        for submission in submissions:
+            delta.add(submission)
+        processed += len(submissions)
+        last_id = submissions[-1].id
+        # 已处理的提交不再需要，避免身份映射随历史数据增长
+        for submission in submissions:
+            db.session.expunge(submission)
+
+    delta.apply(db.session)
+    db.session.commit()
+    return processed
+
+
+def get_problem_stats(problem_id: int) -> Dict[str, Any]:
+    stats = db.session.get(ProblemStats, problem_id)
+    buckets: Dict[str, Dict[int, int]] = {METRIC_RUNTIME: {}, METRIC_MEMORY: {}}
+    for row in ProblemStatBucket.query.filter_by(problem_id=problem_id):
+        buckets.setdefault(row.metric, {})[row.bucket] = row.count
+    # 关联 test_cases，已删除用例遗留的统计行不参与
+    most_failed = TestCaseStats.query.join(TestCase, TestCase.id == TestCaseStats.test_case_id).filter(
+        TestCaseStats.problem_id == problem_id, TestCaseStats.failures > 0
+    ).order_by(TestCaseStats.failures.desc(), TestCaseStats.test_case_id).first()
+
+    attempts = stats.attempts if stats else 0
+    accepted = stats.accepted if stats else 0
+    median_runtime = histogram_median(buckets[METRIC_RUNTIME])
+    median_memory = histogram_median(buckets[METRIC_MEMORY])
+    return {
+        'problem_id': problem_id,
+        'attempts': attempts,
+        'accepted': accepted,
+        'acceptance_rate': accepted / attempts if attempts else None,
+        'median_runtime': round(median_runtime, 4) if median_runtime is not None else None,
+        'median_memory': round(median_memory) if median_memory is not None else None,
+        'most_failed_test_case': {
+            'test_case_id': most_failed.test_case_id,
+            'runs': most_failed.runs,
+            'failures': most_failed.failures
+        } if most_failed else None,
+        'updated_at': stats.updated_at.isoformat() if stats and stats.updated_at else None
+    }
@@ -0,0 +1,361 @@
+import re
+import math
+import threading
+from typing import Dict, List, Optional, Any
+
+# 默认的 prompt token 预算（按模型可在配置 LLM_PROMPT_TOKEN_BUDGETS 中覆盖）
+DEFAULT_PROMPT_TOKEN_BUDGET = 12000
+DEFAULT_MODEL_TOKEN_BUDGETS: Dict[str, int] = {
+    'deepseek-coder': 12000,
+    'deepseek-chat': 48000,
+    'deepseek-reasoner': 48000,
+}
+
+# 裁剪阈值
+MIN_COMMENT_BLOCK_LINES = 4     # 连续注释超过该行数才会被折叠
+MIN_REPEAT_RUN = 3              # 相似行连续出现超过该次数才会被折叠
+DATA_LINE_MIN_CHARS = 160       # 超过该长度且以字面量为主的行视为生成数据
+DATA_LITERAL_RATIO = 0.6
+DATA_BLOCK_KEEP_LINES = 2       # 折叠数据块时保留的开头行数
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_LITERAL_PATTERN = re.compile(r"\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'|\b\d+(?:\.\d+)?\b")
+_DATA_KEYWORD_PATTERN = re.compile(r"\b(?:true|false|null|nil|None|True|False)\b")
+
+LINE_COMMENT_PREFIXES: Dict[str, str] = {
+    'python': '#',
+    'python3': '#',
+}
+DEFAULT_LINE_COMMENT_PREFIX = '//'
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """粗略估算文本的 token 数：按单词/符号切分，长单词按 4 字符一个 token 计"""
+    if not text:
+        return 0
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in _TOKEN_PATTERN.findall(text))
+
+
+def comment_prefix_for(language: Optional[str]) -> str:
+    return LINE_COMMENT_PREFIXES.get((language or '').lower(), DEFAULT_LINE_COMMENT_PREFIX)
+
+
+class PromptBudgetResult:
+    """一次预算检查的结果，记录裁剪了哪些内容以及节省的 token 数"""
+
+    def __init__(self, prompt_template: str, code: str, budget: int, original_tokens: int):
+        self.prompt_template = prompt_template
+        self.code = code
+        self.budget = budget
+        self.original_tokens = original_tokens
+        self.final_tokens = original_tokens
+        self.trims: List[Dict[str, Any]] = []
+
+    @property
+    def trimmed(self) -> bool:
+        return bool(self.trims)
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.original_tokens - self.final_tokens)
+
+    def notice(self) -> str:
+        """面向评审人员的裁剪说明"""
+        if not self.trims:
+            return ''
+        parts = [f"- {trim['description']} (~{trim['tokens_saved']} tokens)" for trim in self.trims]
+        return (
+            f"Note: the submission exceeded the prompt budget of {self.budget} tokens "
+            f"({self.original_tokens} estimated), so it was trimmed to ~{self.final_tokens} tokens before review:\n"
+            + "\n".join(parts)
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'budget': self.budget,
+            'original_tokens': self.original_tokens,
+            'final_tokens': self.final_tokens,
+            'tokens_saved': self.tokens_saved,
+            'trims': list(self.trims),
+        }
+
+
+class PromptBudgetStats:
+    """进程内的裁剪统计，用于观察预算带来的 token 节省"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.prompts_checked = 0
+            self.prompts_trimmed = 0
+            self.tokens_before = 0
+            self.tokens_after = 0
+
+    def record(self, result: PromptBudgetResult) -> None:
+        with self._lock:
+            self.prompts_checked += 1
+            self.tokens_before += result.original_tokens
+            self.tokens_after += result.final_tokens
+            if result.trimmed:
+                self.prompts_trimmed += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'prompts_checked': self.prompts_checked,
+                'prompts_trimmed': self.prompts_trimmed,
+                'tokens_before': self.tokens_before,
+                'tokens_after': self.tokens_after,
+                'tokens_saved': self.tokens_before - self.tokens_after,
+            }
+
+
+budget_stats = PromptBudgetStats()
+
+
+class PromptBudgeter:
+    """在调用 LLM 之前按预算裁剪 prompt 模板和候选人代码"""
+
+    def __init__(self, budget: int = DEFAULT_PROMPT_TOKEN_BUDGET):
+        self.budget = budget
+
+    @classmethod
+    def for_model(cls, model: str, config: Optional[Dict[str, Any]] = None) -> 'PromptBudgeter':
+        """根据模型名称和应用配置确定预算"""
+        config = config or {}
+        budgets = dict(DEFAULT_MODEL_TOKEN_BUDGETS)
+        budgets.update(config.get('LLM_PROMPT_TOKEN_BUDGETS') or {})
+        default_budget = config.get('LLM_PROMPT_TOKEN_BUDGET') or DEFAULT_PROMPT_TOKEN_BUDGET
+        return cls(int(budgets.get(model, default_budget)))
+
+    def fit(self, prompt_template: str, code: str, language: Optional[str] = None, overhead: str = '') -> PromptBudgetResult:
+        """
+        返回符合预算的 prompt 模板和代码。
+
+        依次尝试：折叠长注释块、折叠重复代码、概括生成的数据，
+        仍然超出时截断代码中间部分，最后才截断 prompt 模板。
+        """
+        prompt_template = prompt_template or ''
+        code = code or ''
+        fixed_tokens = estimate_tokens(overhead)
+        original_tokens = fixed_tokens + estimate_tokens(prompt_template) + estimate_tokens(code)
+        result = PromptBudgetResult(prompt_template, code, self.budget, original_tokens)
+
+        if original_tokens > self.budget:
+            prefix = comment_prefix_for(language)
+            for kind, trim in (
+                ('comments', self._strip_comment_blocks),
+                ('repeated_code', self._fold_repeated_lines),
+                ('generated_data', self._summarize_data),
+            ):
+                if self._total(result, fixed_tokens) <= self.budget:
+                    break
+                self._apply(result, kind, trim, prefix)
+
+            code_budget = self.budget - fixed_tokens - estimate_tokens(result.prompt_template)
+            if estimate_tokens(result.code) > code_budget:
+                self._apply(result, 'truncated_code', lambda text, p: self._truncate_middle(text, max(code_budget, 0), p), prefix)
+
+            template_budget = self.budget - fixed_tokens - estimate_tokens(result.code)
+            if estimate_tokens(result.prompt_template) > template_budget:
+                before = estimate_tokens(result.prompt_template)
+                result.prompt_template, note = self._truncate_tail(result.prompt_template, max(template_budget, 0))
+                result.trims.append({
+                    'kind': 'truncated_prompt',
+                    'description': note,
+                    'tokens_saved': before - estimate_tokens(result.prompt_template),
+                })
+
+        result.final_tokens = self._total(result, fixed_tokens)
+        budget_stats.record(result)
+        return result
+
+    @staticmethod
+    def _total(result: PromptBudgetResult, fixed_tokens: int) -> int:
+        return fixed_tokens + estimate_tokens(result.prompt_template) + estimate_tokens(result.code)
+
+    @staticmethod
+    def _apply(result: PromptBudgetResult, kind: str, trim, prefix: str) -> None:
+        before = estimate_tokens(result.code)
+        new_code, description = trim(result.code, prefix)
+        saved = before - estimate_tokens(new_code)
+        if description and saved > 0:
+            result.code = new_code
+            result.trims.append({'kind': kind, 'description': description, 'tokens_saved': saved})
+
+    @staticmethod
+    def _is_comment_line(stripped: str, prefix: str) -> bool:
+        if stripped.startswith(prefix):
+            return True
+        # C 风格块注释的续行
+        return prefix == '//' and (stripped.startswith('/*') or stripped.startswith('*') or stripped.endswith('*/'))
+
+    def _strip_comment_blocks(self, code: str, prefix: str):
+        """将连续的长注释块（行注释、块注释、Python docstring）折叠为一行标记"""
+        lines = code.split('\n')
+        output: List[str] = []
+        folded_blocks = 0
+        folded_lines = 0
+        i = 0
+        while i < len(lines):
+            stripped = lines[i].strip()
+            indent = lines[i][:len(lines[i]) - len(lines[i].lstrip())]
+            end = i
+            if stripped.startswith('"""') or stripped.startswith("'''"):
+                quote = stripped[:3]
+                if stripped.count(quote) < 2 or stripped == quote:
+                    end = i + 1
+                    while end < len(lines) and quote not in lines[end]:
+                        end += 1
+                    end = min(end, len(lines) - 1)
+            elif stripped.startswith('/*') and '*/' not in stripped:
+                end = i + 1
+                while end < len(lines) and '*/' not in lines[end]:
+                    end += 1
+                end = min(end, len(lines) - 1)
+            elif stripped and self._is_comment_line(stripped, prefix):
+                while end + 1 < len(lines) and lines[end + 1].strip() and self._is_comment_line(lines[end + 1].strip(), prefix):
+                    end += 1
+
+            block_length = end - i + 1
+            if end > i and block_length >= MIN_COMMENT_BLOCK_LINES:
+                if stripped.startswith('"""') or stripped.startswith("'''"):
+                    # docstring 是表达式语句，替换为单行字符串以免破坏缩进结构
+                    output.append(f"{indent}{stripped[:3]}[trimmed {block_length} docstring lines]{stripped[:3]}")
+                else:
+                    output.append(f"{indent}{prefix} [trimmed {block_length} comment lines]")
+                folded_blocks += 1
+                folded_lines += block_length
+                i = end + 1
+                continue
+            output.append(lines[i])
+            i += 1
+
+        if not folded_blocks:
+            return code, None
+        return '\n'.join(output), f"Folded {folded_blocks} long comment block(s) ({folded_lines} lines)"
+
+    @staticmethod
+    def _line_shape(line: str) -> str:
+        """去掉字面量后的行结构，用于判断两行是否只是数据不同的重复代码"""
+        return re.sub(r"\s+", ' ', _LITERAL_PATTERN.sub('_', line)).strip()
+
+    def _fold_repeated_lines(self, code: str, prefix: str):
+        """折叠结构相同、仅字面量不同的连续代码行"""
+        lines = code.split('\n')
+        output: List[str] = []
+        folded_runs = 0
+        folded_lines = 0
+        i = 0
+        while i < len(lines):
+            shape = self._line_shape(lines[i])
+            end = i
+            while shape and end + 1 < len(lines) and self._line_shape(lines[end + 1]) == shape:
+                end += 1
+            run = end - i + 1
+            if shape and run >= MIN_REPEAT_RUN:
+                indent = lines[i][:len(lines[i]) - len(lines[i].lstrip())]
+                output.append(lines[i])
+                output.append(f"{indent}{prefix} [... {run - 2} similar lines folded ...]")
+                output.append(lines[end])
+                folded_runs += 1
+                folded_lines += run - 2
+                i = end + 1
+                continue
+            output.append(lines[i])
+            i += 1
+
+        if not folded_runs:
+            return code, None
+        return '\n'.join(output), f"Folded {folded_runs} run(s) of repeated code ({folded_lines} lines)"
+
+    @staticmethod
+    def _is_data_line(line: str) -> bool:
+        """以字面量为主（去掉字面量后几乎只剩分隔符）的行视为数据行"""
+        stripped = line.strip()
+        if not stripped or not _LITERAL_PATTERN.search(stripped):
+            return False
+        residue = _DATA_KEYWORD_PATTERN.sub('', _LITERAL_PATTERN.sub('', stripped))
+        word_chars = sum(1 for ch in residue if ch.isalnum() or ch == '_')
+        return word_chars / len(stripped) <= 1 - DATA_LITERAL_RATIO
+
+    def _summarize_data(self, code: str, prefix: str):
+        """将超长的数据字面量行或成片的数据行替换为摘要"""
+        lines = code.split('\n')
+        output: List[str] = []
+        summarized = 0
+        elided_chars = 0
+        i = 0
+        while i < len(lines):
+            line = lines[i]
+            indent = line[:len(line) - len(line.lstrip())]
+            if len(line) > DATA_LINE_MIN_CHARS and self._is_data_line(line):
+                head = line[:DATA_LINE_MIN_CHARS // 2]
+                output.append(f"{head} {prefix} [... {len(line) - len(head)} chars of generated data elided ...]")
+                summarized += 1
+                elided_chars += len(line) - len(head)
+                i += 1
+                continue
+            end = i
+            if self._is_data_line(line):
+                while end + 1 < len(lines) and self._is_data_line(lines[end + 1]):
+                    end += 1
+            run = end - i + 1
+            if run > DATA_BLOCK_KEEP_LINES + 2:
+                output.extend(lines[i:i + DATA_BLOCK_KEEP_LINES])
+                skipped = lines[i + DATA_BLOCK_KEEP_LINES:end]
+                output.append(f"{indent}{prefix} [... {len(skipped)} lines of generated data elided ...]")
+                output.append(lines[end])
+                summarized += 1
+                elided_chars += sum(len(s) for s in skipped)
+                i = end + 1
+                continue
+            output.append(line)
+            i += 1
+
+        if not summarized:
+            return code, None
+        return '\n'.join(output), f"Summarized {summarized} block(s) of generated data ({elided_chars} chars)"
+
+    @staticmethod
+    def _truncate_middle(code: str, token_budget: int, prefix: str):
+        """保留代码开头和结尾，截掉中间部分"""
+        lines = code.split('\n')
+        head: List[str] = []
+        tail: List[str] = []
+        used = estimate_tokens(f"{prefix} [... N lines truncated ...]")
+        lo, hi = 0, len(lines) - 1
+        take_head = True
+        while lo <= hi:
+            line = lines[lo] if take_head else lines[hi]
+            cost = estimate_tokens(line) + 1
+            if used + cost > token_budget:
+                break
+            used += cost
+            if take_head:
+                head.append(line)
+                lo += 1
+            else:
+                tail.insert(0, line)
+                hi -= 1
+            take_head = not take_head
+        removed = hi - lo + 1
+        if removed <= 0:
+            return code, None
+        marker = f"{prefix} [... {removed} lines truncated to fit the prompt budget ...]"
+        return '\n'.join(head + [marker] + tail), f"Truncated {removed} lines from the middle of the code"
+
+    @staticmethod
+    def _truncate_tail(text: str, token_budget: int):
+        pieces = list(_TOKEN_PATTERN.finditer(text))
+        used = 0
+        cut = 0
+        for piece in pieces:
+            used += max(1, math.ceil(len(piece.group(0)) / 4))
+            if used > token_budget:
+                break
+            cut = piece.end()
+        return text[:cut] + "\n[... review instructions truncated ...]", "Truncated the end of the review instructions"
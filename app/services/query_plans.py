@@ -0,0 +1,66 @@
+"""
+热点查询的执行计划检查：对每条语句执行 EXPLAIN QUERY PLAN，
+出现全表扫描或为排序建立临时 B 树时视为失败。目前只支持 SQLite。
+"""
+from typing import Dict, List
+
+from sqlalchemy import func, select
+
+from app import db
+from app.models import Candidate, CandidateProblemTab, Submission, TestCase
+
+
+def hot_queries() -> Dict[str, object]:
+    """接口中频繁执行的查询，参数取任意示例值即可"""
+    return {
+        'submissions_by_candidate_problem': select(Submission)
+            .where(Submission.candidate_id == 1, Submission.problem_id == 1)
+            .order_by(Submission.submitted_at.desc()),
+        'submission_list_page': select(Submission)
+            .order_by(Submission.submitted_at.desc(), Submission.id.desc())
+            .limit(51),
+        'latest_submission_per_problem': select(Submission.problem_id, func.max(Submission.id))
+            .where(Submission.candidate_id == 1)
+            .group_by(Submission.problem_id),
+        'test_cases_by_problem': select(TestCase).where(TestCase.problem_id == 1),
+        'candidate_tabs_in_order': select(CandidateProblemTab)
+            .where(CandidateProblemTab.candidate_id == 1)
+            .order_by(CandidateProblemTab.tab_order),
+        'candidate_list_page': select(Candidate.id, Candidate.name, Candidate.email)
+            .order_by(Candidate.created_at.desc(), Candidate.id.desc())
+            .limit(51),
+        'candidate_name_prefix': select(Candidate.id, Candidate.name, Candidate.email)
+            .where(Candidate.name_search >= 'ab', Candidate.name_search < 'ac')
+            .order_by(Candidate.name_search, Candidate.id)
+            .limit(51),
+    }
+
+
+def explain(statement) -> List[str]:
+    """返回 EXPLAIN QUERY PLAN 的 detail 列"""
+    compiled = statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True})
+    with db.engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").all()
+    return [row[-1] for row in rows]
+
+
+def plan_problems(details: List[str]) -> List[str]:
+    problems = []
+    for detail in details:
+        # "SCAN t USING INDEX ..." 是按索引顺序扫描，可以接受；裸的 "SCAN t" 是全表扫描
+        if detail.startswith('SCAN ') and ' USING ' not in detail:
+            problems.append(f"full table scan: {detail}")
+        elif detail.startswith('USE TEMP B-TREE'):
+            problems.append(f"temporary sort: {detail}")
+    return problems
+
+
+def check_query_plans() -> Dict[str, Dict[str, List[str]]]:
+    """检查所有热点查询，返回 {名称: {'plan': [...], 'problems': [...]}}"""
+    if db.engine.dialect.name != 'sqlite':
+        raise RuntimeError(f"Query plan checks only support SQLite, not {db.engine.dialect.name}")
+    results = {}
+    for name, statement in hot_queries().items():
+        details = explain(statement)
+        results[name] = {'plan': details, 'problems': plan_problems(details)}
+    return results
@@ -0,0 +1,143 @@
+import os
+import time
+import threading
+from typing import Dict, Optional, Any
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Setting
+
+DEFAULT_CHECK_INTERVAL = 1.0  # 秒，两次检查跨进程版本文件的最小间隔
+_DELETED = object()
+
+
+class _SettingsState:
+    """单个应用实例的缓存状态"""
+
+    def __init__(self, version_file: Optional[str], check_interval: float):
+        self.version_file = version_file
+        self.check_interval = check_interval
+        self.values: Dict[str, Optional[str]] = {}
+        self.loaded = False
+        self.version: Optional[str] = None
+        self.checked_at = 0.0
+        self.lock = threading.RLock()
+
+
+class SettingsCache:
+    """
+    进程内的 Setting 缓存。
+
+    首次访问时一次性加载全部 Setting，之后直接从内存读取。
+    通过 ORM 提交的修改会写穿到缓存，并更新共享的版本文件
+    （SETTINGS_VERSION_FILE）；其他进程在检查到版本变化时重新加载。
+    """
+
+    def init_app(self, app) -> None:
+        app.extensions['settings_cache'] = _SettingsState(
+            app.config.get('SETTINGS_VERSION_FILE'),
+            app.config.get('SETTINGS_CACHE_CHECK_INTERVAL', DEFAULT_CHECK_INTERVAL)
+        )
+
+    @staticmethod
+    def _state() -> _SettingsState:
+        return current_app.extensions['settings_cache']
+
+    @staticmethod
+    def _read_version(state: _SettingsState) -> Optional[str]:
+        if not state.version_file:
+            return None
+        try:
+            with open(state.version_file, 'r', encoding='utf-8') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _write_version(state: _SettingsState) -> Optional[str]:
+        if not state.version_file:
+            return None
+        version = f"{time.time_ns()}-{os.getpid()}"
+        directory = os.path.dirname(os.path.abspath(state.version_file))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{state.version_file}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(version)
+        os.replace(tmp_path, state.version_file)
+        return version
+
+    def _ensure_fresh(self, state: _SettingsState) -> None:
+        now = time.monotonic()
+        if state.loaded and now - state.checked_at < state.check_interval:
+            return
+        with state.lock:
+            if state.loaded and now - state.checked_at < state.check_interval:
+                return
+            version = self._read_version(state)
+            state.checked_at = now
+            if state.loaded and version == state.version:
+                return
+            state.values = {setting.key: setting.value for setting in Setting.query.all()}
+            state.version = version
+            state.loaded = True
+
+    def get(self, key: str, default: Any = None) -> Any:
+        state = self._state()
+        self._ensure_fresh(state)
+        return state.values.get(key, default)
+
+    def all(self) -> Dict[str, Optional[str]]:
+        state = self._state()
+        self._ensure_fresh(state)
+        return dict(state.values)
+
+    def invalidate(self) -> None:
+        """丢弃本进程的缓存，下次访问时重新加载"""
+        state = self._state()
+        with state.lock:
+            state.loaded = False
+
+    def apply_committed_changes(self, changes: Dict[str, Any]) -> None:
+        """将已提交的修改写入本进程缓存，并通知其他进程"""
+        state = self._state()
+        with state.lock:
+            if state.loaded:
+                for key, value in changes.items():
+                    if value is _DELETED:
+                        state.values.pop(key, None)
+                    else:
+                        state.values[key] = value
+            version = self._write_version(state)
+            # 自己写入的版本无需重新加载
+            if state.loaded:
+                state.version = version
+                state.checked_at = time.monotonic()
+
+
+settings_cache = SettingsCache()
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_setting_changes(session, flush_context):
+    changes = session.info.setdefault('settings_changes', {})
+    for obj in session.new.union(session.dirty):
+        if isinstance(obj, Setting):
+            changes[obj.key] = obj.value
+    for obj in session.deleted:
+        if isinstance(obj, Setting):
+            changes[obj.key] = _DELETED
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_setting_changes(session):
+    changes = session.info.pop('settings_changes', None)
+    if changes and has_app_context() and 'settings_cache' in current_app.extensions:
+        settings_cache.apply_committed_changes(changes)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_setting_changes(session):
+    session.info.pop('settings_changes', None)
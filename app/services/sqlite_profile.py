@@ -0,0 +1,144 @@
+"""
+SQLite 生产配置：每个连接启用 WAL 和一组调优 pragma，并让进程内的写事务排队执行。
+
+WAL 模式下读不阻塞写、写也不阻塞读，但同一时刻只能有一个写事务。
+多个线程同时写时，后来者只能依赖 busy_timeout 轮询重试，高并发下仍可能等到超时报
+"database is locked"。这里在第一条写语句执行前按先来后到领取写锁，连接归还连接池时释放，
+写事务因此在进程内依次执行，读查询不受影响。跨进程的写冲突仍由 busy_timeout 处理。
+"""
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from flask import current_app
+from sqlalchemy import event
+
+from app import db
+
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',      # WAL 下只在检查点时 fsync，崩溃不会损坏数据库，只可能丢最后几次提交
+    'busy_timeout': 5000,         # 毫秒
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64000,         # 负数表示 KiB，即 64MB
+    'temp_store': 'MEMORY',
+}
+
+_WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+_WRITER_KEY = 'sqlite_writer_gate'
+
+
+class WriterGate:
+    """先进先出的写锁，记录排队情况便于观察"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._next_ticket = 0
+        self._serving = 0
+        self._abandoned = set()
+        self.acquired = 0
+        self.waited = 0
+        self.timeouts = 0
+        self.max_wait = 0.0
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        started = time.monotonic()
+        with self._condition:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            if ticket != self._serving:
+                self.waited += 1
+            while ticket != self._serving:
+                remaining = None if timeout is None else timeout - (time.monotonic() - started)
+                if remaining is not None and remaining <= 0:
+                    # 放弃排队：把票号标记为作废，轮到它时直接跳过
+                    self._abandoned.add(ticket)
+                    self.timeouts += 1
+                    return False
+                self._condition.wait(remaining)
+            self.acquired += 1
+            self.max_wait = max(self.max_wait, time.monotonic() - started)
+            return True
+
+    def release(self) -> None:
+        with self._condition:
+            self._serving += 1
+            while self._serving in self._abandoned:
+                self._abandoned.discard(self._serving)
+                self._serving += 1
+            self._condition.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                'acquired': self.acquired,
+                'waited': self.waited,
+                'timeouts': self.timeouts,
+                'max_wait_seconds': round(self.max_wait, 4),
+                'queued': self._next_ticket - self._serving - len(self._abandoned),
+            }
+
+
+def _format_pragma(name: str, value: Any) -> str:
+    return f"PRAGMA {name}={value}"
+
+
+def is_file_sqlite(engine) -> bool:
+    return engine.dialect.name == 'sqlite' and engine.url.database not in (None, '', ':memory:')
+
+
+def apply_sqlite_profile(engine, pragmas: Dict[str, Any], serialize_writes: bool = True,
+                         writer_timeout: Optional[float] = None) -> Optional[WriterGate]:
+    """给 engine 注册连接级 pragma 和写锁，返回写锁（未启用时为 None）"""
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(_format_pragma(name, value))
+        finally:
+            cursor.close()
+
+    if not serialize_writes:
+        return None
+
+    gate = WriterGate()
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def acquire_writer(conn, cursor, statement, parameters, context, executemany):
+        info = conn.connection.info
+        if info.get(_WRITER_KEY) or not statement.lstrip().upper().startswith(_WRITE_PREFIXES):
+            return
+        # 超时就不再排队，交给 SQLite 自己的 busy_timeout
+        info[_WRITER_KEY] = gate.acquire(writer_timeout)
+
+    @event.listens_for(engine, 'checkin')
+    def release_writer(dbapi_connection, connection_record):
+        if connection_record is not None and connection_record.info.pop(_WRITER_KEY, False):
+            gate.release()
+
+    return gate
+
+
+def init_sqlite_profile(app) -> None:
+    """SQLITE_PRODUCTION_PROFILE 为真且使用文件数据库时启用"""
+    if not app.config.get('SQLITE_PRODUCTION_PROFILE'):
+        return
+    with app.app_context():
+        engine = db.engine
+        if not is_file_sqlite(engine):
+            return
+        pragmas = {**DEFAULT_SQLITE_PRAGMAS, **(app.config.get('SQLITE_PRAGMAS') or {})}
+        timeout = pragmas.get('busy_timeout')
+        gate = apply_sqlite_profile(
+            engine,
+            pragmas,
+            serialize_writes=app.config.get('SQLITE_SERIALIZE_WRITES', True),
+            writer_timeout=timeout / 1000 if timeout else None
+        )
+    app.extensions['sqlite_writer_gate'] = gate
+
+
+def writer_gate() -> Optional[WriterGate]:
+    return current_app.extensions.get('sqlite_writer_gate')
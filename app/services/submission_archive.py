@@ -0,0 +1,175 @@
+"""
+提交归档：把超过保留期（或指定候选人）的提交从在线表移到单独的 SQLite 归档文件。
+
+每个归档提交是归档库 archived_submissions 表中的一行，payload 是与
+GET /api/submissions/<id> 相同的 JSON（含完整源码和测试结果），用 blob_store 的
+压缩方式压缩。归档分批进行：先写入并提交归档库，再从在线表删除（同时回收只被
+这些提交引用的 blob），中途退出最多留下已归档但尚未删除的提交，重新运行时会覆盖
+写入后继续删除。
+
+仍被 latest_submissions 指针引用的提交（每道题最新和最佳的一次）不归档，
+工作区和最新/最佳结果接口始终只读在线表。submissions 表使用 AUTOINCREMENT，
+归档提交的 id 不会被分配给新提交，所以其他提交记录的复用来源 id 保持不变；
+彻底删除候选人或题目时同时删除其归档提交。
+"""
+import json
+import os
+from datetime import datetime, timedelta, UTC
+from typing import Any, Dict, Iterable, List, Optional
+
+from flask import current_app
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, MetaData, String, Table, create_engine
+from sqlalchemy.orm import selectinload
+
+from app import db
+from app.models import LatestSubmission, Submission
+from app.services.blob_store import blob_store, compress, decompress
+from app.services.code_fingerprint import reused_from
+from app.services.deletion import delete_submission_rows
+from app.services.jobs import Job
+
+DEFAULT_RETENTION_DAYS = 365
+DEFAULT_BATCH_SIZE = 200
+
+archive_metadata = MetaData()
+archived_submissions = Table(
+    'archived_submissions', archive_metadata,
+    Column('id', Integer, primary_key=True, autoincrement=False),
+    Column('candidate_id', Integer, nullable=False, index=True),
+    Column('problem_id', Integer, nullable=False, index=True),
+    Column('submitted_at', DateTime),
+    Column('archived_at', DateTime, nullable=False),
+    Column('compression', String(10), nullable=False),
+    Column('payload', LargeBinary, nullable=False),
+)
+
+
+def default_archive_path(app) -> str:
+    return os.path.join(app.instance_path, 'submission_archive.db')
+
+
+def _archive_path() -> str:
+    return current_app.config.get('SUBMISSION_ARCHIVE_PATH') or default_archive_path(current_app)
+
+
+def _archive_exists() -> bool:
+    return 'submission_archive' in current_app.extensions or os.path.exists(_archive_path())
+
+
+def _engine():
+    """每个应用实例一个归档库引擎，首次使用时创建文件和表"""
+    engine = current_app.extensions.get('submission_archive')
+    if engine is None:
+        path = _archive_path()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        engine = create_engine(f'sqlite:///{path}')
+        archive_metadata.create_all(engine)
+        current_app.extensions['submission_archive'] = engine
+    return engine
+
+
+def _serialize(sub: Submission, code_by_hash: Dict[str, str]) -> Dict[str, Any]:
+    """与 GET /api/submissions/<id> 相同的字段"""
+    return {
+        'id': sub.id,
+        'candidate_id': sub.candidate_id,
+        'problem_id': sub.problem_id,
+        'language': sub.language,
+        'code': code_by_hash.get(sub.code_hash) if sub.code_hash else sub.legacy_code,
+        'submission_time': sub.submitted_at.isoformat() if sub.submitted_at else None,
+        'status': sub.status,
+        'test_results': sub.test_results,
+        'llm_review': sub.llm_review,
+        'llm_review_status': sub.llm_review_status,
+        'llm_review_error': sub.llm_review_error,
+        'reused_from': reused_from(sub)
+    }
+
+
+def _archive_rows(submissions: List[Submission]) -> List[Dict[str, Any]]:
+    code_by_hash = blob_store.get_many_text(sub.code_hash for sub in submissions if sub.code_hash)
+    now = datetime.now(UTC)
+    rows = []
+    for sub in submissions:
+        method, payload = compress(json.dumps(_serialize(sub, code_by_hash)).encode('utf-8'))
+        rows.append({'id': sub.id, 'candidate_id': sub.candidate_id, 'problem_id': sub.problem_id,
+                     'submitted_at': sub.submitted_at, 'archived_at': now, 'compression': method,
+                     'payload': payload})
+    return rows
+
+
+def archive_submissions(older_than_days: Optional[int] = None, candidate_ids: Optional[Iterable[int]] = None,
+                        job: Optional[Job] = None, batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    归档提交时间早于 older_than_days 天的提交，或 candidate_ids 中候选人（例如已结束的招聘批次）
+    的全部提交；两者都给出时归档两者的并集。都没有给出时使用 SUBMISSION_RETENTION_DAYS。
+    """
+    candidate_ids = list(candidate_ids or [])
+    conditions = []
+    if older_than_days is None and not candidate_ids:
+        older_than_days = current_app.config.get('SUBMISSION_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+    if older_than_days is not None:
+        conditions.append(Submission.submitted_at < datetime.now(UTC) - timedelta(days=older_than_days))
+    if candidate_ids:
+        conditions.append(Submission.candidate_id.in_(candidate_ids))
+
+    pinned = [Submission.id.notin_(db.select(column).where(column.isnot(None)))
+              for column in (LatestSubmission.latest_submission_id, LatestSubmission.best_submission_id)]
+    engine = _engine()
+    archived = 0
+    last_id = 0
+    while True:
+        submissions = Submission.query.options(selectinload(Submission.results)).filter(
+            Submission.id > last_id, db.or_(*conditions), *pinned
+        ).order_by(Submission.id).limit(batch_size).all()
+        if not submissions:
+            break
+        rows = _archive_rows(submissions)
+        # 先确保归档写入成功，再删除在线数据
+        with engine.begin() as connection:
+            connection.execute(archived_submissions.delete().where(
+                archived_submissions.c.id.in_([row['id'] for row in rows])))
+            connection.execute(archived_submissions.insert(), rows)
+        last_id = submissions[-1].id
+        ids = [sub.id for sub in submissions]
+        # 在线提交的 verdict/review_reused_from_id 仍指向归档 id，可经归档读取
+        delete_submission_rows(ids, keep_reuse_links=True)
+        db.session.commit()
+        archived += len(ids)
+        if job:
+            job.update_progress(archived=archived, last_submission_id=last_id)
+    return {'archived': archived}
+
+
+def archive_submissions_job(job: Job, older_than_days: Optional[int] = None,
+                            candidate_ids: Optional[List[int]] = None) -> Dict[str, Any]:
+    return archive_submissions(older_than_days=older_than_days, candidate_ids=candidate_ids, job=job)
+
+
+def get_archived_submission(submission_id: int) -> Optional[Dict[str, Any]]:
+    """按 id 读取归档的提交，不存在时返回 None"""
+    if not _archive_exists():
+        return None
+    with _engine().connect() as connection:
+        row = connection.execute(
+            archived_submissions.select().where(archived_submissions.c.id == submission_id)
+        ).first()
+    if row is None:
+        return None
+    detail = json.loads(decompress(row.compression, row.payload))
+    detail['archived'] = True
+    detail['archived_at'] = row.archived_at.isoformat()
+    return detail
+
+
+def delete_archived(candidate_id: Optional[int] = None, problem_id: Optional[int] = None) -> int:
+    """删除某个候选人或某道题目的全部归档提交，返回删除的数量"""
+    if not _archive_exists() or (candidate_id is None and problem_id is None):
+        return 0
+    query = archived_submissions.delete()
+    if candidate_id is not None:
+        query = query.where(archived_submissions.c.candidate_id == candidate_id)
+    if problem_id is not None:
+        query = query.where(archived_submissions.c.problem_id == problem_id)
+    with _engine().begin() as connection:
+        return connection.execute(query).rowcount
@@ -0,0 +1,120 @@
+"""
+候选人工作区：按顺序的标签页、题目描述、测试用例以及每道题的最新提交。
+
+无论打开了多少个标签页，都只执行固定数量的查询：
+候选人、标签页和题目、测试用例、最新提交、提交的测试结果、源码 blob 各一条。
+条件请求先用 workspace_etag 的一条查询生成 ETag，未变化时不必加载这些数据。
+"""
+import hashlib
+import json
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import load_only, selectinload
+
+from app import db
+from app.models import Candidate, CandidateProblemTab, LatestSubmission, Problem, Submission, TestCase
+from app.services.blob_store import blob_store
+
+
+def _latest_submissions(candidate_id: int, problem_ids: List[int]) -> List[Submission]:
+    """每道题最新的一次提交，经由 latest_submissions 指针表按主键关联"""
+    return Submission.query.options(
+        load_only(Submission.id, Submission.problem_id, Submission.language, Submission.code_hash,
+                  Submission.legacy_code, Submission.legacy_test_results, Submission.status,
+                  Submission.submitted_at, Submission.llm_review, Submission.llm_review_status,
+                  raiseload=True),
+        selectinload(Submission.results)
+    ).join(LatestSubmission, LatestSubmission.latest_submission_id == Submission.id).filter(
+        LatestSubmission.candidate_id == candidate_id, LatestSubmission.problem_id.in_(problem_ids)
+    ).all()
+
+
+def _parse_legacy_results(text: Optional[str]) -> List[Dict[str, Any]]:
+    """尚未迁移的提交仍以 JSON 字符串保存测试结果，前端需要的是列表"""
+    try:
+        results = json.loads(text) if text else []
+    except ValueError:
+        return []
+    return results if isinstance(results, list) else []
+
+
+def _serialize_submission(sub: Submission, code_by_hash: Dict[str, str]) -> Dict[str, Any]:
+    if sub.results:
+        # 过长的输出只返回预览，需要完整内容时再请求 /api/submissions/<id>
+        test_results = [result.to_result(full=False) for result in sub.results]
+    else:
+        test_results = _parse_legacy_results(sub.legacy_test_results)
+    return {
+        'id': sub.id,
+        'language': sub.language,
+        'code': code_by_hash.get(sub.code_hash) if sub.code_hash else sub.legacy_code,
+        'submission_time': sub.submitted_at.isoformat() if sub.submitted_at else None,
+        'status': sub.status,
+        'test_results': test_results,
+        'llm_review': sub.llm_review,
+        'llm_review_status': sub.llm_review_status
+    }
+
+
+def workspace_etag(candidate: Candidate) -> str:
+    """由候选人信息、标签页、题目版本号和每道题最新提交的状态生成 ETag，只需一条查询"""
+    rows = db.session.execute(
+        db.select(CandidateProblemTab.id, CandidateProblemTab.problem_id, CandidateProblemTab.tab_order,
+                  Problem.version, Submission.id, Submission.status, Submission.llm_review_status,
+                  Submission.llm_review_updated_at)
+        .join(Problem, Problem.id == CandidateProblemTab.problem_id)
+        .outerjoin(LatestSubmission, (LatestSubmission.candidate_id == CandidateProblemTab.candidate_id)
+                   & (LatestSubmission.problem_id == CandidateProblemTab.problem_id))
+        .outerjoin(Submission, Submission.id == LatestSubmission.latest_submission_id)
+        .where(CandidateProblemTab.candidate_id == candidate.id)
+        .order_by(CandidateProblemTab.tab_order, CandidateProblemTab.id)
+    ).all()
+    stamp = repr((candidate.id, candidate.name, candidate.email, [tuple(row) for row in rows]))
+    return hashlib.sha256(stamp.encode('utf-8')).hexdigest()[:32]
+
+
+def load_workspace(candidate: Candidate) -> Dict[str, Any]:
+    """返回候选人的工作区数据"""
+    candidate_id = candidate.id
+    tabs = db.session.execute(
+        db.select(CandidateProblemTab.id, CandidateProblemTab.problem_id, CandidateProblemTab.tab_order,
+                  Problem.title, Problem.description)
+        .join(Problem, Problem.id == CandidateProblemTab.problem_id)
+        .where(CandidateProblemTab.candidate_id == candidate_id)
+        .order_by(CandidateProblemTab.tab_order, CandidateProblemTab.id)
+    ).all()
+    problem_ids = [tab.problem_id for tab in tabs]
+
+    test_cases = defaultdict(list)
+    latest = {}
+    if problem_ids:
+        rows = db.session.execute(
+            db.select(TestCase.id, TestCase.problem_id, TestCase.input_params, TestCase.expected_output)
+            .where(TestCase.problem_id.in_(problem_ids))
+            .order_by(TestCase.problem_id, TestCase.id)
+        ).all()
+        for row in rows:
+            test_cases[row.problem_id].append(
+                {'id': row.id, 'input_params': row.input_params, 'expected_output': row.expected_output}
+            )
+
+        submissions = _latest_submissions(candidate_id, problem_ids)
+        code_by_hash = blob_store.get_many_text(sub.code_hash for sub in submissions if sub.code_hash)
+        latest = {sub.problem_id: _serialize_submission(sub, code_by_hash) for sub in submissions}
+
+    return {
+        'candidate': {'id': candidate.id, 'name': candidate.name, 'email': candidate.email},
+        'tabs': [{
+            'id': tab.id,
+            'problem_id': tab.problem_id,
+            'tab_order': tab.tab_order,
+            'problem': {
+                'id': tab.problem_id,
+                'title': tab.title,
+                'description': tab.description,
+                'test_cases': test_cases[tab.problem_id]
+            },
+            'latest_submission': latest.get(tab.problem_id)
+        } for tab in tabs]
+    }
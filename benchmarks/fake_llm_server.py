@@ -0,0 +1,296 @@
+"""
+本地的 OpenAI 兼容 /v1/chat/completions 假服务，用于在不消耗 DeepSeek 额度的情况下
+压测评审链路。
+
+支持 stream: true 的 SSE 输出，可配置 token 速率、首 token 延迟、错误注入、
+429 突发以及并发上限（超过上限直接返回 429）。
+
+    python -m benchmarks.fake_llm_server --port 8089 --tokens-per-second 50 --ttft 0.5
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+DEFAULT_REVIEW_TEXT = (
+    "## Review\n\nThe solution is correct and handles the common edge cases. "
+    "Time complexity is O(n) and memory usage is O(1). Variable names are clear, "
+    "but the main loop could be extracted into a helper for readability. "
+    "Consider adding input validation and a few comments on the invariants.\n\n"
+    "Score: 85/100"
+)
+
+
+class FakeLLMConfig:
+    """假服务的行为参数，运行中也可以通过 POST /_config 修改"""
+
+    def __init__(self, tokens_per_second: float = 200.0, ttft: float = 0.05, response_tokens: int = 120,
+                 error_rate: float = 0.0, burst_429_every: int = 0, burst_429_length: int = 0,
+                 retry_after: float = 0.1, max_concurrency: int = 0, seed: Optional[int] = None):
+        self.tokens_per_second = tokens_per_second
+        self.ttft = ttft
+        self.response_tokens = response_tokens
+        self.error_rate = error_rate
+        self.burst_429_every = burst_429_every      # 每 N 个请求触发一次 429 突发，0 表示关闭
+        self.burst_429_length = burst_429_length    # 每次突发连续返回 429 的请求数
+        self.retry_after = retry_after
+        self.max_concurrency = max_concurrency      # 同时处理的请求上限，0 表示不限
+        self.seed = seed
+
+    def update(self, values: Dict[str, Any]) -> None:
+        for key, value in values.items():
+            if hasattr(self, key):
+                setattr(self, key, type(getattr(self, key))(value) if getattr(self, key) is not None else value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+
+class FakeLLMStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.completed = 0
+        self.rate_limited = 0
+        self.errors = 0
+        self.active = 0
+        self.max_active = 0
+        self.tokens_sent = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        with self.lock:
+            return {key: value for key, value in vars(self).items() if key != 'lock'}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: 'FakeLLMServer'
+
+    def log_message(self, format, *args):  # 压测时不输出访问日志
+        pass
+
+    def _send_json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == '/_stats':
+            self._send_json(200, self.server.stats.to_dict())
+        elif self.path == '/_config':
+            self._send_json(200, self.server.config.to_dict())
+        else:
+            self._send_json(404, {'error': {'message': 'Not found'}})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+
+        if self.path == '/_config':
+            self.server.config.update(json.loads(raw or b'{}'))
+            self._send_json(200, self.server.config.to_dict())
+            return
+        if self.path != '/v1/chat/completions':
+            self._send_json(404, {'error': {'message': 'Not found'}})
+            return
+        if not (self.headers.get('Authorization') or '').startswith('Bearer '):
+            self._send_json(401, {'error': {'message': 'Missing API key', 'type': 'authentication_error'}})
+            return
+        try:
+            payload = json.loads(raw)
+            messages = payload['messages']
+        except (ValueError, KeyError, TypeError):
+            self._send_json(400, {'error': {'message': 'Invalid request body', 'type': 'invalid_request_error'}})
+            return
+
+        verdict = self.server.admit()
+        if verdict == 'rate_limited':
+            self._send_json(429, {'error': {'message': 'Rate limit reached', 'type': 'rate_limit_error'}},
+                            {'Retry-After': str(self.server.config.retry_after)})
+            return
+        if verdict == 'error':
+            self._send_json(500, {'error': {'message': 'Injected server error', 'type': 'server_error'}})
+            return
+
+        try:
+            tokens = self.server.response_tokens(messages)
+            if payload.get('stream'):
+                self._stream(payload.get('model'), tokens)
+            else:
+                self._complete(payload.get('model'), tokens)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.server.release()
+
+    def _complete(self, model: str, tokens) -> None:
+        config = self.server.config
+        time.sleep(config.ttft + len(tokens) / max(config.tokens_per_second, 1e-6))
+        self.server.record_tokens(len(tokens))
+        self._send_json(200, {
+            'id': f"chatcmpl-{uuid.uuid4().hex}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': ''.join(tokens)}, 'finish_reason': 'stop'}],
+            'usage': {'completion_tokens': len(tokens)},
+        })
+
+    def _stream(self, model: str, tokens) -> None:
+        config = self.server.config
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        time.sleep(config.ttft)
+        interval = 1.0 / max(config.tokens_per_second, 1e-6)
+        next_at = time.monotonic()
+        for token in tokens:
+            chunk = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+            self.server.record_tokens(1)
+            next_at += interval
+            delay = next_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    """可在进程内启动的假 LLM 服务"""
+
+    daemon_threads = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, config: Optional[FakeLLMConfig] = None):
+        super().__init__((host, port), _Handler)
+        self.config = config or FakeLLMConfig()
+        self.stats = FakeLLMStats()
+        self._random = random.Random(self.config.seed)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def admit(self) -> str:
+        """决定本次请求是正常处理、返回 429 还是注入 500"""
+        config = self.config
+        with self.stats.lock:
+            self.stats.requests += 1
+            position = self.stats.requests
+            if config.burst_429_every and config.burst_429_length:
+                if (position - 1) % config.burst_429_every < config.burst_429_length:
+                    self.stats.rate_limited += 1
+                    return 'rate_limited'
+            if config.max_concurrency and self.stats.active >= config.max_concurrency:
+                self.stats.rate_limited += 1
+                return 'rate_limited'
+            if config.error_rate and self._random.random() < config.error_rate:
+                self.stats.errors += 1
+                return 'error'
+            self.stats.active += 1
+            self.stats.max_active = max(self.stats.max_active, self.stats.active)
+            return 'ok'
+
+    def release(self) -> None:
+        with self.stats.lock:
+            self.stats.active -= 1
+            self.stats.completed += 1
+
+    def record_tokens(self, count: int) -> None:
+        with self.stats.lock:
+            self.stats.tokens_sent += count
+
+    def response_tokens(self, messages) -> list:
+        """生成固定长度的回复，按单词切分为 token"""
+        words = DEFAULT_REVIEW_TEXT.replace('\n', ' \n ').split(' ')
+        tokens = []
+        while len(tokens) < self.config.response_tokens:
+            for word in words:
+                tokens.append(word if word == '\n' else word + ' ')
+                if len(tokens) >= self.config.response_tokens:
+                    break
+        return tokens
+
+    def start(self) -> 'FakeLLMServer':
+        self._thread = threading.Thread(target=self.serve_forever, name='fake-llm-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> 'FakeLLMServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--tokens-per-second', type=float, default=200.0)
+    parser.add_argument('--ttft', type=float, default=0.05, help='Seconds before the first token.')
+    parser.add_argument('--response-tokens', type=int, default=120)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Probability of an injected 500.')
+    parser.add_argument('--burst-429-every', type=int, default=0, help='Start a 429 burst every N requests.')
+    parser.add_argument('--burst-429-length', type=int, default=0, help='Requests rejected per 429 burst.')
+    parser.add_argument('--retry-after', type=float, default=0.1)
+    parser.add_argument('--max-concurrency', type=int, default=0, help='Reject with 429 above this many in-flight requests.')
+    parser.add_argument('--seed', type=int, default=None)
+
+
+def config_from_args(args: argparse.Namespace) -> FakeLLMConfig:
+    return FakeLLMConfig(
+        tokens_per_second=args.tokens_per_second,
+        ttft=args.ttft,
+        response_tokens=args.response_tokens,
+        error_rate=args.error_rate,
+        burst_429_every=args.burst_429_every,
+        burst_429_length=args.burst_429_length,
+        retry_after=args.retry_after,
+        max_concurrency=args.max_concurrency,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Fake OpenAI-compatible LLM server for review benchmarks.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = FakeLLMServer(args.host, args.port, config_from_args(args))
+    print(f"Fake LLM server listening on {server.url} (set DEEPSEEK_API_URL to this address)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""
+评审链路压测：在本地假 LLM 服务上测量评审吞吐、流式延迟和排队情况。
+
+    python -m benchmarks.review_benchmark --reviews 40 --concurrency 4 --tokens-per-second 100 --ttft 0.3
+    python -m benchmarks.review_benchmark --burst-429-every 10 --burst-429-length 3 --json
+
+每条评审都走完整的 generate_llm_review_async 流程（prompt 预算、流式接收、检查点写库），
+数据库使用临时 SQLite 文件，结束后删除。
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from benchmarks.fake_llm_server import FakeLLMServer, add_config_arguments, config_from_args
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        'mean': round(statistics.fmean(values), 4) if values else 0.0,
+        'p50': round(percentile(values, 50), 4),
+        'p95': round(percentile(values, 95), 4),
+        'max': round(max(values), 4) if values else 0.0,
+    }
+
+
+def _seed(db, reviews: int, code_lines: int) -> List[int]:
+    from app.models import Candidate, Problem, Submission, Setting
+    candidate = Candidate(name='Benchmark Candidate', email='benchmark@example.com')
+    candidate.set_password('benchmark')
+    problem = Problem(title='Benchmark Problem', description='Benchmark', llm_prompt='Review this code and score it out of 100.')
+    db.session.add_all([candidate, problem, Setting(key='deepseek_api_key', value='benchmark-key')])
+    db.session.commit()
+
+    submissions = []
+    for i in range(reviews):
+        code = "\n".join(f"def step_{i}_{n}(x):\n    return x + {n}" for n in range(code_lines))
+        submissions.append(Submission(candidate_id=candidate.id, problem_id=problem.id, language='python',
+                                      code=code, status='Accepted', llm_review_status='pending'))
+    db.session.add_all(submissions)
+    db.session.commit()
+    return [sub.id for sub in submissions]
+
+
+def run_benchmark(reviews: int = 20, concurrency: int = 4, code_lines: int = 20, server_config=None,
+                  max_retries: int = 3, retry_backoff: float = 0.05) -> Dict[str, Any]:
+    """启动假服务并对 reviews 条提交以 concurrency 并发执行完整评审，返回统计结果"""
+    from app import create_app, db
+    from app.config import TestingConfig
+    from app.models import Submission
+    from app.services import llm_service
+    from app.services.llm_service import generate_llm_review_async
+
+    tmpdir = tempfile.mkdtemp(prefix='review-benchmark-')
+    server = FakeLLMServer(config=server_config).start()
+
+    class BenchmarkConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tmpdir, 'benchmark.db')
+        DEEPSEEK_API_URL = server.url
+        LLM_MAX_RETRIES = max_retries
+        LLM_RETRY_BACKOFF = retry_backoff
+        SQLITE_PRODUCTION_PROFILE = True
+
+    app = create_app(config_class=BenchmarkConfig)
+    timings: Dict[int, Dict[str, float]] = {}
+    timings_lock = threading.Lock()
+
+    # 记录每条评审第一次收到流式内容的时间
+    original_checkpointer = llm_service.ReviewCheckpointer
+
+    class TimedCheckpointer(original_checkpointer):
+        def __call__(self, content):
+            with timings_lock:
+                timings[self.submission_id].setdefault('first_chunk', time.perf_counter())
+            super().__call__(content)
+
+    def review(submission_id: int, enqueued: float) -> None:
+        with timings_lock:
+            timings[submission_id] = {'enqueued': enqueued, 'started': time.perf_counter()}
+        with app.app_context():
+            try:
+                generate_llm_review_async(submission_id)
+            finally:
+                db.session.remove()
+        with timings_lock:
+            timings[submission_id]['finished'] = time.perf_counter()
+
+    try:
+        with app.app_context():
+            db.create_all()
+            submission_ids = _seed(db, reviews, code_lines)
+
+        llm_service.ReviewCheckpointer = TimedCheckpointer
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(review, sid, time.perf_counter()) for sid in submission_ids]
+            for future in futures:
+                future.result()
+        elapsed = time.perf_counter() - started
+
+        with app.app_context():
+            statuses = dict(db.session.query(Submission.llm_review_status, db.func.count()).group_by(Submission.llm_review_status).all())
+            db.session.remove()
+            db.engine.dispose()
+    finally:
+        llm_service.ReviewCheckpointer = original_checkpointer
+        server.stop()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    done = statuses.get('done', 0)
+    queue_wait = [t['started'] - t['enqueued'] for t in timings.values()]
+    first_chunk = [t['first_chunk'] - t['started'] for t in timings.values() if 'first_chunk' in t]
+    total = [t['finished'] - t['started'] for t in timings.values() if 'finished' in t]
+    return {
+        'reviews': reviews,
+        'concurrency': concurrency,
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput_reviews_per_second': round(done / elapsed, 3) if elapsed else 0.0,
+        'statuses': statuses,
+        'queue_wait_seconds': summarize(queue_wait),
+        'time_to_first_chunk_seconds': summarize(first_chunk),
+        'review_latency_seconds': summarize(total),
+        'server': server.stats.to_dict(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark the LLM review pipeline against a local fake LLM server.')
+    parser.add_argument('--reviews', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--code-lines', type=int, default=20, help='Functions per generated submission.')
+    parser.add_argument('--max-retries', type=int, default=3)
+    parser.add_argument('--retry-backoff', type=float, default=0.05)
+    parser.add_argument('--json', action='store_true', help='Print the result as JSON.')
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    result = run_benchmark(
+        reviews=args.reviews,
+        concurrency=args.concurrency,
+        code_lines=args.code_lines,
+        server_config=config_from_args(args),
+        max_retries=args.max_retries,
+        retry_backoff=args.retry_backoff,
+    )
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    print(f"reviews={result['reviews']} concurrency={result['concurrency']} elapsed={result['elapsed_seconds']}s")
+    print(f"throughput: {result['throughput_reviews_per_second']} reviews/s, statuses: {result['statuses']}")
+    for label, key in (('queue wait', 'queue_wait_seconds'), ('first chunk', 'time_to_first_chunk_seconds'), ('review latency', 'review_latency_seconds')):
+        stats = result[key]
+        print(f"{label:>15}: mean={stats['mean']}s p50={stats['p50']}s p95={stats['p95']}s max={stats['max']}s")
+    print(f"server: {result['server']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+在本地假 LLM 服务上跑一次完整的流式评审，打印接收进度和最终评审内容。
+
+    python -m benchmarks.review_demo --tokens-per-second 50 --ttft 0.5
+"""
+import argparse
+
+from benchmarks.fake_llm_server import FakeLLMServer, add_config_arguments, config_from_args
+
+DEMO_CODE = "def hello():\n    print('Hello, world!')"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Stream one code review from a local fake LLM server.')
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    from app import create_app, db
+    from app.config import TestingConfig
+    from app.models import Problem, Setting
+    from app.services.llm_service import DEEPSEEK_API_KEY_SETTING, LLMService
+
+    with FakeLLMServer(config=config_from_args(args)) as server:
+        class DemoConfig(TestingConfig):
+            DEEPSEEK_API_URL = server.url
+
+        app = create_app(config_class=DemoConfig)
+        with app.app_context():
+            db.create_all()
+            problem = Problem(title='Demo', description='Demo problem',
+                              llm_prompt='Review this code and score it out of 100.')
+            db.session.add_all([problem, Setting(key=DEEPSEEK_API_KEY_SETTING, value='demo-key')])
+            db.session.commit()
+
+            review = LLMService().generate_review(
+                DEMO_CODE, problem_id=problem.id, language='python', stream=True,
+                on_progress=lambda content: print(f"... {len(content)} chars received")
+            )
+            print(f"LLM Review:\n{review}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useCallback } from 'react';
 import {
   List,
   ListItem,
@@ -19,29 +19,37 @@ import { Add as AddIcon, Delete as DeleteIcon } from '@mui/icons-material';
 import useStore from '../store/useStore';
 import { candidateApi } from '../services/api';
 
+const SEARCH_DEBOUNCE_MS = 300;
+
 function CandidateList() {
   const { candidates, currentCandidate, setCandidates, setCurrentCandidate, setLoading, setError } = useStore();
   const [open, setOpen] = useState(false);
   const [newCandidateName, setNewCandidateName] = useState('');
 
-  // 加载候选人列表
-  useEffect(() => {
-    const fetchCandidates = async () => {
-      try {
-        setLoading('candidates', true);
-        const response = await candidateApi.getAll();
-        setCandidates(response.data.candidates);
-      } catch (error) {
-        setError('加载候选人列表失败');
-        console.error('Error fetching candidates:', error);
-      } finally {
-        setLoading('candidates', false);
-      }
-    };
+  const [searchTerm, setSearchTerm] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
 
-    fetchCandidates();
+  // 加载候选人列表（分页，有搜索词时按姓名或邮箱前缀搜索）
+  const fetchCandidates = useCallback(async (q, cursor = null) => {
+    try {
+      setLoading('candidates', true);
+      const response = await candidateApi.getAll({ q: q || undefined, cursor: cursor || undefined });
+      const { candidates: page, next_cursor: next } = response.data;
+      setCandidates(cursor ? [...useStore.getState().candidates, ...page] : page);
+      setNextCursor(next);
+    } catch (error) {
+      setError('加载候选人列表失败');
+      console.error('Error fetching candidates:', error);
+    } finally {
+      setLoading('candidates', false);
+    }
   }, [setCandidates, setLoading, setError]);
 
+  useEffect(() => {
+    const timer = setTimeout(() => fetchCandidates(searchTerm.trim()), SEARCH_DEBOUNCE_MS);
+    return () => clearTimeout(timer);
+  }, [searchTerm, fetchCandidates]);
+
   // 处理新建候选人
   const handleCreateCandidate = async () => {
     if (!newCandidateName.trim()) return;
@@ -49,7 +57,7 @@ function CandidateList() {
     try {
       setLoading('candidates', true);
       const response = await candidateApi.create({ name: newCandidateName.trim() });
-      setCandidates([...candidates, response.data.candidate]);
+      setCandidates([response.data.candidate, ...candidates]);
       setNewCandidateName('');
       setOpen(false);
     } catch (error) {
@@ -89,6 +97,15 @@ function CandidateList() {
           <AddIcon />
         </IconButton>
       </Box>
+      <Box sx={{ px: 2, pb: 1 }}>
+        <TextField
+          fullWidth
+          size="small"
+          placeholder="按姓名或邮箱搜索..."
+          value={searchTerm}
+          onChange={(e) => setSearchTerm(e.target.value)}
+        />
+      </Box>
       <Divider />
       <List>
         {candidates.map((candidate) => (
@@ -113,6 +130,13 @@ function CandidateList() {
             </ListItemButton>
           </ListItem>
         ))}
+        {nextCursor && (
+          <ListItem>
+            <Button fullWidth onClick={() => fetchCandidates(searchTerm.trim(), nextCursor)}>
+              加载更多
+            </Button>
+          </ListItem>
+        )}
       </List>
 
       {/* 新建候选人对话框 */}
@@ -7,7 +7,7 @@ import MarkdownEditor from './MarkdownEditor';
 import TestCaseManager from './TestCaseManager';
 import PromptEditor from './PromptEditor';
 import PreviewPanel from './PreviewPanel';
-import { getProblem, createProblem, updateProblem } from '../../services/problemService';
+import { getProblem, createProblem, updateProblem, replaceTestCases } from '../../services/problemService';
 import './index.css';
 
 const ProblemEditor = () => {
@@ -45,9 +45,12 @@ const ProblemEditor = () => {
       setLoading(true);
       if (id) {
         await updateProblem(id, problem);
+        const testCases = await replaceTestCases(id, problem.test_cases);
+        handleProblemChange('test_cases', testCases);
         message.success('更新题目成功');
       } else {
-        const newProblem = await createProblem(problem);
+        const { problem: newProblem } = await createProblem(problem);
+        await replaceTestCases(newProblem.id, problem.test_cases);
         message.success('创建题目成功');
         navigate(`/problems/edit/${newProblem.id}`);
       }
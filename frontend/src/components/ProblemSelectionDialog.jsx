@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useCallback } from 'react';
 import {
   Dialog,
   DialogTitle,
@@ -14,33 +14,40 @@ import {
   Typography,
   Box,
 } from '@mui/material';
-import { getProblems } from '../services/problemService';
+import { searchProblems } from '../services/problemService';
+
+const SEARCH_DEBOUNCE_MS = 300;
 
 const ProblemSelectionDialog = ({ open, onClose, onSelect }) => {
   const [problems, setProblems] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
   const [searchTerm, setSearchTerm] = useState('');
 
-  useEffect(() => {
-    const fetchProblems = async () => {
-      if (open) {
-        try {
-          setLoading(true);
-          setError(null);
-          const data = await getProblems();
-          setProblems(data);
-        } catch (err) {
-          setError('加载题目列表失败');
-          console.error('Error fetching problems:', err);
-        } finally {
-          setLoading(false);
-        }
-      }
-    };
+  const fetchProblems = useCallback(async (q, cursor = null) => {
+    try {
+      setLoading(true);
+      setError(null);
+      const data = await searchProblems(q, { cursor });
+      setProblems((current) => (cursor ? [...current, ...data.problems] : data.problems));
+      setNextCursor(data.next_cursor);
+    } catch (err) {
+      setError('加载题目列表失败');
+      console.error('Error fetching problems:', err);
+    } finally {
+      setLoading(false);
+    }
+  }, []);
 
-    fetchProblems();
-  }, [open]);
+  // 输入停顿后再请求服务端搜索
+  useEffect(() => {
+    if (!open) {
+      return undefined;
+    }
+    const timer = setTimeout(() => fetchProblems(searchTerm.trim()), SEARCH_DEBOUNCE_MS);
+    return () => clearTimeout(timer);
+  }, [open, searchTerm, fetchProblems]);
 
   const handleSearchChange = (event) => {
     setSearchTerm(event.target.value);
@@ -51,10 +58,6 @@ const ProblemSelectionDialog = ({ open, onClose, onSelect }) => {
     onClose();
   };
 
-  const filteredProblems = problems.filter((problem) =>
-    problem.title.toLowerCase().includes(searchTerm.toLowerCase())
-  );
-
   return (
     <Dialog
       open={open}
@@ -75,7 +78,7 @@ const ProblemSelectionDialog = ({ open, onClose, onSelect }) => {
           onChange={handleSearchChange}
           sx={{ mb: 2 }}
         />
-        {loading ? (
+        {loading && problems.length === 0 ? (
           <Box sx={{ display: 'flex', justifyContent: 'center', p: 3 }}>
             <CircularProgress />
           </Box>
@@ -85,12 +88,12 @@ const ProblemSelectionDialog = ({ open, onClose, onSelect }) => {
           </Typography>
         ) : (
           <List sx={{ width: '100%', bgcolor: 'background.paper' }}>
-            {filteredProblems.length === 0 ? (
+            {problems.length === 0 ? (
               <ListItem>
                 <ListItemText primary="没有找到匹配的题目" />
               </ListItem>
             ) : (
-              filteredProblems.map((problem) => (
+              problems.map((problem) => (
                 <ListItem key={problem.id} disablePadding>
                   <ListItemButton onClick={() => handleProblemSelect(problem)}>
                     <ListItemText
@@ -106,15 +109,22 @@ const ProblemSelectionDialog = ({ open, onClose, onSelect }) => {
                             WebkitLineClamp: 2,
                             WebkitBoxOrient: 'vertical',
                           }}
-                        >
-                          {problem.description}
-                        </Typography>
+                          // snippet 由服务端转义，只包含 <mark> 标签
+                          dangerouslySetInnerHTML={{ __html: problem.snippet }}
+                        />
                       }
                     />
                   </ListItemButton>
                 </ListItem>
               ))
             )}
+            {nextCursor && (
+              <ListItem>
+                <Button fullWidth disabled={loading} onClick={() => fetchProblems(searchTerm.trim(), nextCursor)}>
+                  加载更多
+                </Button>
+              </ListItem>
+            )}
           </List>
         )}
       </DialogContent>
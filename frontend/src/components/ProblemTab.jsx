@@ -9,13 +9,27 @@ import { getProblem, submitCode, getSubmission, pollSubmissionStatus } from '../
 const POLLING_INTERVAL = 1000; // 1秒
 const MAX_POLLING_TIME = 30000; // 30秒
 
-const ProblemTab = ({ candidateId, problemId }) => {
-  const [problem, setProblem] = useState(null);
-  const [loading, setLoading] = useState(true);
+// 提交详情接口返回的 test_results 是 JSON 字符串，工作区接口返回的是数组
+const parseTestResults = (testResults) => {
+  if (typeof testResults !== 'string') {
+    return Array.isArray(testResults) ? testResults : null;
+  }
+  try {
+    const parsed = JSON.parse(testResults);
+    return Array.isArray(parsed) ? parsed : null;
+  } catch (err) {
+    console.error('Error parsing test results:', err);
+    return null;
+  }
+};
+
+const ProblemTab = ({ candidateId, problemId, initialProblem = null, latestSubmission = null }) => {
+  const [problem, setProblem] = useState(initialProblem);
+  const [loading, setLoading] = useState(!initialProblem);
   const [error, setError] = useState(null);
-  const [code, setCode] = useState('');
-  const [testResults, setTestResults] = useState(null);
-  const [llmReview, setLlmReview] = useState(null);
+  const [code, setCode] = useState(latestSubmission?.code || '');
+  const [testResults, setTestResults] = useState(parseTestResults(latestSubmission?.test_results));
+  const [llmReview, setLlmReview] = useState(latestSubmission?.llm_review || null);
   const [submitting, setSubmitting] = useState(false);
   const [submissionId, setSubmissionId] = useState(null);
   const [pollingError, setPollingError] = useState(null);
@@ -35,10 +49,11 @@ const ProblemTab = ({ candidateId, problemId }) => {
       }
     };
 
-    if (problemId) {
+    // 工作区接口已经带回题目时不再单独请求
+    if (problemId && !initialProblem) {
       fetchProblem();
     }
-  }, [problemId]);
+  }, [problemId, initialProblem]);
 
   useEffect(() => {
     let pollingTimer = null;
@@ -53,7 +68,7 @@ const ProblemTab = ({ candidateId, problemId }) => {
         if (status.status === 'completed') {
           // 获取完整的提交结果
           const submission = await getSubmission(submissionId);
-          setTestResults(submission.test_results);
+          setTestResults(parseTestResults(submission.test_results));
           setLlmReview(submission.llm_review);
           setSubmitting(false);
           setSubmissionId(null);
@@ -4,7 +4,7 @@ import AddIcon from '@mui/icons-material/Add';
 import CloseIcon from '@mui/icons-material/Close';
 import ProblemTab from './ProblemTab';
 import ProblemSelectionDialog from './ProblemSelectionDialog';
-import { getCandidateTabs, addCandidateTab, removeCandidateTab } from '../services/problemService';
+import { getCandidateWorkspace, addCandidateTab, removeCandidateTab } from '../services/problemService';
 
 const TabContainer = ({ candidateId, onTabChange }) => {
   const [tabs, setTabs] = useState([]);
@@ -15,9 +15,15 @@ const TabContainer = ({ candidateId, onTabChange }) => {
     const fetchTabs = async () => {
       if (candidateId) {
         try {
-          const data = await getCandidateTabs(candidateId);
-          setTabs(data);
-          if (data.length > 0) {
+          const data = await getCandidateWorkspace(candidateId);
+          const workspaceTabs = data.tabs.map((tab) => ({
+            problemId: tab.problem_id,
+            title: tab.problem.title,
+            problem: tab.problem,
+            latestSubmission: tab.latest_submission,
+          }));
+          setTabs(workspaceTabs);
+          if (workspaceTabs.length > 0) {
             setActiveTab(0);
           }
         } catch (error) {
@@ -120,6 +126,8 @@ const TabContainer = ({ candidateId, onTabChange }) => {
             <ProblemTab
               candidateId={candidateId}
               problemId={tab.problemId}
+              initialProblem={tab.problem}
+              latestSubmission={tab.latestSubmission}
             />
           </Box>
         ))}
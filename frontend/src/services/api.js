@@ -12,10 +12,12 @@ const api = axios.create({
 // 候选人相关 API
 export const candidateApi = {
   create: (data) => api.post('/candidates', data),
-  getAll: () => api.get('/candidates'),
+  // params: { q, cursor, limit }，返回 { candidates, next_cursor }
+  getAll: (params) => api.get('/candidates', { params }),
   getById: (id) => api.get(`/candidates/${id}`),
   update: (id, data) => api.put(`/candidates/${id}`, data),
   delete: (id) => api.delete(`/candidates/${id}`),
+  reviewSession: (id, data = {}) => api.post(`/candidates/${id}/reviews`, data),
 };
 
 // 题目相关 API
@@ -41,6 +43,7 @@ export const problemApi = {
 export const testCaseApi = {
   create: (problemId, data) => api.post(`/problems/${problemId}/testcases`, data),
   getAll: (problemId) => api.get(`/problems/${problemId}/testcases`),
+  replaceAll: (problemId, testCases) => api.put(`/problems/${problemId}/testcases`, { test_cases: testCases }),
   getById: (id) => api.get(`/testcases/${id}`),
   update: (id, data) => api.put(`/testcases/${id}`, data),
   delete: (id) => api.delete(`/testcases/${id}`),
@@ -49,7 +52,7 @@ export const testCaseApi = {
 // 提交相关 API
 export const submissionApi = {
   create: (data) => api.post('/submissions', data),
-  getAll: () => api.get('/submissions'),
+  getAll: (params) => api.get('/submissions', { params }),
   getById: (id) => api.get(`/submissions/${id}`),
   getByCandidateAndProblem: (candidateId, problemId) => 
     api.get(`/submissions/candidate/${candidateId}/problem/${problemId}`),
@@ -72,4 +75,9 @@ export const settingApi = {
   update: (key, value) => api.put(`/settings/${key}`, { value }),
 };
 
+// 后台任务相关 API
+export const jobApi = {
+  getById: (id) => api.get(`/jobs/${id}`),
+};
+
 export default api; 
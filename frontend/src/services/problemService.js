@@ -7,6 +7,12 @@ export const getProblems = async () => {
   return response.data;
 };
 
+// 服务端全文搜索，只返回 id、标题和已转义的高亮摘要
+export const searchProblems = async (q, { cursor, limit } = {}) => {
+  const response = await request.get('/api/problems/search', { params: { q, cursor, limit } });
+  return response.data;
+};
+
 export const getProblem = async (id) => {
   const response = await request.get(`/api/problems/${id}`);
   return response.data;
@@ -22,6 +28,12 @@ export const updateProblem = async (id, problem) => {
   return response.data;
 };
 
+// 一次请求保存题目的全部测试用例，返回的列表与传入顺序一致并带有新 id
+export const replaceTestCases = async (problemId, testCases) => {
+  const response = await request.put(`/api/problems/${problemId}/testcases`, { test_cases: testCases });
+  return response.data.test_cases;
+};
+
 export const deleteProblem = async (id) => {
   const response = await request.delete(`/api/problems/${id}`);
   return response.data;
@@ -72,6 +84,17 @@ export const getCandidateTabs = async (candidateId) => {
   }
 };
 
+// 一次请求取回全部标签页、题目、测试用例和每道题的最新提交；内容未变时浏览器按 ETag 复用缓存
+export const getCandidateWorkspace = async (candidateId) => {
+  try {
+    const response = await request.get(`/api/candidates/${candidateId}/workspace`);
+    return response.data;
+  } catch (error) {
+    console.error('Error fetching candidate workspace:', error);
+    throw error;
+  }
+};
+
 export const addCandidateTab = async (candidateId, problemId) => {
   try {
     const response = await request.post(`/api/candidates/${candidateId}/tabs`, {
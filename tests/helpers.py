@@ -0,0 +1,27 @@
+"""多个测试模块共用的辅助工具"""
+from sqlalchemy import event
+
+
+class CountingQueries:
+    """统计上下文内执行的 SQL 语句数"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _count(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._count)
+
+
+def judge_result(test_case_id, passed, time='0.01', memory=1024, output='ok', status_id=3):
+    """构造一条 Judge0 判题结果"""
+    return {'test_case_id': test_case_id, 'passed': passed, 'status': 'Accepted' if passed else 'Wrong Answer',
+            'status_description': 'Accepted' if passed else 'Wrong Answer', 'status_id': status_id,
+            'output': output, 'error': None, 'compile_output': None, 'time': time, 'memory': memory}
@@ -0,0 +1,86 @@
+import unittest
+from sqlalchemy import event
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Blob, Candidate, Problem, Submission
+from app.services.blob_store import (COMPRESSION_NONE, blob_store, compress, decompress,
+                                     migrate_legacy_code)
+
+
+class BlobStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(config_class=TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        self.candidate = Candidate(name="Test Candidate", email="test@example.com")
+        self.problem = Problem(title="Test Problem", description="Desc", llm_prompt="Review")
+        db.session.add_all([self.candidate, self.problem])
+        db.session.commit()
+        self.code = "def solve(nums):\n    return sorted(nums)\n" * 20
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _submission(self, code):
+        return Submission(candidate_id=self.candidate.id, problem_id=self.problem.id,
+                          language='python', code=code, status='Accepted')
+
+    def test_identical_code_is_stored_once_and_compressed(self):
+        db.session.add_all([self._submission(self.code) for _ in range(3)] + [self._submission('print(1)')])
+        db.session.commit()
+
+        self.assertEqual(Blob.query.count(), 2)
+        blob = db.session.get(Blob, Submission.query.first().code_hash)
+        self.assertEqual(blob.size, len(self.code))
+        self.assertLess(len(blob.data), len(self.code) // 5)
+        self.assertIsNone(Submission.query.first().legacy_code)
+
+        db.session.expire_all()
+        self.assertEqual([s.code for s in Submission.query.order_by(Submission.id)], [self.code] * 3 + ['print(1)'])
+
+    def test_code_is_only_read_when_requested(self):
+        db.session.add(self._submission(self.code))
+        db.session.commit()
+        blob_store._cache.clear()
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            self.client.get('/api/submissions')
+            self.assertFalse(any('blobs' in s or 'submissions.code' in s for s in statements))
+            data = self.client.get('/api/submissions', query_string={'fields': 'id,code'}).get_json()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        self.assertEqual(data['submissions'][0]['code'], self.code)
+        self.assertTrue(any('FROM blobs' in s for s in statements))
+
+    def test_compression_round_trip(self):
+        for data in (b'', b'short', self.code.encode('utf-8'), bytes(range(256)) * 4):
+            method, packed = compress(data)
+            self.assertEqual(decompress(method, packed), data)
+        self.assertEqual(compress(b'short')[0], COMPRESSION_NONE)
+
+    def test_legacy_code_is_readable_and_migrated(self):
+        db.session.execute(db.insert(Submission), [
+            {'candidate_id': self.candidate.id, 'problem_id': self.problem.id, 'language': 'python', 'legacy_code': self.code},
+            {'candidate_id': self.candidate.id, 'problem_id': self.problem.id, 'language': 'python', 'legacy_code': self.code},
+        ])
+        db.session.commit()
+        self.assertEqual(Submission.query.first().code, self.code)
+
+        result = self.app.test_cli_runner().invoke(args=['submissions', 'migrate-code', '--batch-size', '1'])
+        self.assertIn('Migrated code of 2 submission(s).', result.output)
+        db.session.expire_all()
+        self.assertEqual(Blob.query.count(), 1)
+        for sub in Submission.query.all():
+            self.assertIsNone(sub.legacy_code)
+            self.assertEqual(sub.code, self.code)
+
+
+if __name__ == '__main__':
+    unittest.main()
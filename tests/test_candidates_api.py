@@ -1,8 +1,10 @@
 import unittest
+import io
 import json
 from app import create_app, db
 from app.config import TestingConfig
 from app.models import Candidate
+from datetime import datetime, timedelta
 
 class CandidatesAPITestCase(unittest.TestCase):
     def setUp(self):
@@ -77,10 +79,124 @@ class CandidatesAPITestCase(unittest.TestCase):
         response = self.client.get('/api/candidates')
         self.assertEqual(response.status_code, 200)
         json_response = response.get_json()
-        # self.assertIn('candidates', json_response) # The API returns a list directly
-        self.assertEqual(len(json_response), 2)
-        self.assertEqual(json_response[0]['name'], 'Initial Candidate')
-        self.assertEqual(json_response[1]['name'], 'Second Candidate')
+        self.assertIn('candidates', json_response)
+        self.assertIsNone(json_response['next_cursor'])
+        # 最近创建的在前
+        self.assertEqual([c['name'] for c in json_response['candidates']], ['Second Candidate', 'Initial Candidate'])
+        self.assertEqual(set(json_response['candidates'][0]), {'id', 'name', 'email'})
+
+    def _add_candidates(self, count):
+        base = datetime(2024, 1, 1)
+        for i in range(count):
+            db.session.add(Candidate(name=f"Batch {i:02d}", email=f"batch{i:02d}@example.com",
+                                     created_at=base + timedelta(minutes=i % 3)))
+        db.session.commit()
+
+    def _pages(self, **params):
+        names, cursor = [], None
+        while True:
+            query = dict(params)
+            if cursor:
+                query['cursor'] = cursor
+            data = self.client.get('/api/candidates', query_string=query).get_json()
+            names.extend(c['name'] for c in data['candidates'])
+            cursor = data['next_cursor']
+            if not cursor:
+                return names
+
+    def test_candidate_pages_cover_all_rows_once(self):
+        self._add_candidates(10)
+        names = self._pages(limit=3)
+        self.assertEqual(len(names), 11)
+        self.assertEqual(len(set(names)), 11)
+
+    def test_candidate_prefix_search(self):
+        self._add_candidates(12)
+        db.session.add(Candidate(name="Zhang San", email="BATCH-owner@example.com"))
+        db.session.commit()
+        self.assertEqual(self._pages(q='batch 1', limit=1), ['Batch 10', 'Batch 11'])
+        # 邮箱前缀同样匹配，且不区分大小写
+        names = self._pages(q='BATCH', limit=5)
+        self.assertEqual(len(names), 13)
+        self.assertEqual(names[0], 'Batch 00')
+        self.assertEqual(self._pages(q='initial@'), ['Initial Candidate'])
+        self.assertEqual(self._pages(q='nobody'), [])
+
+    def test_candidate_prefix_search_non_ascii(self):
+        db.session.add(Candidate(name="Émile Zola", email="emile@example.com"))
+        db.session.commit()
+        self.assertEqual(self._pages(q='É'), ['Émile Zola'])
+        self.assertEqual(self._pages(q='é'), ['Émile Zola'])
+        # 批量导入走 Core insert，同样要写入搜索键；改名后搜索键随之更新
+        rows = [{'name': 'Ödön', 'email': 'ODON@example.com', 'password': 'secret1'}]
+        self.assertEqual(self.client.post('/api/candidates/bulk', json=rows).status_code, 200)
+        self.assertEqual(self._pages(q='ö'), ['Ödön'])
+        self.assertEqual(self._pages(q='odon@'), ['Ödön'])
+        candidate = Candidate.query.filter_by(name='Émile Zola').one()
+        self.client.put(f'/api/candidates/{candidate.id}', json={'name': 'Ñandú'})
+        self.assertEqual(self._pages(q='ñ'), ['Ñandú'])
+        self.assertEqual(self._pages(q='é'), [])
+
+    def test_candidate_page_respects_byte_budget(self):
+        self._add_candidates(10)
+        self.app.config['CANDIDATE_PAGE_MAX_BYTES'] = 200
+        data = self.client.get('/api/candidates').get_json()
+        self.assertLess(len(data['candidates']), 11)
+        self.assertGreater(len(data['candidates']), 0)
+        self.assertIsNotNone(data['next_cursor'])
+        self.assertEqual(len(self._pages()), 11)
+
+    def test_candidate_list_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/candidates?cursor=bad').status_code, 400)
+        self.assertEqual(self.client.get('/api/candidates?limit=0').status_code, 400)
+
+    def test_bulk_create_candidates_json(self):
+        rows = [
+            {'name': 'Bulk One', 'email': 'one@example.com', 'password': 'pw1'},
+            {'name': 'Initial Candidate', 'email': 'other@example.com', 'password': 'pw'},
+            {'name': 'Bulk Two', 'email': 'initial@example.com', 'password': 'pw'},
+            {'name': 'Bulk Three', 'email': 'one@example.com', 'password': 'pw'},
+            {'name': 'No Password', 'email': 'nopass@example.com'},
+            {'name': 'Bulk Four', 'email': 'four@example.com', 'password': 'pw4'},
+        ]
+        response = self.client.post('/api/candidates/bulk', json={'candidates': rows})
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual((data['created'], data['failed']), (2, 4))
+        self.assertEqual([r['status'] for r in data['results']],
+                         ['created', 'error', 'error', 'error', 'error', 'created'])
+        self.assertEqual([r['row'] for r in data['results']], [1, 2, 3, 4, 5, 6])
+        self.assertIn('name already exists', data['results'][1]['message'])
+        self.assertIn('email already exists', data['results'][2]['message'])
+        self.assertIn('email already exists', data['results'][3]['message'])
+        self.assertIn('Missing', data['results'][4]['message'])
+
+        created = db.session.get(Candidate, data['results'][5]['candidate']['id'])
+        self.assertEqual(created.email, 'four@example.com')
+        self.assertTrue(created.check_password('pw4'))
+        self.assertEqual(Candidate.query.count(), 3)
+
+    def test_bulk_create_candidates_csv(self):
+        body = 'Name,Email,Password\nCsv One,csv1@example.com,secret\nCsv Two,csv2@example.com,secret\n'
+        response = self.client.post('/api/candidates/bulk', data=body, content_type='text/csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['created'], 2)
+
+        upload = {'file': (io.BytesIO('name,email,password\nCsv Three,csv3@example.com,x\n'.encode('utf-8-sig')),
+                           'candidates.csv')}
+        response = self.client.post('/api/candidates/bulk', data=upload, content_type='multipart/form-data')
+        self.assertEqual(response.get_json()['results'][0]['candidate']['name'], 'Csv Three')
+
+        response = self.client.post('/api/candidates/bulk', data='name,email\na,b\n', content_type='text/csv')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.get_json()['message'])
+
+    def test_bulk_create_candidates_limits(self):
+        self.assertEqual(self.client.post('/api/candidates/bulk', json=[]).status_code, 400)
+        self.assertEqual(self.client.post('/api/candidates/bulk', json={'x': 1}).status_code, 400)
+        self.app.config['BULK_CANDIDATE_MAX_ROWS'] = 1
+        rows = [{'name': f'N{i}', 'email': f'n{i}@example.com', 'password': 'pw'} for i in range(2)]
+        self.assertEqual(self.client.post('/api/candidates/bulk', json=rows).status_code, 413)
 
     def test_get_specific_candidate_success(self):
         response = self.client.get(f'/api/candidates/{self.candidate1.id}')
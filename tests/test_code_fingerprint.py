@@ -0,0 +1,201 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Candidate, Problem, Submission, TestCase
+from app.services.code_fingerprint import code_fingerprint
+
+SOLUTION = '''
+def greet(name):
+    """拼接问候语"""
+    suffix = " World"
+    return name + suffix
+
+print(greet(input()))
+'''
+
+# 只改了局部变量名、注释和空白
+RENAMED = '''
+# 第二次提交
+def greet(name):
+    tail  =  " World"
+    return name + tail
+
+
+print(greet(input()))
+'''
+
+CHANGED_LITERAL = SOLUTION.replace('" World"', '" world"')
+
+
+def accepted(stdout):
+    return {'status': {'id': 3, 'description': 'Accepted'}, 'stdout': json.dumps(stdout),
+            'stderr': None, 'compile_output': None, 'time': '0.01', 'memory': 1024}
+
+
+class CodeFingerprintTestCase(unittest.TestCase):
+    def test_python_ignores_names_comments_and_docstrings(self):
+        self.assertEqual(code_fingerprint(SOLUTION, 'python'), code_fingerprint(RENAMED, 'python'))
+        self.assertNotEqual(code_fingerprint(SOLUTION, 'python'), code_fingerprint(CHANGED_LITERAL, 'python'))
+        # 调用不同的内置函数语义不同
+        self.assertNotEqual(code_fingerprint('print(max(1, 2))', 'python'),
+                            code_fingerprint('print(min(1, 2))', 'python'))
+
+    def test_python_keeps_names_visible_outside_the_function(self):
+        def differ(a, b):
+            self.assertNotEqual(code_fingerprint(a, 'python'), code_fingerprint(b, 'python'))
+
+        # 方法名和类属性可以被外部按名字访问
+        differ('class Solution:\n    def solve(self):\n        return 1\nprint(Solution().solve())',
+               'class Solution:\n    def solver(self):\n        return 1\nprint(Solution().solve())')
+        differ('class C:\n    x = 1\nprint(C().x)', 'class C:\n    y = 1\nprint(C().x)')
+        differ('x = 1\nprint(x)', 'y = 1\nprint(y)')
+        differ('def f(a):\n    return a\nprint(f(a=1))', 'def f(b):\n    return b\nprint(f(a=1))')
+        # 同名的属性、关键字参数和字符串会让局部变量也不改名
+        differ('def f(o):\n    x = 1\n    return o.x + x', 'def f(o):\n    y = 1\n    return o.x + y')
+        differ('def f():\n    x = 1\n    return {"x": x}', 'def f():\n    y = 1\n    return {"x": y}')
+        differ('def f():\n    x = 1\n    return f"{x=}"', 'def f():\n    y = 1\n    return f"{y=}"')
+        differ('def f():\n    x = 1\n    return locals()', 'def f():\n    y = 1\n    return locals()')
+        # 函数里读取的全局名字（内置函数）与局部变量同名
+        differ('def f():\n    len = 1\n    return len\ndef g():\n    return len("a")',
+               'def f():\n    n = 1\n    return n\ndef g():\n    return n("a")')
+
+    def test_python_renames_nested_function_locals(self):
+        a = 'def solve(grid):\n    seen = set()\n    def dfs(cell):\n        seen.add(cell)\n    dfs(0)\n    return seen'
+        b = 'def solve(grid):\n    visited = set()\n    def dfs(node):\n        visited.add(node)\n    dfs(0)\n' \
+            '    return visited'
+        self.assertEqual(code_fingerprint(a, 'python'), code_fingerprint(b, 'python'))
+
+    def test_token_languages_rename_declared_variables_only(self):
+        a = 'int main() { int total = 0; // sum\n  for (int i = 0; i < 3; i++) total += i; printf("%d", total); }'
+        b = 'int main(){int s=0;/* loop */for(int k=0;k<3;k++) s+=k;\nprintf("%d",s);}'
+        c = 'int main(){int s=0;for(int k=0;k<3;k++) s+=k;\nputs("%d",s);}'
+        self.assertEqual(code_fingerprint(a, 'c++'), code_fingerprint(b, 'c++'))
+        self.assertNotEqual(code_fingerprint(b, 'c++'), code_fingerprint(c, 'c++'))
+        self.assertNotEqual(code_fingerprint(a, 'c++'), code_fingerprint(a, 'java'))
+        self.assertIsNone(code_fingerprint('  \n', 'python'))
+
+    def test_token_languages_keep_newlines_and_operators(self):
+        # 自动插入分号：return 后换行会返回 undefined
+        self.assertNotEqual(code_fingerprint('function f(o) { return\n {v: o} }', 'javascript'),
+                            code_fingerprint('function f(o) { return {v: o} }', 'javascript'))
+        self.assertEqual(code_fingerprint('let x = 1;\nconsole.log(x)', 'javascript'),
+                         code_fingerprint('let y=1;\n\n  console.log(y)  // 输出', 'javascript'))
+        self.assertNotEqual(code_fingerprint('int main(){int x=1,y=2;return x+++y;}', 'c++'),
+                            code_fingerprint('int main(){int x=1,y=2;return x+ ++y;}', 'c++'))
+
+    def test_placeholders_do_not_collide_with_real_names(self):
+        self.assertNotEqual(code_fingerprint('def f(o):\n    x = o\n    return x + _v0', 'python'),
+                            code_fingerprint('def f(o):\n    x = o\n    return x + x', 'python'))
+        self.assertNotEqual(code_fingerprint('int main(){int x=1;return x+_v0;}', 'c++'),
+                            code_fingerprint('int main(){int x=1;return x+x;}', 'c++'))
+
+    def test_token_languages_keep_object_keys_and_members(self):
+        def differ(a, b, language='javascript'):
+            self.assertNotEqual(code_fingerprint(a, language), code_fingerprint(b, language))
+
+        differ('let x=1; console.log(JSON.stringify({x}))', 'let y=1; console.log(JSON.stringify({y}))')
+        differ('let x=1; console.log(JSON.stringify({x: x}))', 'let y=1; console.log(JSON.stringify({x: y}))')
+        differ('let x=1; console.log(o.x + x)', 'let y=1; console.log(o.x + y)')
+        differ('let x=1; console.log(eval("x"))', 'let y=1; console.log(eval("y"))')
+        differ('int solve() { return 1; }', 'int solver() { return 1; }', 'c++')
+        self.assertEqual(code_fingerprint('let x=1; console.log([x, 2])', 'javascript'),
+                         code_fingerprint('let y=1; console.log([y, 2])', 'javascript'))
+
+
+class SubmissionReuseTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(config_class=TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        self.candidate = Candidate(name="Test Candidate", email="test@example.com")
+        self.problem = Problem(title="Greet", description="Desc", llm_prompt="Review")
+        db.session.add_all([self.candidate, self.problem])
+        db.session.commit()
+        db.session.add(TestCase(problem_id=self.problem.id, input_params=json.dumps("Hello"),
+                                expected_output=json.dumps("Hello World")))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _submit(self, code, **extra):
+        return self.client.post('/api/submissions', json={
+            'candidate_id': self.candidate.id, 'problem_id': self.problem.id,
+            'language': 'python', 'code': code, **extra
+        })
+
+    @patch('app.services.judge0_service.Judge0Service.submit_code', return_value='token')
+    @patch('app.services.judge0_service.Judge0Service.wait_for_submission', return_value=accepted('Hello World'))
+    @patch('app.api.submissions.generate_llm_review_async')
+    def test_trivial_edit_reuses_verdict_and_review(self, mock_review, mock_wait, mock_submit):
+        first = self._submit(SOLUTION).get_json()['submission']
+        self.assertIsNone(first['reused_from'])
+        self.assertEqual(mock_submit.call_count, 1)
+        mock_review.assert_called_once_with(first['id'])
+
+        original = db.session.get(Submission, first['id'])
+        original.llm_review = 'Looks good'
+        original.llm_review_status = 'done'
+        db.session.commit()
+
+        response = self._submit(RENAMED)
+        self.assertEqual(response.status_code, 201)
+        second = response.get_json()['submission']
+        self.assertEqual(mock_submit.call_count, 1)
+        self.assertEqual(mock_review.call_count, 1)
+        self.assertEqual(second['status'], 'Accepted')
+        self.assertEqual(second['reused_from'], {'verdict': first['id'], 'review': first['id']})
+        self.assertTrue(second['test_results'][0]['passed'])
+
+        detail = self.client.get(f"/api/submissions/{second['id']}").get_json()
+        self.assertEqual(detail['llm_review'], 'Looks good')
+        self.assertEqual(detail['llm_review_status'], 'done')
+        self.assertEqual(detail['code'], RENAMED)
+
+        # 复用链指向最初真正判题的提交
+        third = self._submit(SOLUTION).get_json()['submission']
+        self.assertEqual(third['reused_from'], {'verdict': first['id'], 'review': first['id']})
+
+    @patch('app.services.judge0_service.Judge0Service.submit_code', return_value='token')
+    @patch('app.services.judge0_service.Judge0Service.wait_for_submission', return_value=accepted('Hello World'))
+    @patch('app.api.submissions.generate_llm_review_async')
+    def test_pending_review_is_not_reused(self, mock_review, mock_wait, mock_submit):
+        first = self._submit(SOLUTION).get_json()['submission']
+        second = self._submit(RENAMED).get_json()['submission']
+        self.assertEqual(second['reused_from'], {'verdict': first['id'], 'review': None})
+        self.assertEqual(mock_submit.call_count, 1)
+        mock_review.assert_called_with(second['id'])
+
+    @patch('app.services.judge0_service.Judge0Service.submit_code', return_value='token')
+    @patch('app.services.judge0_service.Judge0Service.wait_for_submission', return_value=accepted('Hello World'))
+    @patch('app.api.submissions.generate_llm_review_async')
+    def test_changed_code_or_test_cases_are_judged_again(self, mock_review, mock_wait, mock_submit):
+        self._submit(SOLUTION)
+        self.assertIsNone(self._submit(CHANGED_LITERAL).get_json()['submission']['reused_from'])
+        self.assertEqual(mock_submit.call_count, 2)
+
+        db.session.add(TestCase(problem_id=self.problem.id, input_params=json.dumps("Hello"),
+                                expected_output=json.dumps("Hello World")))
+        db.session.commit()
+        self.assertIsNone(self._submit(SOLUTION).get_json()['submission']['reused_from'])
+        self.assertEqual(mock_submit.call_count, 4)
+
+        # 自定义资源限制时也重新判题
+        self.assertIsNone(self._submit(SOLUTION, cpu_time_limit=1).get_json()['submission']['reused_from'])
+
+    @patch('app.services.judge0_service.Judge0Service.submit_code', return_value=None)
+    def test_judge_failures_are_not_reused(self, mock_submit):
+        self.assertEqual(self._submit(SOLUTION).get_json()['submission']['status'], 'Execution Error')
+        self._submit(SOLUTION)
+        self.assertEqual(mock_submit.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
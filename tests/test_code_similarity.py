@@ -0,0 +1,134 @@
+import unittest
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Candidate, Problem, Submission, SubmissionLshBucket, SubmissionSignature
+from app.services.code_similarity import backfill_signatures, estimated_similarity, minhash, normalize_tokens
+from tests.helpers import CountingQueries
+
+ORIGINAL = '''
+def two_sum(nums, target):
+    seen = {}
+    for i, n in enumerate(nums):
+        if target - n in seen:
+            return [seen[target - n], i]
+        seen[n] = i
+    return []
+
+nums = list(map(int, input().split()))
+target = int(input())
+print(two_sum(nums, target))
+'''
+
+# 改了变量名、加了注释，逻辑不变
+RENAMED = '''
+# my solution
+def solve(arr, goal):
+    cache = {}  # value -> index
+    for idx, value in enumerate(arr):
+        if goal - value in cache:
+            return [cache[goal - value], idx]
+        cache[value] = idx
+    return []
+
+arr = list(map(int, input().split()))
+goal = int(input())
+print(solve(arr, goal))
+'''
+
+UNRELATED = '''
+class Node:
+    def __init__(self, val):
+        self.val = val
+        self.next = None
+
+def reverse(head):
+    prev = None
+    while head:
+        head.next, prev, head = prev, head, head.next
+    return prev
+'''
+
+
+class CodeSimilarityTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(config_class=TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        self.candidates = [Candidate(name=f"Candidate {i}", email=f"c{i}@example.com") for i in range(3)]
+        self.problem = Problem(title="Two Sum", description="Desc", llm_prompt="Review")
+        db.session.add_all(self.candidates + [self.problem])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _submit(self, candidate, code, language='python'):
+        submission = Submission(candidate_id=candidate.id, problem_id=self.problem.id, language=language,
+                                code=code, status='Accepted', test_results=[])
+        db.session.add(submission)
+        db.session.commit()
+        return submission
+
+    def test_normalization_ignores_names_and_comments(self):
+        self.assertEqual(normalize_tokens(ORIGINAL, 'python'), normalize_tokens(RENAMED, 'python'))
+        self.assertEqual(normalize_tokens('int a = 1; // x\n/* y */', 'cpp'), ['int', 'I', '=', 'N', ';'])
+
+    def test_signature_is_stored_on_insert(self):
+        submission = self._submit(self.candidates[0], ORIGINAL)
+        self.assertIsNotNone(db.session.get(SubmissionSignature, submission.id))
+        self.assertEqual(SubmissionLshBucket.query.filter_by(submission_id=submission.id).count(), 16)
+
+    def test_similar_endpoint_finds_copies_from_other_candidates(self):
+        original = self._submit(self.candidates[0], ORIGINAL)
+        copy = self._submit(self.candidates[1], RENAMED)
+        self._submit(self.candidates[2], UNRELATED)
+        self._submit(self.candidates[0], ORIGINAL)  # 同一候选人的重复提交默认不算
+
+        with CountingQueries(db.engine) as counter:
+            response = self.client.get(f'/api/submissions/{original.id}/similar')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertTrue(data['indexed'])
+        self.assertEqual([m['submission_id'] for m in data['similar']], [copy.id])
+        self.assertEqual(data['similar'][0]['similarity'], 1.0)
+        self.assertLessEqual(counter.count, 3)
+
+        data = self.client.get(f'/api/submissions/{original.id}/similar?include_same_candidate=true').get_json()
+        self.assertEqual(len(data['similar']), 2)
+
+    def test_unrelated_code_has_low_similarity(self):
+        a, _ = minhash(ORIGINAL, 'python')
+        b, _ = minhash(UNRELATED, 'python')
+        self.assertLess(estimated_similarity(a, b), 0.3)
+
+    def test_similar_for_missing_or_unindexed_submission(self):
+        self.assertEqual(self.client.get('/api/submissions/999/similar').status_code, 404)
+        submission = self._submit(self.candidates[0], '')
+        data = self.client.get(f'/api/submissions/{submission.id}/similar').get_json()
+        self.assertFalse(data['indexed'])
+
+    def test_backfill_job_indexes_existing_submissions(self):
+        original = self._submit(self.candidates[0], ORIGINAL)
+        copy = self._submit(self.candidates[1], RENAMED)
+        db.session.execute(db.delete(SubmissionLshBucket))
+        db.session.execute(db.delete(SubmissionSignature))
+        db.session.commit()
+        self.assertFalse(self.client.get(f'/api/submissions/{original.id}/similar').get_json()['indexed'])
+
+        response = self.client.post('/api/submissions/similarity/backfill')
+        self.assertEqual(response.status_code, 202)
+        job = self.client.get(response.headers['Location']).get_json()
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertEqual(job['result'], {'indexed': 2, 'skipped': 0})
+
+        data = self.client.get(f'/api/submissions/{original.id}/similar').get_json()
+        self.assertEqual([m['submission_id'] for m in data['similar']], [copy.id])
+        self.assertEqual(backfill_signatures(), {'indexed': 0, 'skipped': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
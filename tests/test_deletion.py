@@ -0,0 +1,128 @@
+import unittest
+from datetime import datetime, UTC
+
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import (Blob, Candidate, CandidateProblemTab, CandidateSessionReview, LatestSubmission, Problem,
+                        Submission, SubmissionSignature, SubmissionTestResult, TestCase)
+from app.services.deletion import purge_candidate, purge_soft_deleted
+from tests.helpers import judge_result
+
+
+class DeletionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(config_class=TestingConfig)
+        self.app.config['DELETION_BATCH_SIZE'] = 10
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.alice = Candidate(name='Alice', email='alice@example.com')
+        self.bob = Candidate(name='Bob', email='bob@example.com')
+        self.problem = Problem(title='Two Sum', description='Find two numbers', llm_prompt='Review')
+        self.other = Problem(title='Reverse List', description='Reverse it', llm_prompt='Review')
+        db.session.add_all([self.alice, self.bob, self.problem, self.other])
+        db.session.commit()
+        self.test_case = TestCase(problem_id=self.problem.id, input_params='1', expected_output='1')
+        db.session.add(self.test_case)
+        db.session.add_all([CandidateProblemTab(candidate_id=self.alice.id, problem_id=self.problem.id, tab_order=0),
+                            CandidateProblemTab(candidate_id=self.bob.id, problem_id=self.other.id, tab_order=0)])
+        db.session.commit()
+        for i in range(25):
+            for candidate in (self.alice, self.bob):
+                db.session.add(Submission(candidate_id=candidate.id, problem_id=self.problem.id, language='python',
+                                          code=f'print({i})\nx = {i} + 1', status='Accepted',
+                                          test_results=[judge_result(self.test_case.id, True)]))
+        db.session.add(Submission(candidate_id=self.bob.id, problem_id=self.other.id, language='python',
+                                  code='print(1)', status='Accepted', test_results=[]))
+        db.session.commit()
+        self.alice_id, self.bob_id = self.alice.id, self.bob.id
+        self.problem_id, self.other_id = self.problem.id, self.other.id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _count(self, model, *conditions):
+        return db.session.scalar(db.select(db.func.count()).select_from(model).where(*conditions))
+
+    def test_delete_problem_purges_dependents_in_batches(self):
+        response = self.client.delete(f'/api/problems/{self.problem_id}')
+        self.assertEqual(response.status_code, 200)
+        job = self.client.get(f"/api/jobs/{response.get_json()['job']['id']}").get_json()
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertEqual(job['result'], {'problem_id': self.problem_id, 'deleted_submissions': 50, 'purged': True})
+        self.assertEqual(job['progress']['deleted_submissions'], 50)
+
+        self.assertEqual(self._count(Problem, Problem.id == self.problem_id), 0)
+        self.assertEqual(self._count(Submission, Submission.problem_id == self.problem_id), 0)
+        self.assertEqual(self._count(TestCase), 0)
+        self.assertEqual(self._count(SubmissionTestResult), 0)
+        self.assertEqual(self._count(LatestSubmission, LatestSubmission.problem_id == self.problem_id), 0)
+        self.assertEqual(self._count(CandidateProblemTab, CandidateProblemTab.problem_id == self.problem_id), 0)
+        # 其他题目的数据不受影响
+        self.assertEqual(self._count(Submission, Submission.problem_id == self.other_id), 1)
+        self.assertEqual(self._count(SubmissionSignature), 1)
+        self.assertEqual(self.client.get(f'/api/problems/{self.problem_id}').status_code, 404)
+
+    def test_delete_candidate_keeps_other_candidates(self):
+        db.session.add_all([CandidateSessionReview(candidate_id=self.alice_id, review='Alice summary'),
+                            CandidateSessionReview(candidate_id=self.bob_id, review='Bob summary')])
+        db.session.commit()
+        response = self.client.delete(f'/api/candidates/{self.alice_id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['job']['result']['deleted_submissions'], 25)
+        self.assertEqual(self._count(Candidate), 1)
+        self.assertEqual(self._count(Submission, Submission.candidate_id == self.bob_id), 26)
+        self.assertEqual(self._count(Submission, Submission.candidate_id == self.alice_id), 0)
+        self.assertEqual(self._count(LatestSubmission), 2)
+        self.assertEqual(self._count(CandidateSessionReview, CandidateSessionReview.candidate_id == self.alice_id), 0)
+        self.assertEqual(self._count(CandidateSessionReview, CandidateSessionReview.candidate_id == self.bob_id), 1)
+        self.assertEqual(self.client.delete(f'/api/candidates/{self.alice_id}').status_code, 404)
+
+    def test_purge_reclaims_unreferenced_blobs(self):
+        db.session.add(Submission(candidate_id=self.alice_id, problem_id=self.problem_id, language='python',
+                                  code='print("only alice")',
+                                  test_results=[judge_result(self.test_case.id, False, output='a' * 5000)]))
+        db.session.commit()
+        blobs = self._count(Blob)
+        self.client.delete(f'/api/candidates/{self.alice_id}')
+        # 只有 Alice 独有的源码和完整输出被回收，与 Bob 相同的代码仍然保留
+        self.assertEqual(self._count(Blob), blobs - 2)
+        codes = [sub.code for sub in Submission.query.filter_by(candidate_id=self.bob_id)]
+        self.assertIn('print(0)\nx = 0 + 1', codes)
+
+    def test_soft_deleted_rows_are_hidden_until_purged(self):
+        db.session.get(Problem, self.problem_id).deleted_at = datetime.now(UTC)
+        db.session.get(Candidate, self.alice_id).deleted_at = datetime.now(UTC)
+        db.session.commit()
+        db.session.expunge_all()
+
+        self.assertEqual(self.client.get(f'/api/problems/{self.problem_id}').status_code, 404)
+        self.assertEqual([p['id'] for p in self.client.get('/api/problems').get_json()['problems']], [self.other_id])
+        self.assertEqual(self.client.get('/api/problems/search?q=Two').get_json()['problems'], [])
+        self.assertEqual(self.client.get(f'/api/candidates/{self.alice_id}').status_code, 404)
+        names = [c['name'] for c in self.client.get('/api/candidates').get_json()['candidates']]
+        self.assertEqual(names, ['Bob'])
+        self.assertEqual(self.client.get(f'/api/candidates/{self.alice_id}/workspace').status_code, 404)
+
+        # 名称和邮箱在清理完之前仍被占用
+        response = self.client.post('/api/candidates', json={'name': 'Alice', 'email': 'a2@example.com', 'password': 'x'})
+        self.assertEqual(response.status_code, 409)
+        response = self.client.post('/api/problems', json={'title': 'Two Sum', 'description': 'd', 'llm_prompt': 'p'})
+        self.assertEqual(response.status_code, 400)
+
+        self.assertEqual(purge_soft_deleted(), {'candidates': 1, 'problems': 1})
+        self.assertEqual(self._count(Submission), 1)
+        self.assertEqual(self.client.post('/api/candidates', json={
+            'name': 'Alice', 'email': 'alice@example.com', 'password': 'x'}).status_code, 201)
+
+    def test_purge_ignores_rows_that_are_not_soft_deleted(self):
+        self.assertFalse(purge_candidate(self.alice_id)['purged'])
+        self.assertEqual(self._count(Submission, Submission.candidate_id == self.alice_id), 25)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Problem, Setting
+from app.services.llm_service import LLMService, LLMAPIError
+from benchmarks.fake_llm_server import FakeLLMServer, FakeLLMConfig
+from benchmarks.review_benchmark import run_benchmark
+
+
+class FakeLLMServerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeLLMServer(config=FakeLLMConfig(tokens_per_second=5000, ttft=0, response_tokens=60)).start()
+        server_url = self.server.url
+
+        class FakeServerConfig(TestingConfig):
+            DEEPSEEK_API_URL = server_url
+            LLM_RETRY_BACKOFF = 0
+
+        self.app = create_app(config_class=FakeServerConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.problem = Problem(title="Problem", description="Desc", llm_prompt="Review this.")
+        db.session.add_all([self.problem, Setting(key='deepseek_api_key', value='test_key')])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        self.server.stop()
+
+    def test_streaming_review(self):
+        progress = []
+        review = LLMService().generate_review('print(1)', self.problem.id, 'python', stream=True, on_progress=progress.append)
+        self.assertIn('Score: 85/100', review)
+        self.assertTrue(progress)
+        self.assertEqual(self.server.stats.to_dict()['tokens_sent'], 60)
+
+    def test_non_streaming_review(self):
+        review = LLMService().generate_review('print(1)', self.problem.id, 'python')
+        self.assertTrue(review.startswith('## Review'))
+
+    def test_rate_limit_burst_is_retried(self):
+        self.server.config.update({'burst_429_every': 10, 'burst_429_length': 2, 'retry_after': 0})
+        review = LLMService().generate_review('print(1)', self.problem.id, 'python', stream=True)
+        self.assertIn('Score', review)
+        stats = self.server.stats.to_dict()
+        self.assertEqual(stats['rate_limited'], 2)
+        self.assertEqual(stats['requests'], 3)
+
+    def test_injected_errors_surface_after_retries(self):
+        self.app.config['LLM_MAX_RETRIES'] = 1
+        self.server.config.update({'error_rate': 1.0})
+        with self.assertRaises(LLMAPIError):
+            LLMService().generate_review('print(1)', self.problem.id, 'python')
+        self.assertEqual(self.server.stats.to_dict()['errors'], 2)
+
+
+class ReviewBenchmarkTestCase(unittest.TestCase):
+    def test_benchmark_reports_throughput_and_latency(self):
+        result = run_benchmark(reviews=4, concurrency=2, code_lines=2,
+                               server_config=FakeLLMConfig(tokens_per_second=5000, ttft=0, response_tokens=40,
+                                                           burst_429_every=3, burst_429_length=1, retry_after=0))
+        self.assertEqual(result['statuses'], {'done': 4})
+        self.assertGreater(result['throughput_reviews_per_second'], 0)
+        self.assertGreater(result['server']['rate_limited'], 0)
+        self.assertIn('p95', result['review_latency_seconds'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+
+from flask import g, jsonify
+from flask_login import current_user, login_user
+
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Candidate
+from app.services.identity_cache import SESSION_KEY
+from tests.helpers import CountingQueries
+
+
+class IdentityCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(config_class=TestingConfig)
+
+        # 仓库里没有登录页面，测试里注册两个最小的路由
+        def login(candidate_id):
+            login_user(db.session.get(Candidate, candidate_id))
+            return jsonify({'ok': True})
+
+        def whoami():
+            if not current_user.is_authenticated:
+                return jsonify({'id': None}), 401
+            return jsonify({'id': current_user.id, 'name': current_user.name, 'email': current_user.email})
+
+        self.app.add_url_rule('/test-login/<int:candidate_id>', 'test_login', login, methods=['POST'])
+        self.app.add_url_rule('/test-whoami', 'test_whoami', whoami)
+
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        self.candidate = Candidate(name='Alice', email='alice@example.com')
+        self.candidate.set_password('pw')
+        db.session.add(self.candidate)
+        db.session.commit()
+        self.candidate_id = self.candidate.id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _whoami(self):
+        # 请求与测试共用应用上下文：清空会话和 Flask-Login 记在 g 上的用户，避免直接命中
+        db.session.remove()
+        g.pop('_login_user', None)
+        with CountingQueries(db.engine) as counter:
+            response = self.client.get('/test-whoami')
+        return response, counter.count
+
+    def test_logged_in_requests_skip_the_database(self):
+        self.client.post(f'/test-login/{self.candidate_id}')
+        response, queries = self._whoami()
+        self.assertEqual(response.get_json()['name'], 'Alice')
+        self.assertEqual(queries, 0)
+
+    def test_process_cache_is_used_when_session_snapshot_is_missing(self):
+        self.client.post(f'/test-login/{self.candidate_id}')
+        with self.client.session_transaction() as sess:
+            del sess[SESSION_KEY]
+        response, queries = self._whoami()
+        # 登录只写入 session 快照，进程缓存第一次要查询数据库
+        self.assertEqual(response.get_json()['id'], self.candidate_id)
+        self.assertEqual(queries, 1)
+
+        with self.client.session_transaction() as sess:
+            del sess[SESSION_KEY]
+        response, queries = self._whoami()
+        self.assertEqual(response.get_json()['email'], 'alice@example.com')
+        self.assertEqual(queries, 0)
+
+    def test_update_and_delete_invalidate_the_cache(self):
+        self.client.post(f'/test-login/{self.candidate_id}')
+        self.client.put(f'/api/candidates/{self.candidate_id}', json={'name': 'Alice B'})
+        response, queries = self._whoami()
+        self.assertEqual(response.get_json()['name'], 'Alice B')
+        self.assertEqual(queries, 1)
+
+        self.client.delete(f'/api/candidates/{self.candidate_id}')
+        response, _ = self._whoami()
+        self.assertEqual(response.status_code, 401)
+
+    def test_session_snapshot_expires_after_ttl(self):
+        self.client.post(f'/test-login/{self.candidate_id}')
+        with self.client.session_transaction() as sess:
+            sess[SESSION_KEY] = {**sess[SESSION_KEY], 'at': sess[SESSION_KEY]['at'] - 3600}
+        response, queries = self._whoami()
+        self.assertEqual(response.get_json()['name'], 'Alice')
+        self.assertEqual(queries, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import json
+import unittest
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Blob, Candidate, Problem, Submission, SubmissionTestResult, TestCase
+from app.services.blob_store import blob_store
+from app.services.judge_results import migrate_legacy_test_results, slowest_test_runs, pass_rates_by_test_case
+from tests.helpers import CountingQueries, judge_result
+
+
+class JudgeResultsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(config_class=TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.candidate = Candidate(name="Test Candidate", email="test@example.com")
+        self.problem = Problem(title="Test Problem", description="Desc", llm_prompt="Review")
+        db.session.add_all([self.candidate, self.problem])
+        db.session.commit()
+        self.tc1 = TestCase(problem_id=self.problem.id, input_params='1', expected_output='1')
+        self.tc2 = TestCase(problem_id=self.problem.id, input_params='2', expected_output='2')
+        db.session.add_all([self.tc1, self.tc2])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _submit(self, results):
+        submission = Submission(candidate_id=self.candidate.id, problem_id=self.problem.id,
+                                language='python', code='print(1)', test_results=results)
+        db.session.add(submission)
+        db.session.commit()
+        return submission
+
+    def test_results_are_stored_as_typed_rows(self):
+        submission = self._submit([judge_result(self.tc1.id, True, time='0.25'), judge_result(self.tc2.id, False)])
+        rows = SubmissionTestResult.query.filter_by(submission_id=submission.id).order_by(SubmissionTestResult.position).all()
+        self.assertEqual([(r.test_case_id, r.passed, r.status_id, r.time, r.memory) for r in rows],
+                         [(self.tc1.id, True, 3, 0.25, 1024), (self.tc2.id, False, 3, 0.01, 1024)])
+        self.assertIsNone(submission.legacy_test_results)
+
+        db.session.expire_all()
+        results = json.loads(db.session.get(Submission, submission.id).test_results)
+        self.assertEqual(results[0]['status_description'], 'Accepted')
+        self.assertFalse(results[1]['passed'])
+
+    def test_long_output_is_truncated_into_a_blob(self):
+        long_output = 'x' * 5000
+        submission = self._submit([judge_result(self.tc1.id, False, output=long_output)])
+        row = submission.results[0]
+        self.assertEqual(len(row.output), SubmissionTestResult.OUTPUT_PREVIEW_CHARS)
+        self.assertIsNotNone(db.session.get(Blob, row.output_hash))
+        self.assertTrue(row.to_result(full=False)['output_truncated'])
+
+        db.session.expire_all()
+        self.assertEqual(json.loads(db.session.get(Submission, submission.id).test_results)[0]['output'], long_output)
+
+    def test_status_and_description_are_kept_apart(self):
+        failed = {'test_case_id': self.tc1.id, 'passed': False, 'status': 'Execution Error',
+                  'status_description': 'Failed to submit to Judge0', 'output': None, 'error': None,
+                  'compile_output': None, 'time': None, 'memory': None}
+        submission = self._submit([failed, judge_result(self.tc2.id, True)])
+        db.session.expire_all()
+        results = json.loads(db.session.get(Submission, submission.id).test_results)
+        self.assertEqual((results[0]['status'], results[0]['status_description']),
+                         ('Execution Error', 'Failed to submit to Judge0'))
+        self.assertEqual((results[1]['status'], results[1]['status_description']), ('Accepted', 'Accepted'))
+
+    def test_full_outputs_are_loaded_in_one_query(self):
+        submission = self._submit([judge_result(tc.id, False, output=f'{tc.id}' * 3000) for tc in (self.tc1, self.tc2)]
+                                  + [judge_result(self.tc1.id, False, output='z' * 3000)])
+        blob_store._cache.clear()
+        db.session.expire_all()
+        submission = db.session.get(Submission, submission.id)
+        self.assertEqual(len(submission.results), 3)
+        with CountingQueries(db.engine) as counter:
+            results = json.loads(submission.test_results)
+        self.assertEqual(counter.count, 1)
+        self.assertEqual(results[2]['output'], 'z' * 3000)
+
+    def test_aggregates_run_in_sql(self):
+        self._submit([judge_result(self.tc1.id, True, time='0.5'), judge_result(self.tc2.id, False, time='1.5')])
+        self._submit([judge_result(self.tc1.id, True, time='0.1'), judge_result(self.tc2.id, True, time='0.2')])
+
+        rates = {r['test_case_id']: r for r in pass_rates_by_test_case(self.problem.id)}
+        self.assertEqual((rates[self.tc1.id]['runs'], rates[self.tc1.id]['pass_rate']), (2, 1.0))
+        self.assertEqual(rates[self.tc2.id]['pass_rate'], 0.5)
+
+        slowest = slowest_test_runs(self.problem.id, limit=2)
+        self.assertEqual([r['time'] for r in slowest], [1.5, 0.5])
+
+    def test_test_case_stats_endpoint(self):
+        client = self.app.test_client()
+        first = self._submit([judge_result(self.tc1.id, True, time='0.5'), judge_result(self.tc2.id, False, time='1.5')])
+        self._submit([judge_result(self.tc1.id, False, time='0.1')])
+
+        data = client.get(f'/api/problems/{self.problem.id}/test-case-stats', query_string={'limit': 1}).get_json()
+        self.assertEqual([(r['test_case_id'], r['runs'], r['pass_rate']) for r in data['pass_rates']],
+                         [(self.tc1.id, 2, 0.5), (self.tc2.id, 1, 0.0)])
+        self.assertEqual(data['slowest_runs'], [{'submission_id': first.id, 'test_case_id': self.tc2.id,
+                                                 'time': 1.5, 'memory': 1024, 'status': 'Wrong Answer'}])
+
+        self.assertEqual(client.get('/api/problems/999/test-case-stats').status_code, 404)
+        response = client.get(f'/api/problems/{self.problem.id}/test-case-stats', query_string={'limit': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_legacy_json_is_readable_and_migrated(self):
+        legacy = json.dumps([judge_result(self.tc1.id, True), judge_result(self.tc2.id, False)])
+        db.session.execute(db.insert(Submission), [{'candidate_id': self.candidate.id, 'problem_id': self.problem.id,
+                                                   'language': 'python', 'legacy_test_results': legacy}])
+        db.session.commit()
+        self.assertEqual(Submission.query.first().test_results, legacy)
+
+        result = self.app.test_cli_runner().invoke(args=['submissions', 'migrate-test-results'])
+        self.assertIn('Migrated test results of 1 submission(s).', result.output)
+        self.assertEqual(SubmissionTestResult.query.count(), 2)
+        self.assertEqual(pass_rates_by_test_case(self.problem.id)[0]['passed'], 1)
+        self.assertIsNone(Submission.query.first().legacy_test_results)
+
+
+if __name__ == '__main__':
+    unittest.main()
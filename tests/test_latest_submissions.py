@@ -0,0 +1,106 @@
+import unittest
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Candidate, LatestSubmission, Problem, Submission, TestCase
+from app.services.latest_submissions import rebuild_latest_submissions
+from tests.helpers import CountingQueries, judge_result
+
+
+class LatestSubmissionsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(config_class=TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        self.candidate = Candidate(name="Test Candidate", email="test@example.com")
+        self.problem = Problem(title="Test Problem", description="Desc", llm_prompt="Review")
+        db.session.add_all([self.candidate, self.problem])
+        db.session.commit()
+        self.tc1 = TestCase(problem_id=self.problem.id, input_params='1', expected_output='1')
+        self.tc2 = TestCase(problem_id=self.problem.id, input_params='2', expected_output='2')
+        db.session.add_all([self.tc1, self.tc2])
+        db.session.commit()
+        self.url = f'/api/submissions/candidate/{self.candidate.id}/problem/{self.problem.id}'
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _submit(self, status, passed):
+        results = [judge_result(self.tc1.id, passed >= 1), judge_result(self.tc2.id, passed >= 2)]
+        submission = Submission(candidate_id=self.candidate.id, problem_id=self.problem.id, language='python',
+                                code=f'print({len(self.submitted)})', status=status, test_results=results)
+        db.session.add(submission)
+        db.session.commit()
+        self.submitted.append(submission.id)
+        return submission
+
+    def _seed(self):
+        self.submitted = []
+        self._submit('Wrong Answer', 1)
+        self._submit('Accepted', 2)
+        self._submit('Wrong Answer', 0)
+
+    def _pointer(self):
+        return db.session.get(LatestSubmission, (self.candidate.id, self.problem.id))
+
+    def test_pointer_is_updated_with_each_submission(self):
+        self._seed()
+        pointer = self._pointer()
+        self.assertEqual(pointer.attempts, 3)
+        self.assertEqual(pointer.latest_submission_id, self.submitted[2])
+        self.assertEqual(pointer.best_submission_id, self.submitted[1])
+        self.assertEqual(pointer.best_status, 'Accepted')
+
+    def test_best_prefers_more_passed_cases_and_keeps_the_earlier_tie(self):
+        self.submitted = []
+        self._submit('Wrong Answer', 0)
+        self._submit('Wrong Answer', 1)
+        self._submit('Runtime Error', 1)
+        self.assertEqual(self._pointer().best_submission_id, self.submitted[1])
+
+    def test_latest_and_best_endpoints(self):
+        self._seed()
+        with CountingQueries(db.engine) as counter:
+            latest = self.client.get(f'{self.url}/latest')
+        self.assertEqual(latest.status_code, 200)
+        self.assertEqual(latest.get_json()['submission']['id'], self.submitted[2])
+        self.assertEqual(latest.get_json()['attempts'], 3)
+        # 指针、提交、源码 blob、测试结果，与历史提交数无关
+        self.assertLessEqual(counter.count, 4)
+
+        best = self.client.get(f'{self.url}/best').get_json()
+        self.assertEqual(best['submission']['id'], self.submitted[1])
+        self.assertEqual(best['best_status'], 'Accepted')
+
+    def test_endpoint_without_submissions(self):
+        response = self.client.get(f'{self.url}/latest')
+        self.assertEqual(response.status_code, 404)
+
+    def test_pointer_to_deleted_submission_is_recomputed_without_writing(self):
+        self._seed()
+        db.session.execute(db.delete(Submission).where(Submission.id == self.submitted[2]))
+        db.session.commit()
+        data = self.client.get(f'{self.url}/latest').get_json()
+        self.assertEqual(data['submission']['id'], self.submitted[1])
+        self.assertEqual(data['attempts'], 2)
+        # GET 只读：持久化的指针保持原样，等待 rebuild-latest 修复
+        db.session.expire_all()
+        self.assertEqual(self._pointer().latest_submission_id, self.submitted[2])
+        self.assertEqual(self._pointer().attempts, 3)
+
+    def test_rebuild_matches_incremental_pointer(self):
+        self._seed()
+        before = {name: getattr(self._pointer(), name) for name in
+                  ('latest_submission_id', 'best_submission_id', 'best_status', 'best_passed', 'attempts')}
+        db.session.execute(db.delete(LatestSubmission))
+        db.session.commit()
+        self.assertEqual(rebuild_latest_submissions(batch_size=2), 3)
+        after = {name: getattr(self._pointer(), name) for name in before}
+        self.assertEqual(after, before)
+
+
+if __name__ == '__main__':
+    unittest.main()
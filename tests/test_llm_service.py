@@ -0,0 +1,168 @@
+import unittest
+import json
+from datetime import datetime, timedelta, UTC
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Candidate, Problem, Submission, Setting
+from app.services.llm_service import (
+    generate_llm_review_async, recover_interrupted_reviews, review_is_complete, ReviewCheckpointer,
+    CONFIG_ERROR_PREFIX, REVIEW_STATUS_DONE, REVIEW_STATUS_FAILED, REVIEW_STATUS_STREAMING, REVIEW_STATUS_PENDING
+)
+from unittest.mock import patch, MagicMock
+
+
+def stream_response(chunks, fail_after=None):
+    """构造一个按 SSE 格式逐行返回内容的假响应"""
+    def iter_lines():
+        for i, chunk in enumerate(chunks):
+            if fail_after is not None and i == fail_after:
+                raise ConnectionError('worker lost connection')
+            yield f"data: {json.dumps({'choices': [{'delta': {'content': chunk}}]})}".encode('utf-8')
+        yield b'data: [DONE]'
+    response = MagicMock()
+    response.iter_lines = iter_lines
+    response.raise_for_status.return_value = None
+    return response
+
+
+class LLMReviewCheckpointTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(config_class=TestingConfig)
+        self.app.config['LLM_REVIEW_CHECKPOINT_CHARS'] = 100
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        candidate = Candidate(name="Candidate", email="c@example.com")
+        candidate.set_password("pw")
+        problem = Problem(title="Problem", description="Desc", llm_prompt="Review this.")
+        db.session.add_all([candidate, problem, Setting(key='deepseek_api_key', value='test_key')])
+        db.session.commit()
+        self.submission = Submission(candidate_id=candidate.id, problem_id=problem.id, language='python',
+                                     code='print(1)', status='Accepted', llm_review_status=REVIEW_STATUS_PENDING)
+        db.session.add(self.submission)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    @patch('app.services.llm_service.requests.post')
+    def test_streamed_review_is_checkpointed_and_completed(self, mock_post):
+        chunks = ['x' * 60 for _ in range(10)]
+        mock_post.return_value = stream_response(chunks)
+        checkpointers = []
+
+        class RecordingCheckpointer(ReviewCheckpointer):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                checkpointers.append(self)
+
+        with patch('app.services.llm_service.ReviewCheckpointer', RecordingCheckpointer):
+            generate_llm_review_async(self.submission.id)
+
+        submission = db.session.get(Submission, self.submission.id)
+        self.assertEqual(submission.llm_review_status, REVIEW_STATUS_DONE)
+        self.assertEqual(submission.llm_review, 'x' * 600)
+        self.assertEqual(submission.llm_review_attempts, 1)
+        self.assertGreaterEqual(checkpointers[0].checkpoints, 2)
+        self.assertTrue(mock_post.call_args.kwargs['stream'])
+
+    @patch('app.services.llm_service.requests.post')
+    def test_completed_review_logs_prompt_budget(self, mock_post):
+        mock_post.return_value = stream_response(['looks good'])
+        with self.assertLogs(self.app.logger, 'INFO') as logs:
+            generate_llm_review_async(self.submission.id)
+        budget_lines = [line for line in logs.output if 'Prompt budget for submission' in line]
+        self.assertEqual(len(budget_lines), 1)
+        self.assertIn("'prompts_checked'", budget_lines[0])
+
+    @patch('app.services.llm_service.requests.post')
+    def test_interrupted_stream_keeps_partial_content_and_fails(self, mock_post):
+        mock_post.return_value = stream_response(['y' * 120 for _ in range(5)], fail_after=3)
+        generate_llm_review_async(self.submission.id)
+
+        submission = db.session.get(Submission, self.submission.id)
+        self.assertEqual(submission.llm_review_status, REVIEW_STATUS_FAILED)
+        self.assertIn('worker lost connection', submission.llm_review_error)
+        self.assertTrue(submission.llm_review.startswith('y' * 120))
+        self.assertFalse(review_is_complete(submission))
+
+    @patch('app.services.llm_service.requests.post')
+    def test_recover_restarts_stale_streaming_review(self, mock_post):
+        self.submission.llm_review_status = REVIEW_STATUS_STREAMING
+        self.submission.llm_review = 'partial'
+        self.submission.llm_review_updated_at = datetime.now(UTC) - timedelta(minutes=10)
+        db.session.commit()
+        mock_post.return_value = stream_response(['a complete review of the code'])
+
+        restarted = recover_interrupted_reviews(stale_after=60)
+        self.assertEqual(restarted, [self.submission.id])
+        submission = db.session.get(Submission, self.submission.id)
+        self.assertEqual(submission.llm_review_status, REVIEW_STATUS_DONE)
+        self.assertEqual(submission.llm_review, 'a complete review of the code')
+
+    @patch('app.services.llm_service.requests.post')
+    def test_recover_skips_fresh_and_exhausted_reviews(self, mock_post):
+        self.submission.llm_review_status = REVIEW_STATUS_STREAMING
+        self.submission.llm_review_updated_at = datetime.now(UTC)
+        failed = Submission(candidate_id=self.submission.candidate_id, problem_id=self.submission.problem_id,
+                            language='python', code='print(2)', llm_review_status=REVIEW_STATUS_FAILED,
+                            llm_review_attempts=3, llm_review_updated_at=datetime.now(UTC) - timedelta(hours=1))
+        db.session.add(failed)
+        db.session.commit()
+
+        self.assertEqual(recover_interrupted_reviews(stale_after=60, max_attempts=3), [])
+        mock_post.assert_not_called()
+
+    @patch('app.services.llm_service.requests.post')
+    def test_review_in_progress_is_not_started_again(self, mock_post):
+        self.submission.llm_review_status = REVIEW_STATUS_STREAMING
+        self.submission.llm_review = 'partial'
+        self.submission.llm_review_attempts = 1
+        db.session.commit()
+
+        generate_llm_review_async(self.submission.id)
+        mock_post.assert_not_called()
+        submission = db.session.get(Submission, self.submission.id)
+        self.assertEqual(submission.llm_review, 'partial')
+        self.assertEqual(submission.llm_review_attempts, 1)
+
+    @patch('app.services.llm_service.requests.post')
+    def test_config_errors_are_not_retried(self, mock_post):
+        db.session.delete(db.session.get(Setting, 'deepseek_api_key'))
+        db.session.commit()
+        generate_llm_review_async(self.submission.id)
+
+        submission = db.session.get(Submission, self.submission.id)
+        self.assertEqual(submission.llm_review_status, REVIEW_STATUS_FAILED)
+        self.assertTrue(submission.llm_review_error.startswith(CONFIG_ERROR_PREFIX))
+        submission.llm_review_updated_at = datetime.now(UTC) - timedelta(hours=1)
+        db.session.commit()
+        self.assertEqual(recover_interrupted_reviews(stale_after=60), [])
+        mock_post.assert_not_called()
+
+    @patch('app.services.llm_service.requests.post')
+    def test_legacy_error_rows_are_recovered(self, mock_post):
+        self.submission.llm_review_status = None
+        self.submission.llm_review = 'Error generating review: timeout'
+        db.session.commit()
+        mock_post.return_value = stream_response(['a complete review of the code'])
+
+        self.assertEqual(recover_interrupted_reviews(stale_after=60), [self.submission.id])
+        submission = db.session.get(Submission, self.submission.id)
+        self.assertEqual(submission.llm_review_status, REVIEW_STATUS_DONE)
+        self.assertEqual(submission.llm_review, 'a complete review of the code')
+        self.assertEqual(recover_interrupted_reviews(stale_after=60), [])
+
+    def test_legacy_error_text_does_not_count_as_review(self):
+        self.submission.llm_review_status = None
+        self.submission.llm_review = 'Unexpected error: boom'
+        self.assertFalse(review_is_complete(self.submission))
+        self.submission.llm_review = 'Looks good.'
+        self.assertTrue(review_is_complete(self.submission))
+
+
+if __name__ == '__main__':
+    unittest.main()
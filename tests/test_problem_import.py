@@ -0,0 +1,96 @@
+import io
+import json
+import threading
+import time
+import unittest
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Problem, TestCase
+from app.services.jobs import JobError, jobs
+from app.services.problem_import import ImportFormatError, ProblemImporter, iter_json_array
+from tests.helpers import CountingQueries
+
+
+class IterJsonArrayTestCase(unittest.TestCase):
+    def parse(self, text, chunk_size=3):
+        return list(iter_json_array(io.BytesIO(text.encode('utf-8')), chunk_size=chunk_size))
+
+    def test_elements_across_chunk_boundaries(self):
+        values = [{"title": "题目 α", "n": 12345}, 67890, "s", [1, {"a": None}], True]
+        for chunk_size in (1, 2, 5, 1024):
+            self.assertEqual(self.parse(json.dumps(values, ensure_ascii=False), chunk_size), values)
+
+    def test_whitespace_and_empty_array(self):
+        self.assertEqual(self.parse('\ufeff \n[ ]\n'), [])
+        self.assertEqual(self.parse(' [ 1 ,\n 2 ] '), [1, 2])
+
+    def test_invalid_input(self):
+        for text in ('{"title": "x"}', '[1, 2', '[1 2]', '[1] [2]', '[{"a": }]', ''):
+            with self.assertRaises(ImportFormatError, msg=text):
+                self.parse(text)
+
+    def test_reports_bytes_read(self):
+        read = []
+        text = json.dumps([{"title": str(i)} for i in range(10)])
+        list(iter_json_array(io.BytesIO(text.encode('utf-8')), chunk_size=16, on_read=read.append))
+        self.assertEqual(sum(read), len(text))
+
+
+class ProblemImporterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(config_class=TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_bulk_statements(self):
+        bundle = [{"title": f"P{i}", "test_cases": [{"input": [i, n], "expected_output": n} for n in range(5)]}
+                  for i in range(10)]
+        stream = io.BytesIO(json.dumps(bundle).encode('utf-8'))
+        with CountingQueries(db.engine) as queries:
+            result = ProblemImporter(batch_size=4, test_case_batch_size=8).run(stream)
+        self.assertEqual(result['imported_count'], 10)
+        self.assertEqual(result['test_case_count'], 50)
+        self.assertEqual(Problem.query.count(), 10)
+        self.assertEqual(TestCase.query.count(), 50)
+        # 1 条标题查询 + 3 批题目 + 每批测试用例按 8 条分段（20/20/10 条 -> 3+3+2）
+        self.assertEqual(queries.count, 1 + 3 + 8)
+
+
+class JobRegistryTestCase(unittest.TestCase):
+    def test_job_runs_in_background_thread(self):
+        class ThreadedConfig(TestingConfig):
+            JOBS_RUN_INLINE = False
+
+        app = create_app(config_class=ThreadedConfig)
+        release = threading.Event()
+
+        def work(job, value):
+            job.update_progress(step=1)
+            release.wait(5)
+            if value < 0:
+                raise JobError('negative value')
+            return value * 2
+
+        with app.app_context():
+            job = jobs.submit('double', work, 21)
+            failing = jobs.submit('double', work, -1)
+            self.assertFalse(job.finished)
+            release.set()
+            for _ in range(100):
+                if job.finished and failing.finished:
+                    break
+                time.sleep(0.01)
+        self.assertEqual(job.to_dict()['result'], 42)
+        self.assertEqual(job.progress, {'step': 1})
+        self.assertEqual(failing.status, 'failed')
+        self.assertEqual(failing.error, 'negative value')
+
+
+if __name__ == '__main__':
+    unittest.main()
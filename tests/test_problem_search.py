@@ -0,0 +1,98 @@
+import unittest
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Problem
+from app.services.problem_search import rebuild_search_index
+
+
+class ProblemSearchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(config_class=TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        self.two_sum = Problem(title="Two Sum", description="Find two numbers that add up to a target.", llm_prompt="P")
+        self.reverse = Problem(title="Reverse List", description="Reverse a linked list. Return the new head.", llm_prompt="P")
+        self.chinese = Problem(title="最长回文子串", description="给定一个字符串，找到其中最长的回文子串。", llm_prompt="P")
+        db.session.add_all([self.two_sum, self.reverse, self.chinese])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _search(self, q, **params):
+        response = self.client.get('/api/problems/search', query_string={'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+
+    def test_title_matches_rank_first_and_snippets_are_highlighted(self):
+        self.reverse.description = 'Sum is not involved here, just reverse the list.'
+        db.session.commit()
+        data = self._search('sum')
+        self.assertEqual([p['id'] for p in data['problems']], [self.two_sum.id, self.reverse.id])
+        self.assertIn('<mark>', data['problems'][1]['snippet'])
+        self.assertEqual(set(data['problems'][0]), {'id', 'title', 'snippet'})
+
+    def test_index_follows_inserts_updates_and_deletes(self):
+        self.assertEqual(self._search('linked')['problems'][0]['id'], self.reverse.id)
+        self.reverse.description = 'Reverse an array in place.'
+        db.session.commit()
+        self.assertEqual(self._search('linked')['problems'], [])
+        self.assertEqual(self._search('array')['problems'][0]['id'], self.reverse.id)
+
+        db.session.delete(self.reverse)
+        db.session.commit()
+        self.assertEqual(self._search('array')['problems'], [])
+
+    def test_chinese_substring_and_short_terms(self):
+        self.assertEqual(self._search('回文子串')['problems'][0]['id'], self.chinese.id)
+        # 两个字的词走 LIKE 查询
+        data = self._search('回文')
+        self.assertEqual([p['id'] for p in data['problems']], [self.chinese.id])
+        self.assertIn('<mark>回文</mark>', data['problems'][0]['snippet'])
+
+    def test_snippet_is_html_escaped(self):
+        db.session.add(Problem(title="Markup", description="Parse <script>alert(1)</script> tags safely", llm_prompt="P"))
+        db.session.commit()
+        snippet = self._search('script')['problems'][0]['snippet']
+        self.assertNotIn('<script>', snippet)
+        self.assertIn('&lt;', snippet)
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(self._search('"two" OR NEAR(')['problems'], [])
+
+    def test_pagination(self):
+        for i in range(5):
+            db.session.add(Problem(title=f"Graph problem {i}", description="graph", llm_prompt="P"))
+        db.session.commit()
+        seen = []
+        cursor = None
+        while True:
+            params = {'limit': 2}
+            if cursor:
+                params['cursor'] = cursor
+            data = self._search('graph', **params)
+            seen.extend(p['id'] for p in data['problems'])
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+        self.assertEqual(self.client.get('/api/problems/search?cursor=bad').status_code, 400)
+
+    def test_empty_query_lists_problems(self):
+        data = self._search('')
+        self.assertEqual([p['id'] for p in data['problems']], [self.two_sum.id, self.reverse.id, self.chinese.id])
+
+    def test_rebuild_restores_a_missing_index(self):
+        db.session.execute(db.text('DROP TABLE problems_fts'))
+        db.session.commit()
+        rebuild_search_index()
+        self.assertEqual(self._search('target')['problems'][0]['id'], self.two_sum.id)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Candidate, Problem, ProblemStats, Submission, TestCase, TestCaseStats
+from app.services.problem_stats import bucket_for, bucket_midpoint, histogram_median, rebuild_problem_stats
+from tests.helpers import CountingQueries, judge_result
+
+
+class ProblemStatsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(config_class=TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        self.candidate = Candidate(name="Test Candidate", email="test@example.com")
+        self.problem = Problem(title="Test Problem", description="Desc", llm_prompt="Review")
+        db.session.add_all([self.candidate, self.problem])
+        db.session.commit()
+        self.tc1 = TestCase(problem_id=self.problem.id, input_params='1', expected_output='1')
+        self.tc2 = TestCase(problem_id=self.problem.id, input_params='2', expected_output='2')
+        db.session.add_all([self.tc1, self.tc2])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _submit(self, results, status):
+        submission = Submission(candidate_id=self.candidate.id, problem_id=self.problem.id,
+                                language='python', code='print(1)', status=status, test_results=results)
+        db.session.add(submission)
+        db.session.commit()
+        return submission
+
+    def _seed(self):
+        self._submit([judge_result(self.tc1.id, True, time='0.1'), judge_result(self.tc2.id, True, time='0.2')], 'Accepted')
+        self._submit([judge_result(self.tc1.id, True, time='0.5'), judge_result(self.tc2.id, False)], 'Wrong Answer')
+        self._submit([judge_result(self.tc1.id, True, time='0.4', memory=4096),
+                      judge_result(self.tc2.id, True, time='0.3')], 'Accepted')
+
+    def test_stats_are_updated_with_each_submission(self):
+        self._seed()
+        stats = db.session.get(ProblemStats, self.problem.id)
+        self.assertEqual((stats.attempts, stats.accepted), (3, 2))
+        tc2 = db.session.get(TestCaseStats, self.tc2.id)
+        self.assertEqual((tc2.runs, tc2.failures), (3, 1))
+
+        response = self.client.get(f'/api/problems/{self.problem.id}/stats')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data['attempts'], 3)
+        self.assertEqual(data['accepted'], 2)
+        self.assertAlmostEqual(data['acceptance_rate'], 2 / 3)
+        self.assertEqual(data['most_failed_test_case']['test_case_id'], self.tc2.id)
+        # 中位数取自直方图，误差在一个桶以内
+        self.assertAlmostEqual(data['median_runtime'], 0.2, delta=0.2 * 0.2)
+        self.assertEqual(data['median_memory'], round(bucket_midpoint(bucket_for(1024))))
+
+    def test_deleted_test_case_is_not_reported(self):
+        self._seed()
+        self.assertEqual(self.client.delete(f'/api/testcases/{self.tc2.id}').status_code, 200)
+        self.assertIsNone(db.session.get(TestCaseStats, self.tc2.id))
+        data = self.client.get(f'/api/problems/{self.problem.id}/stats').get_json()
+        self.assertIsNone(data['most_failed_test_case'])
+
+        # 修复之前遗留的统计行同样不会被报告
+        db.session.add(TestCaseStats(test_case_id=self.tc2.id, problem_id=self.problem.id, runs=3, failures=1))
+        db.session.commit()
+        data = self.client.get(f'/api/problems/{self.problem.id}/stats').get_json()
+        self.assertIsNone(data['most_failed_test_case'])
+
+    def test_stats_endpoint_does_not_scan_submissions(self):
+        self._seed()
+        with CountingQueries(db.engine) as counter:
+            response = self.client.get(f'/api/problems/{self.problem.id}/stats')
+        self.assertEqual(response.status_code, 200)
+        # 题目、汇总行、直方图、失败最多的测试用例各一条，与提交数无关
+        self.assertEqual(counter.count, 4)
+
+    def test_stats_for_problem_without_submissions(self):
+        data = self.client.get(f'/api/problems/{self.problem.id}/stats').get_json()
+        self.assertEqual(data['attempts'], 0)
+        self.assertIsNone(data['acceptance_rate'])
+        self.assertIsNone(data['median_runtime'])
+        self.assertIsNone(data['most_failed_test_case'])
+        self.assertEqual(self.client.get('/api/problems/999/stats').status_code, 404)
+
+    def test_rollback_discards_the_increment(self):
+        submission = Submission(candidate_id=self.candidate.id, problem_id=self.problem.id,
+                                language='python', code='print(1)', status='Accepted',
+                                test_results=[judge_result(self.tc1.id, True)])
+        db.session.add(submission)
+        db.session.flush()
+        db.session.rollback()
+        self.assertIsNone(db.session.get(ProblemStats, self.problem.id))
+
+    def test_rebuild_recomputes_from_history(self):
+        self._seed()
+        before = self.client.get(f'/api/problems/{self.problem.id}/stats').get_json()
+        db.session.execute(db.update(ProblemStats).values(attempts=100))
+        db.session.execute(db.delete(TestCaseStats))
+        db.session.commit()
+
+        self.assertEqual(rebuild_problem_stats(batch_size=2), 3)
+        after = self.client.get(f'/api/problems/{self.problem.id}/stats').get_json()
+        before.pop('updated_at')
+        after.pop('updated_at')
+        self.assertEqual(after, before)
+
+    def test_histogram_median(self):
+        self.assertIsNone(histogram_median({}))
+        buckets = {bucket_for(1): 1, bucket_for(8): 1, bucket_for(64): 1}
+        self.assertAlmostEqual(histogram_median(buckets), 8, delta=8 * 0.2)
+
+
+if __name__ == '__main__':
+    unittest.main()
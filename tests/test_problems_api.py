@@ -4,6 +4,7 @@ from app import create_app, db
 from app.config import TestingConfig as Config
 import io
 from app.models import Problem, TestCase
+from tests.helpers import CountingQueries
 
 class ProblemsAPITestCase(unittest.TestCase):
     def setUp(self):
@@ -130,47 +131,119 @@ class ProblemsAPITestCase(unittest.TestCase):
         response = self.client.delete('/api/problems/999')
         self.assertEqual(response.status_code, 404)
 
-if __name__ == '__main__':
+    def test_export_problems_success(self):
+        # Add another problem to export
+        problem2 = Problem(title="Export Problem 2", description="Desc Export 2", llm_prompt="Prompt Export 2")
+        db.session.add(problem2)
+        db.session.commit()
+
+        response = self.client.get('/api/problems/export')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content_type, 'application/json')
+        self.assertIn('attachment; filename=problems_export.json', response.headers['Content-Disposition'])
+
+        exported_data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual(len(exported_data), 2)
+        titles = [p['title'] for p in exported_data]
+        self.assertIn('Initial Problem', titles)
+        self.assertIn('Export Problem 2', titles)
+        # Check for specific fields (assuming default export includes these)
+        for p_data in exported_data:
+            self.assertIn('title', p_data)
+            self.assertIn('description', p_data)
+            self.assertIn('llm_prompt', p_data)
+            self.assertNotIn('id', p_data) # IDs should not be exported for re-import
+            self.assertNotIn('created_at', p_data)
+            self.assertNotIn('updated_at', p_data)
+
+    def test_export_problems_no_problems_to_export(self):
+        # Delete existing problems
+        Problem.query.delete()
+        db.session.commit()
+
+        response = self.client.get('/api/problems/export')
+        self.assertEqual(response.status_code, 200) # Or 204 No Content, depending on API design
+        exported_data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual(len(exported_data), 0)
+
+    def test_export_streams_in_batches(self):
+        from app.api import import_export
+        for i in range(5):
+            problem = Problem(title=f"Batch Problem {i}", description="Desc", llm_prompt="Prompt")
+            problem.test_cases.append(TestCase(input_params=json.dumps([i]), expected_output=json.dumps(i)))
+            db.session.add(problem)
+        db.session.commit()
+
+        original_batch_size = import_export.EXPORT_BATCH_SIZE
+        import_export.EXPORT_BATCH_SIZE = 2
+        try:
+            with CountingQueries(db.engine) as queries:
+                response = self.client.get('/api/problems/export')
+                self.assertTrue(response.is_streamed)
+                exported_data = json.loads(response.get_data(as_text=True))
+        finally:
+            import_export.EXPORT_BATCH_SIZE = original_batch_size
+
+        self.assertEqual(len(exported_data), 6)
+        # 6 道题分 3 批，每批一条题目查询加一条测试用例查询，再加上结束时的空批
+        self.assertEqual(queries.count, 7)
+        batch_problem = next(p for p in exported_data if p['title'] == 'Batch Problem 3')
+        self.assertEqual(batch_problem['test_cases'], [{'input': [3], 'expected_output': 3}])
+
+    def _import(self, problems_data, filename='test_problems.json', **form):
+        raw = problems_data if isinstance(problems_data, str) else json.dumps(problems_data)
+        data = {'file': (io.BytesIO(raw.encode('utf-8')), filename), **form}
+        return self.client.post('/api/problems/import', content_type='multipart/form-data', data=data)
+
+    def _import_job(self, problems_data, **form):
+        response = self._import(problems_data, **form)
+        self.assertEqual(response.status_code, 202)
+        job_url = response.headers['Location']
+        job = self.client.get(job_url).get_json()
+        self.assertEqual(job['id'], response.get_json()['job']['id'])
+        return job
 
     def test_import_problems_success(self):
-        # Create a sample JSON file content for import
         problems_data = [
-            {"title": "Imported Problem 1", "description": "Desc Import 1", "llm_prompt": "Prompt Import 1"},
+            {"title": "Imported Problem 1", "description": "Desc Import 1", "llm_prompt": "Prompt Import 1",
+             "test_cases": [{"input": [1, 2], "expected_output": 3}, {"input": "x"}]},
             {"title": "Imported Problem 2", "description": "Desc Import 2", "llm_prompt": "Prompt Import 2"}
         ]
-        file_content = json.dumps(problems_data)
-        data = {'file': (io.BytesIO(file_content.encode('utf-8')), 'test_problems.json')}
+        job = self._import_job(problems_data)
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertEqual(job['result']['message'], 'Problems imported successfully')
+        self.assertEqual(job['result']['imported_count'], 2)
+        self.assertEqual(job['result']['skipped_count'], 0)
+        self.assertEqual(job['progress']['bytes_read'], job['progress']['total_bytes'])
 
-        response = self.client.post('/api/problems/import', content_type='multipart/form-data', data=data)
-        self.assertEqual(response.status_code, 201)
-        json_response = response.get_json()
-        self.assertIn('message', json_response)
-        self.assertEqual(json_response['message'], 'Problems imported successfully')
-        self.assertEqual(json_response['imported_count'], 2)
-        self.assertEqual(json_response['skipped_count'], 0)
-
-        # Verify in DB
         p1 = Problem.query.filter_by(title="Imported Problem 1").first()
-        self.assertIsNotNone(p1)
         self.assertEqual(p1.description, "Desc Import 1")
-        p2 = Problem.query.filter_by(title="Imported Problem 2").first()
-        self.assertIsNotNone(p2)
+        self.assertEqual([(tc.input_params, tc.expected_output) for tc in p1.test_cases], [('[1, 2]', '3')])
+        self.assertIsNotNone(Problem.query.filter_by(title="Imported Problem 2").first())
+
+    def test_import_round_trips_export(self):
+        exported = self.client.get('/api/problems/export').get_data(as_text=True)
+        Problem.query.delete()
+        db.session.commit()
+        job = self._import_job(exported)
+        self.assertEqual(job['result']['imported_count'], 1)
+        problem = Problem.query.filter_by(title="Initial Problem").first()
+        self.assertEqual(problem.test_cases.first().input_params, json.dumps([1, 2]))
 
     def test_import_problems_empty_file(self):
-        file_content = json.dumps([])
-        data = {'file': (io.BytesIO(file_content.encode('utf-8')), 'empty.json')}
-        response = self.client.post('/api/problems/import', content_type='multipart/form-data', data=data)
-        self.assertEqual(response.status_code, 400)
-        self.assertIn('No problems found in the file', response.get_json()['message'])
+        job = self._import_job([])
+        self.assertEqual(job['status'], 'failed')
+        self.assertIn('No problems found in the file', job['error'])
 
     def test_import_problems_invalid_file_format(self):
-        # Not a JSON file
-        file_content = "This is not a json file"
-        data = {'file': (io.BytesIO(file_content.encode('utf-8')), 'invalid.txt')}
-        response = self.client.post('/api/problems/import', content_type='multipart/form-data', data=data)
+        response = self._import("This is not a json file", filename='invalid.txt')
         self.assertEqual(response.status_code, 400)
         self.assertIn('Invalid file format or content', response.get_json()['message'])
 
+        job = self._import_job('[{"title": "Broken"')
+        self.assertEqual(job['status'], 'failed')
+        self.assertIn('Invalid file format or content', job['error'])
+
     def test_import_problems_missing_file(self):
         response = self.client.post('/api/problems/import', content_type='multipart/form-data', data={})
         self.assertEqual(response.status_code, 400)
@@ -180,72 +253,98 @@ if __name__ == '__main__':
         # self.problem1 (title="Initial Problem") already exists
         problems_data = [
             {"title": "Initial Problem", "description": "Desc Import Duplicate", "llm_prompt": "Prompt Import Duplicate"},
-            {"title": "Imported Problem Unique", "description": "Desc Import Unique", "llm_prompt": "Prompt Import Unique"}
+            {"title": "Imported Problem Unique", "description": "Desc Import Unique", "llm_prompt": "Prompt Import Unique"},
+            {"title": "Imported Problem Unique", "description": "Second copy", "llm_prompt": "Prompt"}
         ]
-        file_content = json.dumps(problems_data)
-        data = {'file': (io.BytesIO(file_content.encode('utf-8')), 'test_problems_duplicates.json')}
-
-        response = self.client.post('/api/problems/import', content_type='multipart/form-data', data=data)
-        self.assertEqual(response.status_code, 201) # Partial success
-        json_response = response.get_json()
-        self.assertEqual(json_response['imported_count'], 1)
-        self.assertEqual(json_response['skipped_count'], 1)
-        self.assertIn('Problem with title \'Initial Problem\' already exists and was skipped.', json_response['details'])
+        result = self._import_job(problems_data)['result']
+        self.assertEqual(result['imported_count'], 1)
+        self.assertEqual(result['skipped_count'], 2)
+        self.assertIn('Problem with title \'Initial Problem\' already exists and was skipped.', result['details'])
 
-        # Verify only unique one was added
         p_dup = Problem.query.filter_by(title="Initial Problem").first()
         self.assertEqual(p_dup.description, "Desc 1") # Original description, not updated
         p_unique = Problem.query.filter_by(title="Imported Problem Unique").first()
-        self.assertIsNotNone(p_unique)
+        self.assertEqual(p_unique.description, "Desc Import Unique")
 
     def test_import_problems_missing_required_fields_in_file(self):
+        result = self._import_job([{"description": "Missing title here"}])['result']
+        self.assertEqual(result['imported_count'], 0)
+        self.assertEqual(result['skipped_count'], 1)
+        self.assertIn('Missing required fields (title) for a problem in the file.', result['details'])
+
+    def test_atomic_import_rolls_back_everything(self):
         problems_data = [
-            {"description": "Missing title here"} # Missing title
+            {"title": "Atomic Problem", "description": "Desc", "test_cases": [{"input": 1, "expected_output": 1}]},
+            {"title": "Initial Problem", "description": "Duplicate"}
         ]
-        file_content = json.dumps(problems_data)
-        data = {'file': (io.BytesIO(file_content.encode('utf-8')), 'test_problems_missing_fields.json')}
+        job = self._import_job(problems_data, atomic='true')
+        self.assertEqual(job['status'], 'failed')
+        self.assertIn("already exists", job['error'])
+        self.assertIsNone(Problem.query.filter_by(title="Atomic Problem").first())
 
-        response = self.client.post('/api/problems/import', content_type='multipart/form-data', data=data)
-        self.assertEqual(response.status_code, 201) # Partial success or specific error handling
-        json_response = response.get_json()
-        self.assertEqual(json_response['imported_count'], 0)
-        self.assertEqual(json_response['skipped_count'], 1)
-        self.assertIn('Missing required fields (title) for a problem in the file.', json_response['details'])
+    def test_get_unknown_job(self):
+        self.assertEqual(self.client.get('/api/jobs/unknown').status_code, 404)
 
-    def test_export_problems_success(self):
-        # Add another problem to export
-        problem2 = Problem(title="Export Problem 2", description="Desc Export 2", llm_prompt="Prompt Export 2")
-        db.session.add(problem2)
-        db.session.commit()
+    def test_problem_conditional_get(self):
+        url = f'/api/problems/{self.problem1.id}'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+        self.assertFalse(etag.startswith('W/'))
+        self.assertIn('Last-Modified', response.headers)
+
+        with CountingQueries(db.engine) as counter:
+            response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        # 只查询版本戳
+        self.assertEqual(counter.count, 1)
+
+    def test_cached_response_is_reused_until_the_problem_changes(self):
+        url = f'/api/problems/{self.problem1.id}'
+        first = self.client.get(url)
+        with CountingQueries(db.engine) as counter:
+            second = self.client.get(url)
+        self.assertEqual(counter.count, 1)
+        self.assertEqual(second.get_json(), first.get_json())
+
+        self.client.put(url, json={'description': 'Changed'})
+        third = self.client.get(url, headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(third.status_code, 200)
+        self.assertEqual(third.get_json()['description'], 'Changed')
+
+    def test_test_case_writes_invalidate_problem_and_test_cases(self):
+        problem_url = f'/api/problems/{self.problem1.id}'
+        test_cases_url = f'/api/problems/{self.problem1.id}/testcases'
+        problem_etag = self.client.get(problem_url).headers['ETag']
+        test_cases_etag = self.client.get(test_cases_url).headers['ETag']
+
+        self.client.post(test_cases_url, json={'input_params': '[2, 2]', 'expected_output': '4'})
+        response = self.client.get(problem_url, headers={'If-None-Match': problem_etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()['test_cases']), 2)
 
-        response = self.client.get('/api/problems/export')
+        response = self.client.get(test_cases_url, headers={'If-None-Match': test_cases_etag})
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.content_type, 'application/json')
-        self.assertIn('attachment; filename=problems_export.json', response.headers['Content-Disposition'])
+        test_cases_etag = response.headers['ETag']
 
-        exported_data = json.loads(response.data.decode('utf-8'))
-        self.assertEqual(len(exported_data), 2)
-        titles = [p['title'] for p in exported_data]
-        self.assertIn('Initial Problem', titles)
-        self.assertIn('Export Problem 2', titles)
-        # Check for specific fields (assuming default export includes these)
-        for p_data in exported_data:
-            self.assertIn('title', p_data)
-            self.assertIn('description', p_data)
-            self.assertIn('llm_prompt', p_data)
-            self.assertNotIn('id', p_data) # IDs should not be exported for re-import
-            self.assertNotIn('created_at', p_data)
-            self.assertNotIn('updated_at', p_data)
+        self.client.put(test_cases_url, json={'test_cases': []})
+        response = self.client.get(test_cases_url, headers={'If-None-Match': test_cases_etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['test_cases'], [])
 
-    def test_export_problems_no_problems_to_export(self):
-        # Delete existing problems
-        Problem.query.delete()
-        db.session.commit()
+    def test_problem_list_etag_changes_on_create_and_delete(self):
+        etag = self.client.get('/api/problems').headers['ETag']
+        self.assertEqual(self.client.get('/api/problems', headers={'If-None-Match': etag}).status_code, 304)
 
-        response = self.client.get('/api/problems/export')
-        self.assertEqual(response.status_code, 200) # Or 204 No Content, depending on API design
-        exported_data = json.loads(response.data.decode('utf-8'))
-        self.assertEqual(len(exported_data), 0)
+        self.client.post('/api/problems', json={'title': 'Second', 'description': 'D', 'llm_prompt': 'P'})
+        response = self.client.get('/api/problems', headers={'If-None-Match': etag})
+        self.assertEqual(len(response.get_json()['problems']), 2)
+        etag = response.headers['ETag']
+
+        self.client.delete(f'/api/problems/{self.problem1.id}')
+        response = self.client.get('/api/problems', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()['problems']), 1)
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Setting
+from app.services.llm_service import LLMService
+from app.services.prompt_budget import PromptBudgeter, estimate_tokens, budget_stats
+
+
+class PromptBudgeterTestCase(unittest.TestCase):
+    def test_under_budget_is_unchanged(self):
+        code = "def add(a, b):\n    return a + b"
+        result = PromptBudgeter(1000).fit("Review this code.", code, language='python')
+        self.assertFalse(result.trimmed)
+        self.assertEqual(result.code, code)
+        self.assertEqual(result.notice(), '')
+
+    def test_long_comment_blocks_are_folded(self):
+        comments = "\n".join(f"# explanation line {i} with quite a few words in it" for i in range(40))
+        code = f"{comments}\ndef solve(x):\n    return x * 2"
+        result = PromptBudgeter(60).fit("Review.", code, language='python')
+        self.assertTrue(result.trimmed)
+        self.assertEqual(result.trims[0]['kind'], 'comments')
+        self.assertIn('# [trimmed 40 comment lines]', result.code)
+        self.assertIn('return x * 2', result.code)
+        self.assertLessEqual(result.final_tokens, 60)
+
+    def test_repeated_code_is_folded(self):
+        lines = "\n".join(f"table[{i}] = {i * i}" for i in range(200))
+        code = f"table = {{}}\n{lines}\nprint(table)"
+        result = PromptBudgeter(120).fit("Review.", code, language='python')
+        kinds = [trim['kind'] for trim in result.trims]
+        self.assertIn('repeated_code', kinds)
+        self.assertIn('table[0] = 0', result.code)
+        self.assertIn('table[199] = 39601', result.code)
+        self.assertIn('198 similar lines folded', result.code)
+
+    def test_generated_data_is_summarized(self):
+        data = ", ".join(str(i) for i in range(3000))
+        code = f"int data[] = {{{data}}};\nint main() {{ return data[0]; }}"
+        result = PromptBudgeter(200).fit("Review.", code, language='c++')
+        kinds = [trim['kind'] for trim in result.trims]
+        self.assertIn('generated_data', kinds)
+        self.assertIn('// [... ', result.code)
+        self.assertIn('int main()', result.code)
+        self.assertLessEqual(result.final_tokens, 200)
+
+    def test_falls_back_to_truncating_the_middle(self):
+        code = "\n".join(f"value_{i} = compute_{i}(value_{i - 1})" for i in range(1, 500))
+        result = PromptBudgeter(300).fit("Review.", code, language='python')
+        self.assertLessEqual(result.final_tokens, 300)
+        self.assertEqual(result.trims[-1]['kind'], 'truncated_code')
+        self.assertTrue(result.code.startswith('value_1 = compute_1'))
+        self.assertIn('truncated to fit the prompt budget', result.code)
+
+    def test_tracks_token_savings(self):
+        budget_stats.reset()
+        code = "\n".join(f"// note {i} about the algorithm" for i in range(100)) + "\nint main() { return 0; }"
+        result = PromptBudgeter(50).fit("Review.", code, language='java')
+        stats = budget_stats.snapshot()
+        self.assertEqual(stats['prompts_checked'], 1)
+        self.assertEqual(stats['prompts_trimmed'], 1)
+        self.assertEqual(stats['tokens_saved'], result.tokens_saved)
+        self.assertGreater(result.tokens_saved, 0)
+
+    def test_budget_per_model_from_config(self):
+        config = {'LLM_PROMPT_TOKEN_BUDGETS': {'small-model': 100}, 'LLM_PROMPT_TOKEN_BUDGET': 5000}
+        self.assertEqual(PromptBudgeter.for_model('small-model', config).budget, 100)
+        self.assertEqual(PromptBudgeter.for_model('unknown-model', config).budget, 5000)
+
+    def test_estimate_tokens(self):
+        self.assertEqual(estimate_tokens(''), 0)
+        self.assertEqual(estimate_tokens('a + b'), 3)
+
+
+class LLMServicePromptBudgetTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(config_class=TestingConfig)
+        self.app.config['LLM_PROMPT_TOKEN_BUDGETS'] = {'deepseek-coder': 80}
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        db.session.add(Setting(key='deepseek_api_key', value='test_key'))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_build_review_prompt_records_trims(self):
+        service = LLMService()
+        code = "\n".join(f"# comment {i} describing the approach" for i in range(30)) + "\nprint(1)"
+        prompt = service.build_review_prompt("Review this code.", code, 'python', 'deepseek-coder')
+        self.assertTrue(service.last_prompt_budget.trimmed)
+        self.assertIn('[trimmed 30 comment lines]', prompt)
+        self.assertIn('trimmed to fit the review budget', prompt)
+        self.assertIn('prompt budget of 80 tokens', service.last_prompt_budget.notice())
+
+
+if __name__ == '__main__':
+    unittest.main()
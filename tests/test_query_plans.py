@@ -0,0 +1,41 @@
+import unittest
+from app import create_app, db
+from app.config import TestingConfig
+from app.services.query_plans import check_query_plans, plan_problems
+
+
+class QueryPlansTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(config_class=TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_hot_queries_use_indexes(self):
+        for name, result in check_query_plans().items():
+            self.assertEqual(result['problems'], [], f"{name}: {result['plan']}")
+
+    def test_missing_index_is_reported(self):
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql('DROP INDEX ix_candidate_problem_tabs_candidate_order')
+        problems = check_query_plans()['candidate_tabs_in_order']['problems']
+        self.assertTrue(any('temporary sort' in p for p in problems))
+
+    def test_plan_problems(self):
+        self.assertEqual(plan_problems(['SEARCH test_cases USING INDEX ix_test_cases_problem_id (problem_id=?)']), [])
+        self.assertEqual(plan_problems(['SCAN submissions USING INDEX ix_submissions_submitted_at_id']), [])
+        self.assertEqual(len(plan_problems(['SCAN test_cases'])), 1)
+
+    def test_cli_command(self):
+        result = self.app.test_cli_runner().invoke(args=['check-query-plans'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('[ok] test_cases_by_problem', result.output)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+import json
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Candidate, Problem, Submission, Setting
+from unittest.mock import patch
+
+
+class ReviewsAPITestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(config_class=TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.candidate = Candidate(name="Review Candidate", email="review@example.com")
+        self.candidate.set_password("password")
+        self.problem1 = Problem(title="Two Sum", description="Desc 1", llm_prompt="Review two sum.")
+        self.problem2 = Problem(title="Reverse List", description="Desc 2", llm_prompt="Review reverse list.")
+        db.session.add_all([self.candidate, self.problem1, self.problem2, Setting(key='deepseek_api_key', value='test_key')])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _submit(self, problem, code, status='Accepted', llm_review=None):
+        sub = Submission(candidate_id=self.candidate.id, problem_id=problem.id, language='python',
+                         code=code, status=status, test_results='[]', llm_review=llm_review)
+        db.session.add(sub)
+        db.session.commit()
+        return sub
+
+    def _events(self, response):
+        return [json.loads(line) for line in response.data.decode('utf-8').splitlines() if line]
+
+    @patch('app.services.llm_service.LLMService.complete')
+    def test_reviews_latest_submissions_and_summarizes(self, mock_complete):
+        mock_complete.side_effect = lambda prompt, model=None, stream=False: f"review of: {prompt.splitlines()[0]}"
+        self._submit(self.problem1, 'old code')
+        latest1 = self._submit(self.problem1, 'new code')
+        latest2 = self._submit(self.problem2, 'other code')
+
+        response = self.client.post(f'/api/candidates/{self.candidate.id}/reviews', json={})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        events = self._events(response)
+
+        self.assertEqual(events[0]['event'], 'started')
+        self.assertEqual(events[0]['total'], 2)
+        reviews = [e for e in events if e['event'] == 'review']
+        self.assertEqual(sorted(e['submission_ids'][0] for e in reviews), sorted([latest1.id, latest2.id]))
+        self.assertTrue(all(e['status'] == 'done' for e in reviews))
+        summary = next(e for e in events if e['event'] == 'summary')
+        self.assertEqual(summary['status'], 'done')
+        self.assertEqual(events[-1], {'event': 'finished', 'completed': 2, 'failed': 0})
+        # 两道题各一次 + 会话总结一次
+        self.assertEqual(mock_complete.call_count, 3)
+        self.assertEqual(db.session.get(Submission, latest1.id).llm_review, 'review of: Review two sum.')
+
+        # 会话总结已保存，之后可以再次读取
+        saved = self.client.get(f'/api/candidates/{self.candidate.id}/reviews/summary')
+        self.assertEqual(saved.status_code, 200)
+        self.assertEqual(saved.get_json()['summary']['id'], summary['id'])
+        self.assertEqual(saved.get_json()['summary']['review'], summary['review'])
+        self.assertEqual(saved.get_json()['summary']['submission_ids'], sorted([latest1.id, latest2.id]))
+
+    def test_summary_not_found(self):
+        response = self.client.get(f'/api/candidates/{self.candidate.id}/reviews/summary')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.get('/api/candidates/999/reviews/summary').status_code, 404)
+
+    @patch('app.services.llm_service.LLMService.complete')
+    def test_reuses_review_of_identical_code(self, mock_complete):
+        mock_complete.return_value = 'fresh review'
+        self._submit(self.problem1, 'same code', llm_review='earlier review')
+        latest = self._submit(self.problem1, 'same code')
+
+        response = self.client.post(f'/api/candidates/{self.candidate.id}/reviews', json={'summary': False})
+        events = self._events(response)
+        review = next(e for e in events if e['event'] == 'review')
+        self.assertEqual(review['source'], 'existing')
+        self.assertEqual(review['review'], 'earlier review')
+        mock_complete.assert_not_called()
+        self.assertEqual(db.session.get(Submission, latest.id).llm_review, 'earlier review')
+
+    @patch('app.services.llm_service.LLMService.complete')
+    def test_failed_review_is_reported(self, mock_complete):
+        from app.services.llm_service import LLMAPIError
+        mock_complete.side_effect = LLMAPIError('boom')
+        sub = self._submit(self.problem1, 'code')
+
+        response = self.client.post(f'/api/candidates/{self.candidate.id}/reviews', json={'summary': False})
+        events = self._events(response)
+        review = next(e for e in events if e['event'] == 'review')
+        self.assertEqual(review['status'], 'failed')
+        self.assertIn('boom', review['error'])
+        self.assertEqual(events[-1]['failed'], 1)
+        self.assertIsNone(db.session.get(Submission, sub.id).llm_review)
+
+    def test_candidate_not_found(self):
+        response = self.client.post('/api/candidates/999/reviews', json={})
+        self.assertEqual(response.status_code, 404)
+
+    def test_no_submissions(self):
+        response = self.client.post(f'/api/candidates/{self.candidate.id}/reviews', json={})
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('No submissions found', response.get_json()['message'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+import unittest
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Setting
+from app.services.settings_cache import settings_cache
+from tests.helpers import CountingQueries
+
+
+class SettingsCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(config_class=TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        db.session.add(Setting(key='deepseek_api_key', value='key1'))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_settings_are_loaded_once(self):
+        self.assertEqual(settings_cache.get('deepseek_api_key'), 'key1')
+        with CountingQueries(db.engine) as queries:
+            for _ in range(5):
+                self.assertEqual(settings_cache.get('deepseek_api_key'), 'key1')
+                self.client.get('/api/settings/deepseek_api_key')
+        self.assertEqual(queries.count, 0)
+
+    def test_put_writes_through(self):
+        self.assertEqual(settings_cache.get('deepseek_api_key'), 'key1')
+        self.client.put('/api/settings/deepseek_api_key', json={'value': 'key2'})
+        self.client.put('/api/settings/default_problem_id', json={'value': '3'})
+        with CountingQueries(db.engine) as queries:
+            self.assertEqual(settings_cache.get('deepseek_api_key'), 'key2')
+            self.assertEqual(settings_cache.get('default_problem_id'), '3')
+        self.assertEqual(queries.count, 0)
+
+    def test_orm_delete_is_reflected(self):
+        self.assertEqual(settings_cache.get('deepseek_api_key'), 'key1')
+        db.session.delete(db.session.get(Setting, 'deepseek_api_key'))
+        db.session.commit()
+        self.assertIsNone(settings_cache.get('deepseek_api_key'))
+        self.assertEqual(self.client.get('/api/settings/deepseek_api_key').status_code, 404)
+
+    def test_rolled_back_changes_are_ignored(self):
+        self.assertEqual(settings_cache.get('deepseek_api_key'), 'key1')
+        db.session.get(Setting, 'deepseek_api_key').value = 'uncommitted'
+        db.session.flush()
+        db.session.rollback()
+        self.assertEqual(settings_cache.get('deepseek_api_key'), 'key1')
+
+
+class SettingsCacheCrossProcessTestCase(unittest.TestCase):
+    """两个应用实例共享数据库文件和版本文件，模拟两个工作进程"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+        class SharedConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(self.tmpdir, 'app.db')
+            SETTINGS_VERSION_FILE = os.path.join(self.tmpdir, 'settings.version')
+            SETTINGS_CACHE_CHECK_INTERVAL = 0
+
+        self.app_a = create_app(config_class=SharedConfig)
+        self.app_b = create_app(config_class=SharedConfig)
+        with self.app_a.app_context():
+            db.create_all()
+            db.session.add(Setting(key='deepseek_api_key', value='key1'))
+            db.session.commit()
+
+    def tearDown(self):
+        for app in (self.app_a, self.app_b):
+            with app.app_context():
+                db.session.remove()
+                db.engine.dispose()
+        shutil.rmtree(self.tmpdir)
+
+    def test_other_process_sees_update(self):
+        with self.app_b.app_context():
+            self.assertEqual(settings_cache.get('deepseek_api_key'), 'key1')
+
+        response = self.app_a.test_client().put('/api/settings/deepseek_api_key', json={'value': 'key2'})
+        self.assertEqual(response.status_code, 200)
+
+        with self.app_b.app_context():
+            self.assertEqual(settings_cache.get('deepseek_api_key'), 'key2')
+
+    def test_unchanged_version_does_not_reload(self):
+        with self.app_b.app_context():
+            settings_cache.get('deepseek_api_key')
+            with CountingQueries(db.engine) as queries:
+                settings_cache.get('deepseek_api_key')
+            self.assertEqual(queries.count, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
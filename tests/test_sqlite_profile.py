@@ -0,0 +1,121 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Candidate, Setting
+from app.services.sqlite_profile import WriterGate, writer_gate
+
+
+class SQLiteProfileTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+        class ProductionSQLiteConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(self.tmpdir, 'app.db')
+            SQLITE_PRODUCTION_PROFILE = True
+            SQLITE_PRAGMAS = {'busy_timeout': 2000}
+
+        self.app = create_app(config_class=ProductionSQLiteConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.engine.dispose()
+        self.app_context.pop()
+        shutil.rmtree(self.tmpdir)
+
+    def test_pragmas_are_applied(self):
+        with db.engine.connect() as conn:
+            pragma = lambda name: conn.exec_driver_sql(f'PRAGMA {name}').scalar()
+            self.assertEqual(pragma('journal_mode'), 'wal')
+            self.assertEqual(pragma('synchronous'), 1)  # NORMAL
+            self.assertEqual(pragma('busy_timeout'), 2000)
+            self.assertEqual(pragma('cache_size'), -64000)
+
+    def test_concurrent_writers_do_not_hit_lock_errors(self):
+        errors = []
+
+        def worker(n):
+            with self.app.app_context():
+                try:
+                    for i in range(15):
+                        # 先读后写，是回滚日志模式下最容易出现 "database is locked" 的写法
+                        db.session.get(Setting, 'counter')
+                        db.session.add(Setting(key=f'key-{n}-{i}', value=str(i)))
+                        db.session.commit()
+                except Exception as e:
+                    errors.append(e)
+                finally:
+                    db.session.remove()
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(Setting.query.count(), 8 * 15)
+        stats = writer_gate().stats()
+        self.assertGreaterEqual(stats['acquired'], 8 * 15)
+        self.assertEqual(stats['queued'], 0)
+
+    def test_readers_are_not_serialized(self):
+        db.session.add(Candidate(name='Reader', email='reader@example.com'))
+        db.session.commit()
+        before = writer_gate().stats()['acquired']
+        for _ in range(5):
+            self.assertEqual(Candidate.query.count(), 1)
+        db.session.remove()
+        self.assertEqual(writer_gate().stats()['acquired'], before)
+
+    def test_memory_database_is_left_alone(self):
+        class MemoryConfig(TestingConfig):
+            SQLITE_PRODUCTION_PROFILE = True
+
+        app = create_app(config_class=MemoryConfig)
+        self.assertNotIn('sqlite_writer_gate', app.extensions)
+
+
+class WriterGateTestCase(unittest.TestCase):
+    def test_first_in_first_out(self):
+        gate = WriterGate()
+        self.assertTrue(gate.acquire())
+        order = []
+        started = []
+
+        def writer(n):
+            started.append(n)
+            gate.acquire()
+            order.append(n)
+            gate.release()
+
+        threads = []
+        for n in range(5):
+            thread = threading.Thread(target=writer, args=(n,))
+            thread.start()
+            threads.append(thread)
+            # 等待线程拿到票号后再启动下一个
+            while gate.stats()['queued'] < n + 2:
+                pass
+        gate.release()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, [0, 1, 2, 3, 4])
+
+    def test_timeout_skips_abandoned_ticket(self):
+        gate = WriterGate()
+        self.assertTrue(gate.acquire())
+        self.assertFalse(gate.acquire(timeout=0.01))
+        gate.release()
+        self.assertTrue(gate.acquire(timeout=0.01))
+        self.assertEqual(gate.stats()['timeouts'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
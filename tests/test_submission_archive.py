@@ -0,0 +1,131 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta, UTC
+
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Blob, Candidate, LatestSubmission, Problem, Submission, SubmissionTestResult, TestCase
+from app.services.deletion import soft_delete
+from app.services.submission_archive import archive_submissions, get_archived_submission
+from tests.helpers import judge_result
+
+
+class SubmissionArchiveTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.app = create_app(config_class=TestingConfig)
+        self.app.config['SUBMISSION_ARCHIVE_PATH'] = os.path.join(self.tmpdir, 'archive.db')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.alice = Candidate(name='Alice', email='alice@example.com')
+        self.bob = Candidate(name='Bob', email='bob@example.com')
+        self.problem = Problem(title='Two Sum', description='Desc', llm_prompt='Review')
+        db.session.add_all([self.alice, self.bob, self.problem])
+        db.session.commit()
+        self.test_case = TestCase(problem_id=self.problem.id, input_params='1', expected_output='1')
+        db.session.add(self.test_case)
+        db.session.commit()
+
+        now = datetime.now(UTC)
+        self.old = self._submit(self.alice, 'print("old")', now - timedelta(days=400), passed=False)
+        self.recent = self._submit(self.alice, 'print("recent")', now - timedelta(days=10), passed=True)
+        self.latest = self._submit(self.alice, 'print("latest")', now - timedelta(days=500), passed=False)
+        self.bob_sub = self._submit(self.bob, 'print("bob")', now - timedelta(days=20), passed=False)
+        self.bob_latest = self._submit(self.bob, 'print("bob 2")', now - timedelta(days=1), passed=True)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        engine = self.app.extensions.get('submission_archive')
+        if engine is not None:
+            engine.dispose()
+        self.app_context.pop()
+        shutil.rmtree(self.tmpdir)
+
+    def _submit(self, candidate, code, submitted_at, passed):
+        submission = Submission(candidate_id=candidate.id, problem_id=self.problem.id, language='python', code=code,
+                                status='Accepted' if passed else 'Wrong Answer', submitted_at=submitted_at,
+                                test_results=[judge_result(self.test_case.id, passed, output='x' * 2000)])
+        db.session.add(submission)
+        db.session.commit()
+        return submission.id
+
+    def test_archives_old_submissions_and_serves_them_by_id(self):
+        response = self.client.post('/api/submissions/archive', json={'older_than_days': 365})
+        self.assertEqual(response.status_code, 202)
+        job = self.client.get(response.headers['Location']).get_json()
+        self.assertEqual(job['result'], {'archived': 1})
+
+        # 最新提交虽然更旧，但仍被指针引用，不归档；最佳提交同理
+        live = set(db.session.scalars(db.select(Submission.id)))
+        self.assertEqual(live, {self.recent, self.latest, self.bob_sub, self.bob_latest})
+        self.assertEqual(db.session.scalar(db.select(db.func.count()).select_from(SubmissionTestResult)
+                                           .where(SubmissionTestResult.submission_id == self.old)), 0)
+
+        data = self.client.get(f'/api/submissions/{self.old}').get_json()
+        self.assertTrue(data['archived'])
+        self.assertEqual(data['code'], 'print("old")')
+        self.assertEqual(data['status'], 'Wrong Answer')
+        self.assertIn('x' * 2000, data['test_results'])
+        self.assertNotIn('archived', self.client.get(f'/api/submissions/{self.recent}').get_json())
+        self.assertEqual(self.client.get('/api/submissions/999').status_code, 404)
+
+        # 指针仍然有效
+        pointer = db.session.get(LatestSubmission, (self.alice.id, self.problem.id))
+        self.assertEqual(pointer.latest_submission_id, self.latest)
+
+    def test_archives_candidates_from_a_closed_round(self):
+        result = archive_submissions(candidate_ids=[self.bob.id])
+        self.assertEqual(result, {'archived': 1})
+        self.assertTrue(self.client.get(f'/api/submissions/{self.bob_sub}').get_json()['archived'])
+        self.assertIsNotNone(db.session.get(Submission, self.bob_latest))
+        self.assertIsNotNone(db.session.get(Submission, self.old))
+        # 再次运行不会重复归档
+        self.assertEqual(archive_submissions(candidate_ids=[self.bob.id]), {'archived': 0})
+
+    def test_archiving_keeps_reuse_links_to_archived_submissions(self):
+        recent = db.session.get(Submission, self.recent)
+        recent.verdict_reused_from_id = self.old
+        recent.review_reused_from_id = self.old
+        db.session.commit()
+        archive_submissions(older_than_days=365)
+        db.session.expire_all()
+        data = self.client.get(f'/api/submissions/{self.recent}').get_json()
+        self.assertEqual(data['reused_from'], {'verdict': self.old, 'review': self.old})
+        self.assertTrue(self.client.get(f'/api/submissions/{self.old}').get_json()['archived'])
+
+    def test_archiving_reclaims_blobs(self):
+        blobs = db.session.scalar(db.select(db.func.count()).select_from(Blob))
+        archive_submissions(older_than_days=365)
+        # 归档提交的源码不再被引用；完整输出与其他提交相同，仍然保留
+        self.assertEqual(db.session.scalar(db.select(db.func.count()).select_from(Blob)), blobs - 1)
+        self.assertEqual(self.client.get(f'/api/submissions/{self.old}').get_json()['code'], 'print("old")')
+        self.assertEqual(db.session.get(Submission, self.recent).code, 'print("recent")')
+
+    def test_purge_removes_archived_rows_and_ids_are_not_reused(self):
+        archive_submissions(candidate_ids=[self.bob.id])
+        self.assertIsNotNone(get_archived_submission(self.bob_sub))
+        soft_delete(self.bob)
+        self.assertIsNone(get_archived_submission(self.bob_sub))
+
+        # id 最大的提交已被清理，新提交仍然使用更大的 id
+        new_id = self._submit(self.alice, 'print("new")', datetime.now(UTC), passed=True)
+        self.assertGreater(new_id, self.bob_latest)
+
+    def test_default_retention_window(self):
+        self.app.config['SUBMISSION_RETENTION_DAYS'] = 7
+        self.assertEqual(archive_submissions(), {'archived': 2})
+        self.assertEqual(set(db.session.scalars(db.select(Submission.id))), {self.recent, self.latest, self.bob_latest})
+
+    def test_invalid_archive_request(self):
+        self.assertEqual(self.client.post('/api/submissions/archive', json={'older_than_days': -1}).status_code, 400)
+        self.assertEqual(self.client.post('/api/submissions/archive', json={'candidate_ids': 'x'}).status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
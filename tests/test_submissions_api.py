@@ -1,8 +1,12 @@
 import unittest
 import json
+from datetime import datetime, timedelta
 from app import create_app, db
+from app.api.pagination import encode_cursor
 from app.models import Candidate, Problem, TestCase, Submission, Setting
+from app.services.blob_store import blob_store
 from unittest.mock import patch, MagicMock
+from tests.helpers import CountingQueries
 
 class SubmissionsAPITestCase(unittest.TestCase):
     def setUp(self):
@@ -501,5 +505,97 @@ class SubmissionsAPITestCase(unittest.TestCase):
         db.session.add(self.test_case1)
         db.session.commit()
 
+class SubmissionListAPITestCase(unittest.TestCase):
+    def setUp(self):
+        from app.config import TestingConfig
+        self.app = create_app(config_class=TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.candidate = Candidate(name="Test Candidate", email="test@example.com")
+        self.candidate.set_password("testpassword")
+        self.problem = Problem(title="Test Problem", description="Desc", llm_prompt="Review this code.")
+        self.other_problem = Problem(title="Other Problem", description="Desc", llm_prompt="Review this code.")
+        db.session.add_all([self.candidate, self.problem, self.other_problem])
+        db.session.commit()
+
+        base = datetime(2024, 1, 1, 12, 0, 0)
+        self.submissions = []
+        for i in range(5):
+            self.submissions.append(Submission(
+                candidate_id=self.candidate.id,
+                problem_id=self.problem.id if i % 2 == 0 else self.other_problem.id,
+                language='python', code=f'print({i})', test_results='[]', llm_review='Review',
+                status='Accepted' if i < 3 else 'Wrong Answer',
+                # 两条提交时间相同，验证游标按 id 打破平局
+                submitted_at=base + timedelta(minutes=min(i, 3))
+            ))
+        db.session.add_all(self.submissions)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_list_omits_heavy_fields_by_default(self):
+        response = self.client.get('/api/submissions')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertIsNone(data['next_cursor'])
+        self.assertEqual([s['id'] for s in data['submissions']], [s.id for s in reversed(self.submissions)])
+        for field in ('code', 'test_results', 'llm_review'):
+            self.assertNotIn(field, data['submissions'][0])
+        self.assertEqual(data['submissions'][0]['submission_time'], '2024-01-01T12:03:00')
+
+    def test_cursor_pages_cover_all_rows_once(self):
+        seen = []
+        cursor = None
+        while True:
+            params = {'limit': 2}
+            if cursor:
+                params['cursor'] = cursor
+            data = self.client.get('/api/submissions', query_string=params).get_json()
+            self.assertLessEqual(len(data['submissions']), 2)
+            seen.extend(s['id'] for s in data['submissions'])
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(seen, [s.id for s in reversed(self.submissions)])
+
+    def test_filters(self):
+        data = self.client.get('/api/submissions', query_string={'problem_id': self.problem.id, 'status': 'Accepted'}).get_json()
+        self.assertEqual([s['id'] for s in data['submissions']], [self.submissions[2].id, self.submissions[0].id])
+
+        data = self.client.get('/api/submissions', query_string={
+            'since': '2024-01-01T12:01:00Z', 'until': '2024-01-01T12:03:00Z'
+        }).get_json()
+        self.assertEqual([s['id'] for s in data['submissions']], [self.submissions[2].id, self.submissions[1].id])
+
+        data = self.client.get('/api/submissions', query_string={'candidate_id': 999}).get_json()
+        self.assertEqual(data['submissions'], [])
+
+    def test_fields_projection(self):
+        data = self.client.get('/api/submissions', query_string={'fields': 'id,code', 'limit': 1}).get_json()
+        self.assertEqual(data['submissions'], [{'id': self.submissions[-1].id, 'code': 'print(4)'}])
+
+    def test_code_field_reads_blobs_in_one_query(self):
+        blob_store._cache.clear()
+        with CountingQueries(db.engine) as counter:
+            data = self.client.get('/api/submissions', query_string={'fields': 'id,code'}).get_json()
+        self.assertEqual([s['code'] for s in data['submissions']], [f'print({i})' for i in range(4, -1, -1)])
+        # 提交列表和整页源码各一条
+        self.assertEqual(counter.count, 2)
+
+    def test_invalid_parameters(self):
+        for params in ({'fields': 'id,password'}, {'cursor': 'not-a-cursor'}, {'limit': 'x'}, {'since': 'yesterday'},
+                       {'cursor': encode_cursor(123, 5)}, {'cursor': encode_cursor('', 5)},
+                       {'candidate_id': 'abc'}, {'problem_id': '1.5'}):
+            response = self.client.get('/api/submissions', query_string=params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('message', response.get_json())
+
 if __name__ == '__main__':
     unittest.main()
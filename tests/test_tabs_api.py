@@ -1,8 +1,9 @@
 import unittest
 import json
 from app import create_app, db
-from app.models import Candidate, Problem, CandidateProblemTab
+from app.models import Candidate, Problem, CandidateProblemTab, Submission, TestCase
 from app.config import Config
+from tests.helpers import CountingQueries, judge_result
 
 class TestConfig(Config):
     TESTING = True
@@ -146,5 +147,84 @@ class TabsAPITestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertIn('does not match the set of current tabs', response.get_json()['message'])
 
+    def _add_workspace_data(self):
+        db.session.add(CandidateProblemTab(candidate_id=self.candidate.id, problem_id=self.problem2.id, tab_order=2))
+        test_case = TestCase(problem_id=self.problem1.id, input_params='[1]', expected_output='1')
+        db.session.add_all([
+            test_case,
+            TestCase(problem_id=self.problem2.id, input_params='[2]', expected_output='2'),
+        ])
+        db.session.commit()
+        for code in ('print(1)', 'print(2)'):
+            db.session.add(Submission(candidate_id=self.candidate.id, problem_id=self.problem1.id,
+                                      language='python', code=code, status='Accepted',
+                                      test_results=[judge_result(test_case.id, True)]))
+            db.session.commit()
+
+    def test_get_workspace(self):
+        self._add_workspace_data()
+        response = self.client.get(f'/api/candidates/{self.candidate.id}/workspace')
+        self.assertEqual(response.status_code, 200)
+        tabs = response.get_json()['tabs']
+        self.assertEqual([tab['problem_id'] for tab in tabs], [self.problem1.id, self.problem2.id])
+        self.assertEqual(tabs[0]['problem']['description'], 'Problem 1 for tabs')
+        self.assertEqual(tabs[0]['problem']['test_cases'][0]['input_params'], '[1]')
+        self.assertEqual(tabs[0]['latest_submission']['code'], 'print(2)')
+        # 前端直接渲染测试结果列表
+        test_results = tabs[0]['latest_submission']['test_results']
+        self.assertIsInstance(test_results, list)
+        self.assertTrue(test_results[0]['passed'])
+        self.assertIsNone(tabs[1]['latest_submission'])
+
+    def test_workspace_query_count_does_not_grow_with_tabs(self):
+        self._add_workspace_data()
+        # 第一个请求会触发应用启动时的后台检查，不计入
+        self.client.get(f'/api/candidates/{self.candidate.id}/workspace')
+        with CountingQueries(db.engine) as small:
+            self.client.get(f'/api/candidates/{self.candidate.id}/workspace')
+        db.session.add(CandidateProblemTab(candidate_id=self.candidate.id, problem_id=self.problem3.id, tab_order=3))
+        db.session.add(Submission(candidate_id=self.candidate.id, problem_id=self.problem3.id,
+                                  language='python', code='print(3)', status='Accepted', test_results=[]))
+        db.session.commit()
+        with CountingQueries(db.engine) as large:
+            self.client.get(f'/api/candidates/{self.candidate.id}/workspace')
+        # 候选人、ETag、标签页、测试用例、最新提交、测试结果、源码 blob 各一条
+        self.assertLessEqual(small.count, 7)
+        self.assertLessEqual(large.count, 7)
+
+    def test_workspace_etag(self):
+        url = f'/api/candidates/{self.candidate.id}/workspace'
+        etag = self.client.get(url).headers['ETag']
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        self._add_workspace_data()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        etag = response.headers['ETag']
+
+        # 未变化时只查询候选人和 ETag，不加载测试用例、提交和源码
+        with CountingQueries(db.engine) as counter:
+            response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertLessEqual(counter.count, 2)
+
+        # 测试用例、评审状态和候选人信息的变化都会改变 ETag
+        for change in (
+            lambda: db.session.add(TestCase(problem_id=self.problem2.id, input_params='[3]', expected_output='3')),
+            lambda: setattr(Submission.query.order_by(Submission.id.desc()).first(), 'llm_review_status', 'pending'),
+            lambda: setattr(self.candidate, 'name', 'Renamed'),
+        ):
+            change()
+            db.session.commit()
+            response = self.client.get(url, headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 200)
+            etag = response.headers['ETag']
+
+    def test_get_workspace_for_nonexistent_candidate(self):
+        response = self.client.get('/api/candidates/999/workspace')
+        self.assertEqual(response.status_code, 404)
+
 if __name__ == '__main__':
     unittest.main()
@@ -2,7 +2,9 @@ import unittest
 import json
 from app import create_app, db
 from app.config import TestingConfig as Config
-from app.models import Problem, TestCase, Candidate
+from app.models import Problem, TestCase, Candidate, Submission, SubmissionTestResult, TestCaseStats
+from sqlalchemy import event
+from tests.helpers import judge_result
 
 class TestCasesAPITestCase(unittest.TestCase):
     def setUp(self):
@@ -81,6 +83,101 @@ class TestCasesAPITestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 404)
         self.assertIn('Problem not found', response.get_json()['message'])
 
+    def test_replace_test_cases_applies_diff(self):
+        test_case2 = TestCase(problem_id=self.problem.id, input_params='"in2"', expected_output='"out2"')
+        test_case3 = TestCase(problem_id=self.problem.id, input_params='"in3"', expected_output='"out3"')
+        db.session.add_all([test_case2, test_case3])
+        db.session.commit()
+
+        payload = {'test_cases': [
+            {'id': 'tmp-1', 'input_params': '"new"', 'expected_output': '"new out"'},
+            {'id': self.test_case1.id, 'input_params': self.test_case1.input_params, 'expected_output': self.test_case1.expected_output},
+            {'id': test_case2.id, 'input_params': '"in2 changed"', 'expected_output': '"out2"'},
+            {'input_params': '"another"', 'expected_output': '"another out"'},
+        ]}
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement.lstrip())
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            response = self.client.put(f'/api/problems/{self.problem.id}/testcases', json=payload)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual((data['created'], data['updated'], data['deleted']), (2, 1, 1))
+        # 删除和更新各一条语句（另加清理统计和测试结果引用各一条）；SQLite 上按参数顺序返回 id 的插入会逐行执行
+        def count(prefix):
+            return sum(1 for statement in statements if statement.startswith(prefix))
+        self.assertEqual(count('SELECT'), 2)
+        self.assertEqual(count('DELETE FROM test_cases'), 1)
+        self.assertEqual(count('DELETE FROM test_case_stats'), 1)
+        self.assertEqual(count('UPDATE submission_test_results'), 1)
+        self.assertEqual(count('UPDATE test_cases'), 1)
+        # 题目版本号随之加一，使缓存的题目和测试用例响应失效
+        self.assertEqual(count('UPDATE problems'), 1)
+
+        ids = [tc['id'] for tc in data['test_cases']]
+        self.assertEqual(ids[1:3], [self.test_case1.id, test_case2.id])
+        db.session.expire_all()
+        stored = {tc.id: tc.input_params for tc in TestCase.query.filter_by(problem_id=self.problem.id)}
+        self.assertEqual(stored, {ids[0]: '"new"', ids[1]: self.test_case1.input_params,
+                                  ids[2]: '"in2 changed"', ids[3]: '"another"'})
+        self.assertNotIn('"in3"', stored.values())
+
+    def test_replace_test_cases_validation(self):
+        other = Problem(title="Other Problem", description="Other")
+        db.session.add(other)
+        db.session.commit()
+        foreign = TestCase(problem_id=other.id, input_params='1', expected_output='1')
+        db.session.add(foreign)
+        db.session.commit()
+
+        url = f'/api/problems/{self.problem.id}/testcases'
+        for payload in ({'test_cases': 'nope'},
+                        [{'input_params': '1'}],
+                        [{'input_params': [1, 2], 'expected_output': '3'}],
+                        [{'input_params': '1', 'expected_output': {'sum': 3}}],
+                        [{'id': self.test_case1.id, 'input_params': None, 'expected_output': '1'}],
+                        [{'id': foreign.id, 'input_params': '1', 'expected_output': '1'}],
+                        [{'id': self.test_case1.id, 'input_params': '1', 'expected_output': '1'},
+                         {'id': self.test_case1.id, 'input_params': '2', 'expected_output': '2'}]):
+            self.assertEqual(self.client.put(url, json=payload).status_code, 400, payload)
+        # 校验失败时不做任何修改
+        self.assertEqual(TestCase.query.filter_by(problem_id=self.problem.id).count(), 1)
+        self.assertEqual(self.client.put('/api/problems/999/testcases', json=[]).status_code, 404)
+
+    def _submit_failure(self, test_case_id):
+        candidate = Candidate(name="Candidate", email="c@example.com")
+        db.session.add(candidate)
+        db.session.commit()
+        db.session.add(Submission(candidate_id=candidate.id, problem_id=self.problem.id, language='python',
+                                  code='print(1)', status='Wrong Answer',
+                                  test_results=[judge_result(test_case_id, False)]))
+        db.session.commit()
+        self.assertEqual(TestCaseStats.query.filter_by(test_case_id=test_case_id).count(), 1)
+
+    def test_replace_cleans_up_rows_referencing_deleted_test_cases(self):
+        test_case_id = self.test_case1.id
+        self._submit_failure(test_case_id)
+        self.client.put(f'/api/problems/{self.problem.id}/testcases', json=[])
+        self.assertEqual(TestCaseStats.query.filter_by(test_case_id=test_case_id).count(), 0)
+        result = SubmissionTestResult.query.one()
+        self.assertIsNone(result.test_case_id)
+
+    def test_delete_cleans_up_rows_referencing_the_test_case(self):
+        test_case_id = self.test_case1.id
+        self._submit_failure(test_case_id)
+        self.assertEqual(self.client.delete(f'/api/testcases/{test_case_id}').status_code, 200)
+        self.assertEqual(TestCaseStats.query.count(), 0)
+        self.assertIsNone(SubmissionTestResult.query.one().test_case_id)
+
+    def test_replace_with_empty_list_deletes_all(self):
+        response = self.client.put(f'/api/problems/{self.problem.id}/testcases', json=[])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['deleted'], 1)
+        self.assertEqual(TestCase.query.filter_by(problem_id=self.problem.id).count(), 0)
+
     def test_get_specific_test_case_success(self):
         response = self.client.get(f'/api/testcases/{self.test_case1.id}')
         self.assertEqual(response.status_code, 200)